@@ -21,7 +21,8 @@ def create_app():
     app.config["SECRET_KEY"] = secret_key
     app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv("SQLALCHEMY_DATABASE_URI") 
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-    app.config['SQLALCHEMY_ECHO'] = True
+    # Echoing every statement to stdout is expensive on the tick path; opt in with SQLALCHEMY_ECHO=true
+    app.config['SQLALCHEMY_ECHO'] = os.getenv("SQLALCHEMY_ECHO", "false").lower() in ("true", "1", "yes")
     
     # Flask's default cookie-based sessions work perfectly with Flask-Login
     # No need for Flask-Session which can cause conflicts
@@ -49,6 +50,8 @@ def create_app():
     # Import models after database initialization
     from app.models.users import User
     from app.models.backend import City, Shop, Item, ShopInventory
+    # Registers the after_flush hook that bumps cache versions when watched models change
+    from app.services import cache_invalidation  # noqa: F401
 
     @login_manager.user_loader
     def load_user(user_id):
@@ -68,6 +71,7 @@ def create_app():
     from app.routes.gm_routes import gm_bp
     from app.routes.admin_routes import admin_bp
     from app.routes.sim_api_routes import sim_api_bp
+    from app.routes.price_api_routes import price_api_bp
 
     app.register_blueprint(auth, url_prefix="/auth")
     app.register_blueprint(main_bp)
@@ -75,6 +79,7 @@ def create_app():
     app.register_blueprint(player_bp, url_prefix="/player")
     app.register_blueprint(admin_bp)
     app.register_blueprint(sim_api_bp)
+    app.register_blueprint(price_api_bp)
 
     # Debugging: Print registered routes
     print("\nRegistered Routes:")
@@ -93,11 +98,61 @@ def create_app():
         click.echo(f"Deleted {deleted} PriceHistory rows older than retention window.")
 
     @app.cli.command("price-history-aggregate-old")
+    @click.option("--background", is_flag=True, help="Queue the aggregation for a sim-worker instead of running it now.")
     @with_appcontext
-    def price_history_aggregate_old_command():
-        """Aggregate very old PriceHistory rows into monthly buckets for long-term trends."""
+    def price_history_aggregate_old_command(background):
+        """Incrementally aggregate aged PriceHistory rows into monthly buckets for long-term trends."""
+        if background:
+            from app.services.job_runner import enqueue_job
+            job = enqueue_job(None, "aggregate_price_history")
+            click.echo(f"Queued price history aggregation as job #{job.id}.")
+            return
         groups = aggregate_old_price_history()
-        click.echo(f"Created {groups} aggregated monthly price history groups.")
+        click.echo(f"Upserted {groups} aggregated monthly price history groups.")
+
+    @app.cli.command("price-history-partitions-ensure")
+    @click.option("--months-ahead", type=int, default=None, help="Months of partitions to create ahead of now.")
+    @with_appcontext
+    def price_history_partitions_ensure_command(months_ahead):
+        """Create upcoming monthly price_history partitions (PostgreSQL; run at least monthly)."""
+        from app.cli.price_history_partitions import ensure_price_history_partitions
+        checked = ensure_price_history_partitions(months_ahead=months_ahead)
+        if checked:
+            click.echo(f"Ensured {checked} monthly price_history partitions.")
+        else:
+            click.echo("price_history is not partitioned; nothing to do.")
+
+    @app.cli.command("price-history-partition-migrate")
+    @click.option("--drop-legacy", is_flag=True, help="Drop price_history_legacy after copying its rows.")
+    @with_appcontext
+    def price_history_partition_migrate_command(drop_legacy):
+        """Convert price_history into a month-partitioned table, copying existing rows (PostgreSQL)."""
+        from app.cli.price_history_partitions import migrate_price_history_to_partitions
+        copied = migrate_price_history_to_partitions(drop_legacy=drop_legacy)
+        click.echo(f"Copied {copied} rows into partitioned price_history.")
+
+    @app.cli.command("prices-materialize")
+    @click.option("--gm", "gm_profile_id", type=int, default=None, help="Only this GM profile (default: every GM).")
+    @with_appcontext
+    def prices_materialize_command(gm_profile_id):
+        """Write lazily evaluated shop prices back to shop_inventory (lazy pricing compaction)."""
+        from app.models.users import GMProfile
+        from app.services.economy import materialize_prices
+        if gm_profile_id is None:
+            gm_ids = db.session.execute(db.select(GMProfile.id)).scalars().all()
+        else:
+            gm_ids = [gm_profile_id]
+        written = sum(materialize_prices(gm_id) for gm_id in gm_ids)
+        db.session.commit()
+        click.echo(f"Materialized {written} shop prices.")
+
+    @app.cli.command("sim-worker")
+    @click.option("--processes", default=1, show_default=True, help="Number of worker processes to start.")
+    @click.option("--poll-interval", default=1.0, show_default=True, help="Seconds to wait between queue polls when idle.")
+    def sim_worker_command(processes, poll_interval):
+        """Run background workers for simulation, seeding and maintenance jobs."""
+        from app.cli.sim_worker import run_sim_workers
+        run_sim_workers(processes=processes, poll_interval=poll_interval)
 
     return app
 
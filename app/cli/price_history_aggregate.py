@@ -1,120 +1,149 @@
 from datetime import datetime
+from itertools import groupby
+from typing import Callable, Optional
 
+import numpy as np
 from flask import current_app
+from sqlalchemy import select
 
 from app.extensions import db
-from app.models.backend import PriceHistory
+from app.models.maintenance import MaintenanceWatermark
 from app.models.price_history_aggregated import AggregatedPriceHistory
+from app.models.price_vector import InventoryOrdinal, PriceVector
 from app.config.price_history_config import default_price_history_retention
+from app.services.price_vectors import get_item_series
+from app.utils.sql import dialect_insert, greatest, least
 
+WATERMARK_NAME = "price_history_aggregate"
 
-def aggregate_old_price_history() -> int:
-    """
-    Aggregate very old PriceHistory rows into coarse buckets so they can be deleted later.
 
-    This is optional; for now it demonstrates a path to long-term trend preservation.
-    Returns the number of aggregated groups created/updated in this run.
+def get_aggregation_watermark() -> Optional[datetime]:
+    """History recorded before this instant has been folded into AggregatedPriceHistory (None if never run)."""
+    return MaintenanceWatermark.get_position(WATERMARK_NAME)
+
+
+def aggregate_old_price_history(
+    now: Optional[datetime] = None,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+) -> int:
+    """
+    Aggregate aged price history into monthly buckets so it can be deleted later.
+
+    Reads the PriceVector tier (the history every tick writes) through get_item_series(), one shop
+    item at a time, so only that item's 4-byte slot of each vector is fetched. Incremental: only
+    vectors recorded in [watermark, retention cutoff) are read, so the job is cheap enough to run
+    often. Buckets are calendar months of the vectors' recorded_at; buckets that already exist (a
+    month split across runs) are merged by ON CONFLICT.
+    progress_callback(items done, total items) is called after every shop item, so a job running
+    this keeps its heartbeat fresh however long the run takes.
+    Returns the number of aggregated buckets inserted or updated in this run.
     """
     cfg = default_price_history_retention
-    now = datetime.utcnow()
-    cutoff = now - cfg.retention_timedelta
+    cutoff = (now or datetime.utcnow()) - cfg.retention_timedelta
+    watermark = get_aggregation_watermark()
+    if watermark is not None and watermark >= cutoff:
+        return 0
 
-    # For simplicity, aggregate everything older than the cutoff into one-month buckets.
-    # This is intentionally conservative and can be refined later.
-
-    # NOTE: This implementation is intentionally simple and expected to run over
-    # a limited amount of already-aged data in a maintenance window.
     session = db.session
-
-    # Use raw SQL or ORM grouping; ORM shown here for clarity even if not the most efficient.
-    # The expectation is that this job runs infrequently and over limited data.
-    rows = (
-        session.query(
-            PriceHistory.gm_profile_id,
-            PriceHistory.shop_id,
-            PriceHistory.item_id,
-            db.func.date_trunc("month", PriceHistory.recorded_at).label("period_start"),
-            db.func.min(PriceHistory.price).label("low_price"),
-            db.func.max(PriceHistory.price).label("high_price"),
-            db.func.avg(PriceHistory.price).label("avg_price"),
-            db.func.count(PriceHistory.id).label("sample_count"),
-        )
-        .filter(PriceHistory.recorded_at < cutoff)
-        .group_by(
-            PriceHistory.gm_profile_id,
-            PriceHistory.shop_id,
-            PriceHistory.item_id,
-            db.func.date_trunc("month", PriceHistory.recorded_at),
-        )
-        .all()
-    )
-
-    aggregated_groups = 0
-
-    for row in rows:
-        # Compute the start and end of the month for this aggregation bucket.
-        period_start = row.period_start
-        year = period_start.year
-        month = period_start.month
-        if month == 12:
-            period_end = datetime(year + 1, 1, 1, tzinfo=period_start.tzinfo)
-        else:
-            period_end = datetime(year, month + 1, 1, tzinfo=period_start.tzinfo)
-
-        # For open/close prices, we want the first and last sample *within this month*,
-        # not the absolute first/last sample across all months.
-        first_sample = (
-            session.query(PriceHistory)
-            .filter(
-                PriceHistory.gm_profile_id == row.gm_profile_id,
-                PriceHistory.shop_id == row.shop_id,
-                PriceHistory.item_id == row.item_id,
-                PriceHistory.recorded_at >= period_start,
-                PriceHistory.recorded_at < period_end,
-                PriceHistory.recorded_at < cutoff,
+    window_filter = [PriceVector.recorded_at < cutoff]
+    if watermark is not None:
+        window_filter.append(PriceVector.recorded_at >= watermark)
+    vectors = session.execute(
+        select(PriceVector.gm_profile_id, PriceVector.tick, PriceVector.recorded_at)
+        .where(*window_filter)
+        .order_by(PriceVector.gm_profile_id, PriceVector.tick)
+    ).all()
+
+    gm_vectors = {
+        gm_profile_id: list(rows) for gm_profile_id, rows in groupby(vectors, key=lambda v: v.gm_profile_id)
+    }
+    gm_keys = {gm_profile_id: [] for gm_profile_id in gm_vectors}
+    if gm_keys:
+        for gm_profile_id, shop_id, item_id in session.execute(
+            select(InventoryOrdinal.gm_profile_id, InventoryOrdinal.shop_id, InventoryOrdinal.item_id)
+            .where(InventoryOrdinal.gm_profile_id.in_(list(gm_keys)))
+            .order_by(InventoryOrdinal.gm_profile_id, InventoryOrdinal.ordinal)
+        ).all():
+            gm_keys[gm_profile_id].append((shop_id, item_id))
+    total_items = sum(len(keys) for keys in gm_keys.values())
+
+    stamp = datetime.utcnow()
+    buckets = []
+    done = 0
+    for gm_profile_id, rows in gm_vectors.items():
+        window_ticks = np.array([v.tick for v in rows], dtype=np.int64)
+        month_of_tick = {
+            v.tick: v.recorded_at.replace(day=1, hour=0, minute=0, second=0, microsecond=0) for v in rows
+        }
+        for shop_id, item_id in gm_keys[gm_profile_id]:
+            ticks, prices = get_item_series(
+                gm_profile_id, shop_id, item_id, int(window_ticks[0]), int(window_ticks[-1])
             )
-            .order_by(PriceHistory.recorded_at.asc())
-            .first()
-        )
-        last_sample = (
-            session.query(PriceHistory)
-            .filter(
-                PriceHistory.gm_profile_id == row.gm_profile_id,
-                PriceHistory.shop_id == row.shop_id,
-                PriceHistory.item_id == row.item_id,
-                PriceHistory.recorded_at >= period_start,
-                PriceHistory.recorded_at < period_end,
-                PriceHistory.recorded_at < cutoff,
-            )
-            .order_by(PriceHistory.recorded_at.desc())
-            .first()
-        )
-
-        if not first_sample or not last_sample:
-            continue
-
-        aggregated = AggregatedPriceHistory(
-            gm_profile_id=row.gm_profile_id,
-            shop_id=row.shop_id,
-            item_id=row.item_id,
-            period_start=period_start,
-            period_type="month",
-            open_price=first_sample.price,
-            high_price=row.high_price,
-            low_price=row.low_price,
-            close_price=last_sample.price,
-            avg_price=row.avg_price,
-            sample_count=row.sample_count,
-        )
-        session.add(aggregated)
-        aggregated_groups += 1
+            sampled = np.isin(ticks, window_ticks) & ~np.isnan(prices)
+            ticks, prices = ticks[sampled].tolist(), prices[sampled].astype(np.float64).round(2)
+            position = 0
+            for period_start, month_ticks in groupby(ticks, key=month_of_tick.__getitem__):
+                count = len(list(month_ticks))
+                month_prices = prices[position:position + count]
+                position += count
+                buckets.append({
+                    "gm_profile_id": gm_profile_id,
+                    "shop_id": shop_id,
+                    "item_id": item_id,
+                    "period_start": period_start,
+                    "period_type": "month",
+                    "open_price": float(month_prices[0]),
+                    "high_price": float(month_prices.max()),
+                    "low_price": float(month_prices.min()),
+                    "close_price": float(month_prices[-1]),
+                    "avg_price": float(month_prices.mean()),
+                    "sample_count": count,
+                    "created_at": stamp,
+                    "updated_at": stamp,
+                })
+            done += 1
+            if progress_callback:
+                progress_callback(done, total_items)
+
+    table = AggregatedPriceHistory.__table__
+    insert_stmt = dialect_insert(table)
+    new = insert_stmt.excluded
+    # Runs cover disjoint, increasing time ranges: the stored open stays, the new close wins
+    upsert = insert_stmt.on_conflict_do_update(
+        index_elements=["gm_profile_id", "shop_id", "item_id", "period_type", "period_start"],
+        set_={
+            "high_price": greatest(table.c.high_price, new.high_price),
+            "low_price": least(table.c.low_price, new.low_price),
+            "close_price": new.close_price,
+            "avg_price": (
+                (table.c.avg_price * table.c.sample_count + new.avg_price * new.sample_count)
+                / (table.c.sample_count + new.sample_count)
+            ),
+            "sample_count": table.c.sample_count + new.sample_count,
+            "updated_at": new.updated_at,
+        },
+    )
+    if buckets:
+        session.execute(upsert, buckets)
+    aggregated_groups = len(buckets)
 
+    # Advance the watermark in the same transaction as the rollup
+    watermark_insert = dialect_insert(MaintenanceWatermark.__table__).values(
+        name=WATERMARK_NAME, position=cutoff, updated_at=stamp
+    )
+    session.execute(watermark_insert.on_conflict_do_update(
+        index_elements=["name"],
+        set_={"position": watermark_insert.excluded.position, "updated_at": watermark_insert.excluded.updated_at},
+    ))
     session.commit()
 
     current_app.logger.info(
-        "Aggregated old PriceHistory into monthly buckets",
-        extra={"groups_created": aggregated_groups},
+        "Aggregated old price history into monthly buckets",
+        extra={
+            "groups_upserted": aggregated_groups,
+            "from": watermark.isoformat() if watermark else None,
+            "until": cutoff.isoformat(),
+        },
     )
 
     return aggregated_groups
-
@@ -2,22 +2,45 @@ from datetime import datetime
 from time import perf_counter
 
 from flask import current_app
+from sqlalchemy import delete, select
 
 from app.extensions import db
 from app.models.backend import PriceHistory
 from app.config.price_history_config import default_price_history_retention
+from app.cli.price_history_aggregate import get_aggregation_watermark
+from app.cli.price_history_partitions import (
+    is_postgres,
+    is_partitioned,
+    delete_expired_default_partition_rows,
+    drop_expired_price_history_partitions,
+    ensure_price_history_partitions,
+)
 
 
 def cleanup_price_history() -> int:
     """
-    Delete old PriceHistory rows in small batches based on the configured retention window.
+    Remove PriceHistory rows older than the configured retention window (and, if price history
+    aggregation has run, older than its watermark).
 
-    Returns the total number of rows deleted in this run.
+    On a month-partitioned PostgreSQL table whole expired partitions are detached and dropped
+    (retention is rounded to whole months); otherwise rows are deleted in small batches.
+    Returns the total number of rows removed in this run.
     """
     cfg = default_price_history_retention
     now = datetime.utcnow()
     cutoff = now - cfg.retention_timedelta
 
+    # Once aggregation is in use, never delete rows it has not rolled up yet
+    watermark = get_aggregation_watermark()
+    if watermark is not None and watermark < cutoff:
+        cutoff = watermark
+
+    if is_postgres():
+        with db.engine.connect() as conn:
+            partitioned = is_partitioned(conn)
+        if partitioned:
+            return _drop_expired_partitions(cutoff)
+
     total_deleted = 0
     started_at = perf_counter()
 
@@ -25,13 +48,18 @@ def cleanup_price_history() -> int:
     # The surrounding Flask CLI command is already decorated with @with_appcontext,
     # so we reuse that single application context and database session here.
     for _ in range(cfg.max_batches_per_run):
-        deleted = (
-            db.session.query(PriceHistory)
-            .filter(PriceHistory.recorded_at < cutoff)
+        # DELETE ... LIMIT is not portable, so pick the batch's ids in a subquery
+        batch_ids = (
+            select(PriceHistory.id)
+            .where(PriceHistory.recorded_at < cutoff)
             .order_by(PriceHistory.recorded_at)
             .limit(cfg.delete_batch_size)
-            .delete(synchronize_session=False)
+            .scalar_subquery()
         )
+        deleted = db.session.execute(
+            delete(PriceHistory).where(PriceHistory.id.in_(batch_ids)),
+            execution_options={"synchronize_session": False},
+        ).rowcount
 
         if not deleted:
             db.session.rollback()
@@ -52,3 +80,22 @@ def cleanup_price_history() -> int:
 
     return total_deleted
 
+
+def _drop_expired_partitions(cutoff: datetime) -> int:
+    """Partition-drop retention; also tops up future partitions so ticks always have one to write to."""
+    started_at = perf_counter()
+    dropped = drop_expired_price_history_partitions(cutoff)
+    default_rows = delete_expired_default_partition_rows(cutoff)
+    ensure_price_history_partitions()
+
+    removed_rows = sum(dropped.values()) + default_rows
+    current_app.logger.info(
+        "PriceHistory partition cleanup completed",
+        extra={
+            "dropped_partitions": list(dropped),
+            "deleted_rows": removed_rows,
+            "cutoff": cutoff.isoformat(),
+            "duration_seconds": round(perf_counter() - started_at, 3),
+        },
+    )
+    return removed_rows
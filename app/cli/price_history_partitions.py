@@ -0,0 +1,224 @@
+"""
+Month-based range partitioning of price_history (PostgreSQL only).
+
+price_history grows by (inventory rows x ticks), so retention works on whole months: each month
+lives in its own partition (price_history_y2025m01, ...) and expired months are detached and dropped
+instead of deleted row by row. `flask price-history-partitions-ensure` creates months ahead of time
+and should run at least monthly (sim-workers and the cleanup also run it). Ticks also run from web
+requests, which never create partitions, so a DEFAULT partition (price_history_default) catches
+rows for months that have none yet; creating that month's partition later moves them out of it,
+and retention deletes expired rows from it.
+
+The ORM model keeps `id` as its primary key; on the partitioned table the real primary key is
+(id, recorded_at) because PostgreSQL requires the partition key in every unique constraint.
+Other databases (SQLite in dev/tests) keep a plain table and the batched DELETE cleanup.
+"""
+import re
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from flask import current_app
+from sqlalchemy import text
+
+from app.extensions import db
+from app.config.price_history_config import default_price_history_retention
+
+TABLE_NAME = "price_history"
+LEGACY_TABLE_NAME = "price_history_legacy"
+DEFAULT_PARTITION_NAME = "price_history_default"
+PARTITION_NAME_RE = re.compile(r"^price_history_y(\d{4})m(\d{2})$")
+
+
+def month_start(value: datetime) -> datetime:
+    """First instant of the month containing value."""
+    return datetime(value.year, value.month, 1)
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    """Shift a month-start datetime by a number of months."""
+    month_index = value.year * 12 + (value.month - 1) + months
+    return datetime(month_index // 12, month_index % 12 + 1, 1)
+
+
+def partition_name(month: datetime) -> str:
+    return f"{TABLE_NAME}_y{month.year:04d}m{month.month:02d}"
+
+
+def is_postgres() -> bool:
+    return db.engine.dialect.name == "postgresql"
+
+
+def is_partitioned(conn) -> bool:
+    """True if price_history is already a partitioned table."""
+    return bool(conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table pt "
+        "JOIN pg_class c ON c.oid = pt.partrelid "
+        "WHERE c.relname = :name AND c.relnamespace = 'public'::regnamespace"
+    ), {"name": TABLE_NAME}).scalar())
+
+
+def list_partitions(conn) -> List[str]:
+    """Names of the monthly partitions currently attached to price_history."""
+    rows = conn.execute(text(
+        "SELECT child.relname FROM pg_inherits i "
+        "JOIN pg_class parent ON parent.oid = i.inhparent "
+        "JOIN pg_class child ON child.oid = i.inhrelid "
+        "WHERE parent.relname = :name ORDER BY child.relname"
+    ), {"name": TABLE_NAME}).scalars().all()
+    return [name for name in rows if PARTITION_NAME_RE.match(name)]
+
+
+def _table_exists(conn, name: str) -> bool:
+    return conn.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name}).scalar()
+
+
+def _create_default_partition(conn) -> None:
+    conn.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION_NAME} PARTITION OF {TABLE_NAME} DEFAULT"))
+
+
+def _create_month_partition(conn, month: datetime) -> None:
+    """
+    Create the partition for a month. Rows for that month already in the DEFAULT partition are
+    moved into the new table before it is attached (PostgreSQL refuses to attach a range the
+    default partition still holds rows for).
+    """
+    name = partition_name(month)
+    bounds = f"FROM ('{month:%Y-%m-%d}') TO ('{add_months(month, 1):%Y-%m-%d}')"
+    if _table_exists(conn, name):
+        return
+    if not _table_exists(conn, DEFAULT_PARTITION_NAME):
+        conn.execute(text(f"CREATE TABLE {name} PARTITION OF {TABLE_NAME} FOR VALUES {bounds}"))
+        return
+    conn.execute(text(f"CREATE TABLE {name} (LIKE {TABLE_NAME} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    conn.execute(text(f"""
+        WITH moved AS (
+            DELETE FROM {DEFAULT_PARTITION_NAME}
+            WHERE recorded_at >= :start AND recorded_at < :end
+            RETURNING id, shop_id, item_id, price, recorded_at, gm_profile_id
+        )
+        INSERT INTO {name} (id, shop_id, item_id, price, recorded_at, gm_profile_id)
+        SELECT id, shop_id, item_id, price, recorded_at, gm_profile_id FROM moved
+    """), {"start": month, "end": add_months(month, 1)})
+    conn.execute(text(f"ALTER TABLE {TABLE_NAME} ATTACH PARTITION {name} FOR VALUES {bounds}"))
+
+
+def ensure_price_history_partitions(months_ahead: Optional[int] = None, now: Optional[datetime] = None) -> int:
+    """
+    Create the DEFAULT partition and partitions for the current month and the next `months_ahead`
+    months. Returns the number of month partitions checked (creation is idempotent); 0 if not applicable.
+    """
+    if not is_postgres():
+        return 0
+    months_ahead = default_price_history_retention.partition_months_ahead if months_ahead is None else months_ahead
+    first = month_start(now or datetime.utcnow())
+    with db.engine.begin() as conn:
+        if not is_partitioned(conn):
+            return 0
+        _create_default_partition(conn)
+        for offset in range(months_ahead + 1):
+            _create_month_partition(conn, add_months(first, offset))
+    return months_ahead + 1
+
+
+def drop_expired_price_history_partitions(cutoff: datetime) -> Dict[str, int]:
+    """
+    Detach and drop every monthly partition that ends on or before cutoff.
+    A partition that still holds rows newer than the cutoff is kept until the whole month expires.
+    Returns {partition name: estimated row count} for the dropped partitions; counts come from
+    planner statistics so retention never has to scan the data it is about to discard.
+    """
+    dropped = {}
+    with db.engine.begin() as conn:
+        for name in list_partitions(conn):
+            match = PARTITION_NAME_RE.match(name)
+            month = datetime(int(match.group(1)), int(match.group(2)), 1)
+            if add_months(month, 1) > cutoff:
+                continue
+            estimated_rows = conn.execute(
+                text("SELECT GREATEST(reltuples, 0)::bigint FROM pg_class WHERE relname = :name"),
+                {"name": name},
+            ).scalar() or 0
+            conn.execute(text(f"ALTER TABLE {TABLE_NAME} DETACH PARTITION {name}"))
+            conn.execute(text(f"DROP TABLE {name}"))
+            dropped[name] = int(estimated_rows)
+    return dropped
+
+
+def delete_expired_default_partition_rows(cutoff: datetime) -> int:
+    """
+    Delete rows older than cutoff from the DEFAULT partition, which only holds rows written before
+    their month's partition existed. Returns the number of rows deleted.
+    """
+    with db.engine.begin() as conn:
+        if not _table_exists(conn, DEFAULT_PARTITION_NAME):
+            return 0
+        return conn.execute(
+            text(f"DELETE FROM {DEFAULT_PARTITION_NAME} WHERE recorded_at < :cutoff"), {"cutoff": cutoff}
+        ).rowcount
+
+
+def migrate_price_history_to_partitions(drop_legacy: bool = False, months_ahead: Optional[int] = None) -> int:
+    """
+    Convert an existing plain price_history table into a month-partitioned one.
+
+    Runs in a single transaction: the old table is renamed to price_history_legacy, a partitioned
+    price_history with the same columns is created (reusing the id sequence), partitions covering
+    all existing data plus `months_ahead` future months are created and the rows are copied over.
+    The legacy table is kept unless drop_legacy is set. Returns the number of rows copied.
+    """
+    if not is_postgres():
+        raise RuntimeError("Partitioning price_history requires PostgreSQL.")
+    months_ahead = default_price_history_retention.partition_months_ahead if months_ahead is None else months_ahead
+
+    with db.engine.begin() as conn:
+        if is_partitioned(conn):
+            current_app.logger.info("price_history is already partitioned; nothing to migrate")
+            return 0
+
+        # Block writers (ticks) for the duration of the swap
+        conn.execute(text(f"LOCK TABLE {TABLE_NAME} IN ACCESS EXCLUSIVE MODE"))
+        conn.execute(text(f"ALTER TABLE {TABLE_NAME} RENAME TO {LEGACY_TABLE_NAME}"))
+        conn.execute(text(f"ALTER TABLE {LEGACY_TABLE_NAME} RENAME CONSTRAINT price_history_pkey TO price_history_legacy_pkey"))
+        conn.execute(text(
+            "ALTER INDEX IF EXISTS ix_price_history_shop_item_recorded "
+            "RENAME TO ix_price_history_legacy_shop_item_recorded"
+        ))
+
+        conn.execute(text(f"""
+            CREATE TABLE {TABLE_NAME} (
+                id INTEGER NOT NULL DEFAULT nextval('price_history_id_seq'),
+                shop_id INTEGER NOT NULL REFERENCES shops (shop_id),
+                item_id INTEGER NOT NULL REFERENCES items (item_id),
+                price DOUBLE PRECISION NOT NULL,
+                recorded_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+                gm_profile_id INTEGER NOT NULL REFERENCES gm_profile (id),
+                CONSTRAINT price_history_pkey PRIMARY KEY (id, recorded_at)
+            ) PARTITION BY RANGE (recorded_at)
+        """))
+        # Keep the sequence alive when the legacy table is dropped
+        conn.execute(text(f"ALTER SEQUENCE price_history_id_seq OWNED BY {TABLE_NAME}.id"))
+        conn.execute(text(
+            f"CREATE INDEX ix_price_history_shop_item_recorded ON {TABLE_NAME} (shop_id, item_id, recorded_at)"
+        ))
+
+        oldest = conn.execute(text(f"SELECT min(recorded_at) FROM {LEGACY_TABLE_NAME}")).scalar()
+        month = month_start(oldest or datetime.utcnow())
+        last = add_months(month_start(datetime.utcnow()), months_ahead)
+        while month <= last:
+            _create_month_partition(conn, month)
+            month = add_months(month, 1)
+        _create_default_partition(conn)
+
+        copied = conn.execute(text(f"""
+            INSERT INTO {TABLE_NAME} (id, shop_id, item_id, price, recorded_at, gm_profile_id)
+            SELECT id, shop_id, item_id, price, recorded_at, gm_profile_id FROM {LEGACY_TABLE_NAME}
+        """)).rowcount
+
+        if drop_legacy:
+            conn.execute(text(f"DROP TABLE {LEGACY_TABLE_NAME}"))
+
+    current_app.logger.info(
+        "Migrated price_history to monthly partitions",
+        extra={"rows_copied": copied, "legacy_dropped": drop_legacy},
+    )
+    return copied
@@ -0,0 +1,44 @@
+import multiprocessing as mp
+import signal
+
+from app.services.job_runner import run_worker
+
+
+def _worker_process_main(worker_index: int, poll_interval: float) -> None:
+    """
+    Entry point of one spawned worker process. Builds its own app (and DB pool) so no
+    connections are shared with the parent.
+    """
+    from app import app as flask_app
+
+    stopping = {"flag": False}
+
+    def _request_stop(signum, frame):
+        stopping["flag"] = True
+
+    signal.signal(signal.SIGTERM, _request_stop)
+    signal.signal(signal.SIGINT, _request_stop)
+
+    run_worker(flask_app, poll_interval=poll_interval, stop_check=lambda: stopping["flag"])
+
+
+def run_sim_workers(processes: int = 1, poll_interval: float = 1.0) -> None:
+    """
+    Start `processes` worker processes that execute queued SimulationJob rows and wait for them.
+    Ctrl+C / SIGTERM stops each worker after its current job.
+    """
+    ctx = mp.get_context("spawn")
+    workers = [
+        ctx.Process(target=_worker_process_main, args=(i, poll_interval), name=f"sim-worker-{i}")
+        for i in range(max(1, processes))
+    ]
+    for proc in workers:
+        proc.start()
+    try:
+        for proc in workers:
+            proc.join()
+    except KeyboardInterrupt:
+        for proc in workers:
+            proc.terminate()
+        for proc in workers:
+            proc.join(timeout=30)
@@ -10,11 +10,13 @@ class PriceHistoryRetentionConfig:
     retention_years: number of years of fine-grained history to keep.
     delete_batch_size: max rows to delete per batch in a cleanup run.
     max_batches_per_run: safety cap on number of batches in a single run.
+    partition_months_ahead: monthly price_history partitions to keep created ahead of now (PostgreSQL).
     """
 
     retention_years: int = 2
     delete_batch_size: int = 10_000
     max_batches_per_run: int = 50
+    partition_months_ahead: int = 3
 
     @property
     def retention_timedelta(self) -> timedelta:
@@ -15,10 +15,64 @@ class SimulationConfig:
     enable_tick_logging: bool = True
     log_file_path: str = "logs/simulation.log"
     
-    # Future expansion settings
-    enable_demand_simulation: bool = False
-    enable_supply_simulation: bool = False
-    enable_event_simulation: bool = False
+    # Price history tiers written by each tick: one packed PriceVector per tick (~4 bytes per price;
+    # see app/services/price_vectors.py) is the history charts and aggregation read. PriceHistory
+    # rows (one per shop item per tick, ~10x the storage) are only written when turned on here
+    record_price_history_rows: bool = False
+    record_price_vectors: bool = True
+    
+    # Refresh RegionalMarket/GlobalMarket aggregates every tick (app/services/economy/markets.py)
+    record_market_aggregates: bool = True
+    
+    # Trade-route price diffusion (app/services/economy/trade_network.py): each tick moves every
+    # (city, item) price this fraction towards its trade neighbours; 0 disables the stage.
+    # region_route_weight is the weight of the implicit route between two cities of one region.
+    trade_diffusion_rate: float = 0.2
+    region_route_weight: float = 1.0
+    
+    # Recompute only rows whose inputs changed; other rows drift from their last full price
+    # (app/services/economy/incremental.py). False reprices every row every tick.
+    incremental_pricing: bool = True
+    # Lazy pricing (needs incremental_pricing): ticks write only recomputed rows and, every
+    # lazy_compaction_interval ticks (0 = never), all rows; other prices are derived on read
+    # (app/services/economy/lazy.py). For large worlds where most shops are rarely visited.
+    lazy_pricing: bool = False
+    lazy_compaction_interval: int = 30
+    
+    # Monte Carlo price forecasts (app/services/economy/forecast.py): default ensemble size and
+    # horizon in ticks, and pool processes (0 = one per CPU, 1 = run in-process)
+    forecast_members: int = 100
+    forecast_days: int = 30
+    forecast_workers: int = 0
+    
+    # Mixed into the counter-based economy randomness (app/services/economy/rng.py); ticks are
+    # reproducible for a given seed, change it to get a different but still repeatable world
+    random_seed: int = 0
+    
+    # Supply simulation: restock inventory towards its target stock, closing this fraction of the
+    # gap per tick (app/services/economy/restock.py), and run ResourceNode production
+    # (app/services/economy/production.py) and crafting chains
+    enable_supply_simulation: bool = True
+    restock_rate: float = 0.1
+    # ResourceNode output is part of supply; one ProductionHistory row per node per tick
+    record_production_history: bool = True
+    # Production fills a listing up to this multiple of its restock target stock and no further;
+    # 0 lets deliveries grow stock without bound
+    production_capacity: float = 3.0
+    # Fraction of a transform's input stock crafted into its output per tick
+    # (app/services/economy/crafting.py); 0 disables crafting
+    crafting_rate: float = 0.25
+    
+    # Pay PlayerInvestment income and charge ShopMaintenance every tick
+    # (app/services/economy/settlement.py)
+    enable_settlement: bool = True
+    
+    # Event simulation: MarketEvent activation and timed expiry (app/services/economy/events.py)
+    enable_event_simulation: bool = True
+    
+    # Demand simulation: DemandModifier totals feed the price kernel; when off every row prices at
+    # a neutral 1.0 modifier (the "demand" stage of app/services/tick_pipeline.py)
+    enable_demand_simulation: bool = True
 
 # Default configuration instance
 default_config = SimulationConfig() 
\ No newline at end of file
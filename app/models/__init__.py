@@ -9,15 +9,23 @@ from .users import User
 # Then import other models that might depend on User
 from .backend import City, Shop, Item, ShopInventory, PriceHistory, MarketPulse, shop_cities
 from .price_history_aggregated import AggregatedPriceHistory
+from .price_rollup import PriceRollup
+from .price_vector import InventoryOrdinal, PriceVector
 from .users import RegistrationKey, GMProfile, Player, PlayerInventory, PlayerCharacter, CharacterEquipmentSlot, CharacterStat
 from .campaigns import Campaign, CampaignPlayer
 from .market import RegionalMarket, GlobalMarket, DemandModifier, ModifierTarget
+from .simulation_state import GMSimulationState
+from .jobs import SimulationJob
+from .maintenance import MaintenanceWatermark
+from .cache_version import CacheVersion
+from .trade_route import TradeRoute
 
-# Import production models (if uncommented and used)
-# from .production import ResourceNode, ProductionHistory, ResourceTransform
+# Import production models
+from .production import ResourceNode, ProductionHistory, ResourceTransform
 
-# Import economy models (if uncommented and used)
-# from .economy import MarketEvent, PlayerInvestment, ShopMaintenance
+# Import economy models
+from .economy import MarketEvent, PlayerInvestment, ShopMaintenance
+from .simulation_timer import SimulationTimer
 
 # You might need to adjust the import order or handle specific circular dependencies
 # if Flask-Migrate or SQLAlchemy throws errors during initialization.
@@ -28,14 +36,28 @@ __all__ = [
     'User',
     # backend.py
     'City', 'Shop', 'Item', 'ShopInventory', 'PriceHistory', 'MarketPulse', 'shop_cities', 'AggregatedPriceHistory',
+    # price_rollup.py, price_vector.py (price history tiers)
+    'PriceRollup', 'InventoryOrdinal', 'PriceVector',
     # users.py (other models)
     'RegistrationKey', 'GMProfile', 'Player', 'PlayerInventory', 'PlayerCharacter', 'CharacterEquipmentSlot', 'CharacterStat',
     # campaigns.py
     'Campaign', 'CampaignPlayer',
     # market.py
     'RegionalMarket', 'GlobalMarket', 'DemandModifier', 'ModifierTarget',
+    # simulation_state.py
+    'GMSimulationState',
+    # jobs.py
+    'SimulationJob',
+    # maintenance.py
+    'MaintenanceWatermark',
+    # cache_version.py
+    'CacheVersion',
+    # trade_route.py
+    'TradeRoute',
     # production.py
-    # 'ResourceNode', 'ProductionHistory', 'ResourceTransform', 
+    'ResourceNode', 'ProductionHistory', 'ResourceTransform',
     # economy.py
-    # 'MarketEvent', 'PlayerInvestment', 'ShopMaintenance',
+    'MarketEvent', 'PlayerInvestment', 'ShopMaintenance',
+    # simulation_timer.py
+    'SimulationTimer',
 ]
@@ -22,14 +22,15 @@ class City(db.Model):
 
     # Many-to-Many relationship with Shop
     shops = db.relationship("Shop", secondary=shop_cities, back_populates="cities")
-    # One-to-Many relationship with RegionalMarket (Defined in market.py)
-    regional_market = db.relationship("RegionalMarket", back_populates="city")
+    # One-to-Many relationship with RegionalMarket (Defined in market.py); the tick's aggregate
+    # rows go with their city
+    regional_market = db.relationship("RegionalMarket", back_populates="city", cascade="all, delete-orphan")
     # Relationship back to GMProfile
     gm_profile = db.relationship("GMProfile", back_populates="cities")
-    # Relationship to MarketEvent (Defined in economy.py) - Commented out until implemented
-    # market_events = db.relationship("MarketEvent", back_populates="city")
-    # Relationship to ResourceNode (Defined in production.py) - Commented out until implemented
-    # resource_nodes = db.relationship("ResourceNode", back_populates="city")
+    # Relationship to MarketEvent (Defined in economy.py)
+    market_events = db.relationship("MarketEvent", back_populates="city")
+    # Relationship to ResourceNode (Defined in production.py)
+    resource_nodes = db.relationship("ResourceNode", back_populates="city")
 
     def __repr__(self):
         return f"<City {self.name} (Size: {self.size}, Population: {self.population}, Region: {self.region})>"
@@ -46,10 +47,10 @@ class Shop(db.Model):
     cities = db.relationship("City", secondary=shop_cities, back_populates="shops")
     # Many-to-Many relationship with Item through ShopInventory
     inventory = db.relationship("ShopInventory", back_populates="shop")
-    # Relationship to PlayerInvestment (Defined in economy.py) - Commented out until implemented
-    # investments = db.relationship("PlayerInvestment", back_populates="shop")
-    # Relationship to ShopMaintenance (Defined in economy.py) - Commented out until implemented
-    # maintenance = db.relationship("ShopMaintenance", back_populates="shop")
+    # Relationship to PlayerInvestment (Defined in economy.py)
+    investments = db.relationship("PlayerInvestment", back_populates="shop")
+    # Relationship to ShopMaintenance (Defined in economy.py)
+    maintenance = db.relationship("ShopMaintenance", back_populates="shop")
     # Relationship back to GMProfile
     gm_profile = db.relationship("GMProfile", back_populates="shops")
 
@@ -79,18 +80,18 @@ class Item(db.Model):
 
     # Many-to-Many relationship with Shop through ShopInventory
     inventory = db.relationship("ShopInventory", back_populates="item")
-    # One-to-Many relationship with RegionalMarket (Defined in market.py)
-    regional_market = db.relationship("RegionalMarket", back_populates="item")
-    # One-to-Many relationship with GlobalMarket (Defined in market.py)
-    global_market = db.relationship("GlobalMarket", back_populates="item")
+    # One-to-Many relationships with RegionalMarket / GlobalMarket (Defined in market.py); the tick's
+    # aggregate rows go with their item
+    regional_market = db.relationship("RegionalMarket", back_populates="item", cascade="all, delete-orphan")
+    global_market = db.relationship("GlobalMarket", back_populates="item", cascade="all, delete-orphan")
     # Relationship to PlayerInventory (Defined in users.py)
     player_inventories = db.relationship("PlayerInventory", back_populates="item") # Renamed to avoid conflict
-    # Relationship to ResourceNode (Defined in production.py) - Commented out until implemented
-    # resource_nodes = db.relationship("ResourceNode", back_populates="item")
-    # Relationship to ResourceTransform (Input) (Defined in production.py) - Commented out until implemented
-    # input_transforms = db.relationship("ResourceTransform", foreign_keys="ResourceTransform.input_item_id", back_populates="input_item")
-    # Relationship to ResourceTransform (Output) (Defined in production.py) - Commented out until implemented
-    # output_transforms = db.relationship("ResourceTransform", foreign_keys="ResourceTransform.output_item_id", back_populates="output_item")
+    # Relationship to ResourceNode (Defined in production.py)
+    resource_nodes = db.relationship("ResourceNode", back_populates="item")
+    # Relationship to ResourceTransform (Input) (Defined in production.py)
+    input_transforms = db.relationship("ResourceTransform", foreign_keys="ResourceTransform.input_item_id", back_populates="input_item")
+    # Relationship to ResourceTransform (Output) (Defined in production.py)
+    output_transforms = db.relationship("ResourceTransform", foreign_keys="ResourceTransform.output_item_id", back_populates="output_item")
     # Relationship back to GMProfile
     gm_profile = db.relationship("GMProfile", back_populates="items")
 
@@ -156,6 +157,13 @@ class ShopInventory(db.Model):
     stock = db.Column(db.Integer, default=0)
     dynamic_price = db.Column(db.Float, nullable=False)
     sourcing_preference = db.Column(db.Enum("regional", "global", "hybrid", name="sourcing_preference"), default="hybrid")
+    # Incremental pricing (app/services/economy/incremental.py): price at neutral fluctuation and the
+    # stock it was computed for, as of the row's last full recompute (None = never recomputed)
+    anchor_price = db.Column(db.Float, nullable=True)
+    priced_stock = db.Column(db.Integer, nullable=True)
+    # Tick dynamic_price was materialized at; with lazy pricing (app/services/economy/lazy.py) later
+    # prices are derived on read from anchor_price until the row is written again
+    priced_tick = db.Column(db.Integer, nullable=True)
 
     # Relationships for accessing item and shop details
     shop = db.relationship("Shop", back_populates="inventory")
@@ -169,7 +177,11 @@ class ShopInventory(db.Model):
 
 
 class PriceHistory(db.Model):
-    """One snapshot per (shop, item) per tick for stock-style charts. Recorded in same transaction as tick."""
+    """
+    One snapshot per (shop, item) per tick for stock-style charts. Recorded in same transaction as tick.
+    On PostgreSQL the table can be range-partitioned by recorded_at month (see
+    app/cli/price_history_partitions.py); there the database primary key is (id, recorded_at).
+    """
     __tablename__ = "price_history"
     __table_args__ = (Index("ix_price_history_shop_item_recorded", "shop_id", "item_id", "recorded_at"),)
 
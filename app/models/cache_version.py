@@ -0,0 +1,29 @@
+from datetime import datetime
+
+from app.extensions import db
+
+
+class CacheVersion(db.Model):
+    """
+    Monotonic version counter per (cache kind, GM).
+
+    In-process caches derived from the database (modifier index, catalog arrays, ...) remember the
+    version they were built from and rebuild when it changes. Versions are bumped automatically
+    when watched models are flushed (see app/services/cache_invalidation.py), in the same
+    transaction as the change, so every worker process sees the bump exactly when the data changes.
+    """
+
+    __tablename__ = "cache_versions"
+    __table_args__ = (
+        db.UniqueConstraint("kind", "gm_profile_id", name="uq_cache_versions_kind_gm"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    # modifiers, catalog, ...
+    kind = db.Column(db.String(32), nullable=False)
+    gm_profile_id = db.Column(db.Integer, db.ForeignKey("gm_profile.id"), nullable=False)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<CacheVersion {self.kind} gm={self.gm_profile_id} v{self.version}>"
@@ -23,6 +23,10 @@ class MarketEvent(db.Model):
     end_date = db.Column(db.DateTime, nullable=True)
     is_active = db.Column(db.Boolean, default=True)
     gm_profile_id = db.Column(db.Integer, db.ForeignKey("gm_profile.id"), nullable=False)
+    # Game-clock lifetime: the tick the event started affecting the world and how many ticks it
+    # lasts (None = until deactivated); expiry is scheduled as a SimulationTimer
+    activated_tick = db.Column(db.Integer, nullable=True)
+    duration_ticks = db.Column(db.Integer, nullable=True)
     
     # Relationships
     city = db.relationship("City", back_populates="market_events")
@@ -42,6 +46,10 @@ class PlayerInvestment(db.Model):
     income_yield = db.Column(db.Float, nullable=False)
     last_payout = db.Column(db.DateTime, nullable=False, default=datetime.utcnow) # Added default
     gm_profile_id = db.Column(db.Integer, db.ForeignKey("gm_profile.id"), nullable=False)
+    # Game clock of the last settlement (None = not settled yet) and the fractional currency
+    # carried over because Player.currency is whole units (see app/services/economy/settlement.py)
+    last_payout_tick = db.Column(db.Integer, nullable=True)
+    pending_income = db.Column(db.Float, nullable=False, default=0.0)
     
     # Relationships
     player = db.relationship("Player", back_populates="investments")
@@ -61,6 +69,8 @@ class ShopMaintenance(db.Model):
     daily_cost = db.Column(db.Float, nullable=False)
     last_payment = db.Column(db.DateTime, nullable=False, default=datetime.utcnow) # Added default
     gm_profile_id = db.Column(db.Integer, db.ForeignKey("gm_profile.id"), nullable=False)
+    # Game clock of the last settlement (None = not settled yet)
+    last_payment_tick = db.Column(db.Integer, nullable=True)
     
     # Relationships
     shop = db.relationship("Shop", back_populates="maintenance")
@@ -0,0 +1,77 @@
+from datetime import datetime
+
+from app.extensions import db
+
+
+class SimulationJob(db.Model):
+    """
+    A unit of background work (simulate a period, seed a world, aggregate price history,
+    forecast prices).
+
+    Rows act as the job queue: GM endpoints insert 'queued' rows, worker processes claim them,
+    report progress counters while running and check cancel_requested between steps.
+    gm_profile_id is NULL for system-wide jobs such as price history aggregation.
+    """
+
+    __tablename__ = "simulation_jobs"
+    __table_args__ = (db.Index("ix_simulation_jobs_status_id", "status", "id"),)
+
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_SUCCEEDED = "succeeded"
+    STATUS_FAILED = "failed"
+    STATUS_CANCELLED = "cancelled"
+    ACTIVE_STATUSES = (STATUS_QUEUED, STATUS_RUNNING)
+
+    id = db.Column(db.Integer, primary_key=True)
+    gm_profile_id = db.Column(db.Integer, db.ForeignKey("gm_profile.id"), nullable=True, index=True)
+
+    # simulate_period, seed_world, aggregate_price_history, price_forecast
+    kind = db.Column(db.String(32), nullable=False)
+    params = db.Column(db.JSON, nullable=True)
+
+    status = db.Column(db.String(16), nullable=False, default=STATUS_QUEUED)
+    progress_current = db.Column(db.Integer, nullable=False, default=0)
+    progress_total = db.Column(db.Integer, nullable=False, default=0)
+    message = db.Column(db.String(255), nullable=True)
+    result = db.Column(db.JSON, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    cancel_requested = db.Column(db.Boolean, nullable=False, default=False)
+
+    worker_id = db.Column(db.String(64), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    # Touched on every progress update; lets a restarted worker detect jobs orphaned by a crash
+    heartbeat_at = db.Column(db.DateTime, nullable=True)
+    # Requeued jobs are not claimed again before this time (retry backoff)
+    not_before = db.Column(db.DateTime, nullable=True)
+
+    @property
+    def is_active(self):
+        return self.status in self.ACTIVE_STATUSES
+
+    def to_dict(self):
+        """Serialize for the progress endpoint."""
+        percent = None
+        if self.progress_total:
+            percent = round(100.0 * self.progress_current / self.progress_total, 1)
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "params": self.params or {},
+            "status": self.status,
+            "progress_current": self.progress_current,
+            "progress_total": self.progress_total,
+            "percent": percent,
+            "message": self.message,
+            "result": self.result,
+            "error": self.error,
+            "cancel_requested": bool(self.cancel_requested),
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+    def __repr__(self):
+        return f"<SimulationJob {self.id} kind={self.kind} status={self.status} {self.progress_current}/{self.progress_total}>"
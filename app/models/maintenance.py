@@ -0,0 +1,27 @@
+from datetime import datetime
+
+from app.extensions import db
+
+
+class MaintenanceWatermark(db.Model):
+    """
+    Progress marker for incremental maintenance jobs, one row per job name.
+
+    position is the exclusive upper bound of the data the job has already processed, so the next
+    run only looks at rows at or after it (e.g. price history aggregation).
+    """
+
+    __tablename__ = "maintenance_watermarks"
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(64), nullable=False, unique=True)
+    position = db.Column(db.DateTime, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @staticmethod
+    def get_position(name):
+        """Current watermark for a job, or None if it has never run."""
+        return db.session.query(MaintenanceWatermark.position).filter_by(name=name).scalar()
+
+    def __repr__(self):
+        return f"<MaintenanceWatermark {self.name}={self.position}>"
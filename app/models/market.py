@@ -5,6 +5,10 @@ from datetime import datetime
 class RegionalMarket(db.Model):
     """Tracks supply and demand for items within a region (linked to a City)."""
     __tablename__ = "regional_markets"
+    __table_args__ = (
+        # One row per (city, item); the simulation tick upserts into it
+        db.UniqueConstraint("city_id", "item_id", name="uq_regional_markets_city_item"),
+    )
     
     market_id = db.Column(db.Integer, primary_key=True)
     city_id = db.Column(db.Integer, db.ForeignKey("cities.city_id"), nullable=False)
@@ -12,6 +16,8 @@ class RegionalMarket(db.Model):
     total_supply = db.Column(db.Integer, default=0)
     total_demand = db.Column(db.Integer, default=0)
     average_price = db.Column(db.Float, nullable=False)
+    # Number of shop listings aggregated into this row
+    listing_count = db.Column(db.Integer, nullable=False, default=0)
     last_updated = db.Column(db.DateTime, default=datetime.utcnow)
     gm_profile_id = db.Column(db.Integer, db.ForeignKey("gm_profile.id"), nullable=False)
 
@@ -28,12 +34,19 @@ class RegionalMarket(db.Model):
 class GlobalMarket(db.Model):
     """Tracks global supply and demand for items."""
     __tablename__ = "global_markets"
+    __table_args__ = (
+        # One row per (GM, item): a GM's shops can stock another GM's items, and each GM's world
+        # keeps its own aggregate; the simulation tick upserts into it
+        db.UniqueConstraint("gm_profile_id", "item_id", name="uq_global_markets_gm_item"),
+    )
     
     market_id = db.Column(db.Integer, primary_key=True)
-    item_id = db.Column(db.Integer, db.ForeignKey("items.item_id"), nullable=False, unique=True) # Should be unique per item
+    item_id = db.Column(db.Integer, db.ForeignKey("items.item_id"), nullable=False)
     total_supply = db.Column(db.Integer, default=0)
     total_demand = db.Column(db.Integer, default=0)
     average_price = db.Column(db.Float, nullable=False)
+    # Number of shop listings aggregated into this row
+    listing_count = db.Column(db.Integer, nullable=False, default=0)
     last_updated = db.Column(db.DateTime, default=datetime.utcnow)
     gm_profile_id = db.Column(db.Integer, db.ForeignKey("gm_profile.id"), nullable=False) # Assuming GM owns global market entries too?
 
@@ -12,6 +12,13 @@ class AggregatedPriceHistory(db.Model):
     """
 
     __tablename__ = "price_history_aggregated"
+    __table_args__ = (
+        # One row per bucket; incremental aggregation upserts into it
+        db.UniqueConstraint(
+            "gm_profile_id", "shop_id", "item_id", "period_type", "period_start",
+            name="uq_price_history_aggregated_bucket",
+        ),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     gm_profile_id = db.Column(db.Integer, nullable=False, index=True)
@@ -33,4 +40,5 @@ class AggregatedPriceHistory(db.Model):
     sample_count = db.Column(db.Integer, nullable=False, default=0)
 
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -0,0 +1,48 @@
+from app.extensions import db
+
+
+class PriceRollup(db.Model):
+    """
+    Running OHLC bucket of one shop item's price at a fixed resolution (week, month).
+
+    Maintained by the simulation tick with upserts, so price charts read a few hundred buckets
+    instead of scanning raw history (daily points come from PriceVector). Buckets are keyed by game
+    tick (one tick is one game day), so a year of ticks run in seconds by a background job still
+    spans 52 week buckets; average price is price_sum / sample_count.
+    """
+
+    __tablename__ = "price_rollups"
+    __table_args__ = (
+        db.UniqueConstraint("shop_id", "item_id", "resolution", "bucket_start", name="uq_price_rollups_bucket"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    gm_profile_id = db.Column(db.Integer, db.ForeignKey("gm_profile.id"), nullable=False, index=True)
+    shop_id = db.Column(db.Integer, db.ForeignKey("shops.shop_id"), nullable=False)
+    item_id = db.Column(db.Integer, db.ForeignKey("items.item_id"), nullable=False)
+
+    # week, month
+    resolution = db.Column(db.String(8), nullable=False)
+    # First tick of the bucket (see app/services/price_rollups.py)
+    bucket_start = db.Column(db.Integer, nullable=False)
+
+    open_price = db.Column(db.Float, nullable=False)
+    high_price = db.Column(db.Float, nullable=False)
+    low_price = db.Column(db.Float, nullable=False)
+    close_price = db.Column(db.Float, nullable=False)
+    price_sum = db.Column(db.Float, nullable=False, default=0.0)
+    sample_count = db.Column(db.Integer, nullable=False, default=0)
+
+    # Ticks of the first/last sample folded into the bucket
+    first_tick = db.Column(db.Integer, nullable=False)
+    last_tick = db.Column(db.Integer, nullable=False)
+
+    @property
+    def avg_price(self):
+        return self.price_sum / self.sample_count if self.sample_count else self.close_price
+
+    def __repr__(self):
+        return (
+            f"<PriceRollup {self.resolution} shop_id={self.shop_id} item_id={self.item_id} "
+            f"at tick {self.bucket_start} close={self.close_price} n={self.sample_count}>"
+        )
@@ -0,0 +1,52 @@
+from datetime import datetime
+
+from app.extensions import db
+
+
+class InventoryOrdinal(db.Model):
+    """
+    Stable position of a (shop, item) pair inside a GM's PriceVector arrays.
+
+    Ordinals are assigned once, in order of first appearance, and never reused, so the same
+    byte offset refers to the same shop item in every tick's vector.
+    """
+
+    __tablename__ = "inventory_ordinals"
+    __table_args__ = (
+        db.UniqueConstraint("gm_profile_id", "shop_id", "item_id", name="uq_inventory_ordinals_shop_item"),
+        db.UniqueConstraint("gm_profile_id", "ordinal", name="uq_inventory_ordinals_ordinal"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    gm_profile_id = db.Column(db.Integer, db.ForeignKey("gm_profile.id"), nullable=False)
+    ordinal = db.Column(db.Integer, nullable=False)
+    shop_id = db.Column(db.Integer, nullable=False)
+    item_id = db.Column(db.Integer, nullable=False)
+
+    def __repr__(self):
+        return f"<InventoryOrdinal gm={self.gm_profile_id} #{self.ordinal} shop_id={self.shop_id} item_id={self.item_id}>"
+
+
+class PriceVector(db.Model):
+    """
+    Compact price history tier: every shop item price of one GM at one tick, packed as a
+    little-endian float32 array indexed by InventoryOrdinal.ordinal (NaN = not stocked that tick).
+
+    About 4 bytes per price point instead of a PriceHistory row per point.
+    """
+
+    __tablename__ = "price_vectors"
+    __table_args__ = (
+        db.UniqueConstraint("gm_profile_id", "tick", name="uq_price_vectors_gm_tick"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    gm_profile_id = db.Column(db.Integer, db.ForeignKey("gm_profile.id"), nullable=False)
+    tick = db.Column(db.Integer, nullable=False)
+    # Number of float32 slots in prices
+    length = db.Column(db.Integer, nullable=False)
+    prices = db.Column(db.LargeBinary, nullable=False)
+    recorded_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<PriceVector gm={self.gm_profile_id} tick={self.tick} length={self.length}>"
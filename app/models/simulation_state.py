@@ -0,0 +1,59 @@
+from datetime import datetime
+
+from sqlalchemy.exc import IntegrityError
+
+from app.extensions import db
+
+
+class GMSimulationState(db.Model):
+    """
+    Per-GM simulation clock and speed setting.
+
+    Replaces the state that used to live on the process-wide SimulationEngine singleton,
+    so every GM has an independent speed/tick counter and all workers see the same values.
+    One row per GM, created lazily on first access.
+    """
+
+    __tablename__ = "gm_simulation_state"
+
+    id = db.Column(db.Integer, primary_key=True)
+    gm_profile_id = db.Column(db.Integer, db.ForeignKey("gm_profile.id"), nullable=False, unique=True, index=True)
+
+    # pause, day, week, month, year
+    current_speed = db.Column(db.String(16), nullable=False, default="pause")
+
+    # Number of ticks (game days) completed for this GM's world
+    current_tick = db.Column(db.Integer, nullable=False, default=0)
+    last_tick_time = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    # Digest of the world-wide pricing inputs (modifiers, items, events, routes, topology, settings)
+    # at the last incremental pricing pass; a mismatch forces a full recompute
+    pricing_fingerprint = db.Column(db.String(40), nullable=True)
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    @staticmethod
+    def get_or_create(gm_profile_id, refresh=False):
+        """
+        Return the state row for a GM, inserting it on first use.
+        refresh=True re-reads the row from the database even if it is already in the session
+        (used after acquiring the tick lock, so decisions are made on committed values).
+        """
+        query = GMSimulationState.query.filter_by(gm_profile_id=gm_profile_id)
+        if refresh:
+            query = query.execution_options(populate_existing=True)
+        state = query.first()
+        if state:
+            return state
+
+        # Two requests can race to create the row; the unique constraint decides the winner.
+        try:
+            with db.session.begin_nested():
+                state = GMSimulationState(gm_profile_id=gm_profile_id)
+                db.session.add(state)
+        except IntegrityError:
+            state = GMSimulationState.query.filter_by(gm_profile_id=gm_profile_id).one()
+        return state
+
+    def __repr__(self):
+        return f"<GMSimulationState gm_profile_id={self.gm_profile_id} speed={self.current_speed} tick={self.current_tick}>"
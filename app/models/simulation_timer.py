@@ -0,0 +1,27 @@
+from app.extensions import db
+
+
+class SimulationTimer(db.Model):
+    """
+    Persisted timer: entity `entity_id` of kind `kind` is due at game tick `due_tick`.
+
+    The (gm_profile_id, due_tick) index makes the table a priority queue per GM, so each tick reads
+    only the timers that are due instead of scanning every shop or event. One timer per
+    (GM, kind, entity); rescheduling updates due_tick in place (see app/services/timers.py).
+    """
+
+    __tablename__ = "simulation_timers"
+    __table_args__ = (
+        db.UniqueConstraint("gm_profile_id", "kind", "entity_id", name="uq_simulation_timers_entity"),
+        db.Index("ix_simulation_timers_due", "gm_profile_id", "due_tick"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    gm_profile_id = db.Column(db.Integer, db.ForeignKey("gm_profile.id"), nullable=False)
+    # restock (entity = shop_id), event_expiry (entity = event_id), ...
+    kind = db.Column(db.String(32), nullable=False)
+    entity_id = db.Column(db.Integer, nullable=False)
+    due_tick = db.Column(db.Integer, nullable=False)
+
+    def __repr__(self):
+        return f"<SimulationTimer {self.kind} {self.entity_id} gm={self.gm_profile_id} due={self.due_tick}>"
@@ -0,0 +1,29 @@
+from datetime import datetime
+
+from app.extensions import db
+
+
+class TradeRoute(db.Model):
+    """
+    GM-defined trade link between two cities.
+
+    Routes are two-way: a row (A, B) lets price signals flow in both directions, so only one
+    direction needs to be stored. weight scales how strongly the two markets pull on each other
+    relative to the implicit links between cities of the same region
+    (see app/services/economy/trade_network.py).
+    """
+
+    __tablename__ = "trade_routes"
+    __table_args__ = (
+        db.UniqueConstraint("from_city_id", "to_city_id", name="uq_trade_routes_cities"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    gm_profile_id = db.Column(db.Integer, db.ForeignKey("gm_profile.id"), nullable=False, index=True)
+    from_city_id = db.Column(db.Integer, db.ForeignKey("cities.city_id"), nullable=False, index=True)
+    to_city_id = db.Column(db.Integer, db.ForeignKey("cities.city_id"), nullable=False, index=True)
+    weight = db.Column(db.Float, nullable=False, default=1.0)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<TradeRoute {self.from_city_id} <-> {self.to_city_id} (weight {self.weight})>"
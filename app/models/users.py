@@ -149,6 +149,10 @@ class Player(db.Model):
 
     # Relationship to player's inventory
     inventory = db.relationship("PlayerInventory", back_populates="player")
+    # Relationship to the player's shop investments (Defined in economy.py)
+    investments = db.relationship("PlayerInvestment", back_populates="player")
+    # Relationship to resource nodes the player owns (Defined in production.py)
+    owned_resources = db.relationship("ResourceNode", back_populates="owner")
     # Relationship to the player's characters (one player can have multiple characters per GM/campaign)
     characters = db.relationship("PlayerCharacter", back_populates="player", cascade="all, delete-orphan")
 
@@ -17,7 +17,8 @@ from app.routes.handlers.gm_campaigns_handler import (
     sync_players_to_campaign,
 )
 from app.routes.handlers.gm_simulation_handler import (
-    home, seed_world, run_simulation_tick, update_simulation_speed, debug_form
+    home, seed_world, run_simulation_tick, update_simulation_speed, debug_form,
+    job_status, cancel_job, price_forecast
 )
 from app.routes.handlers.gm_players_handler import (
     list_players,
@@ -195,6 +196,24 @@ def gm_update_simulation_speed():
     """Update the simulation speed setting and run the appropriate time period"""
     return update_simulation_speed()
 
+@gm_bp.route("/simulation/forecast", methods=["GET"])
+@login_required
+def gm_price_forecast():
+    """Queue a Monte Carlo price forecast and return its job as JSON"""
+    return price_forecast()
+
+@gm_bp.route("/jobs/<int:job_id>", methods=["GET"])
+@login_required
+def gm_job_status(job_id):
+    """Return background job progress as JSON"""
+    return job_status(job_id)
+
+@gm_bp.route("/jobs/<int:job_id>/cancel", methods=["POST"])
+@login_required
+def gm_cancel_job(job_id):
+    """Cancel a queued or running background job"""
+    return cancel_job(job_id)
+
 
 # Player / Character management routes
 @gm_bp.route("/players/")
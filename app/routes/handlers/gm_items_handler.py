@@ -7,17 +7,20 @@ from flask_login import current_user
 from app.extensions import db
 from app.models.backend import Shop, Item, ShopInventory
 from app.services.logging_config import gm_logger
+from app.services.economy import current_prices, get_shop_topology
 from app.routes.handlers.gm_helpers import get_current_gm_profile
 import json
 from collections import defaultdict
 
 
-def group_shops_for_display(shops):
+def group_shops_for_display(shops, topology=None):
     """
     Groups shops by City -> Shop Type -> List of Shops
     
     Args:
         shops: List of Shop objects (must have cities relationship and type attribute)
+        topology: Optional cached ShopTopology of the shops' GM; city links are then read from
+                  its arrays instead of loading each shop's cities relationship
     
     Returns:
         dict: Nested dictionary structure: {city_name: {shop_type: [shop1, shop2, ...]}}
@@ -26,10 +29,12 @@ def group_shops_for_display(shops):
     
     for shop in shops:
         # A shop can be in multiple cities
-        for city in shop.cities:
-            city_name = city.name
-            shop_type = shop.type
-            grouped[city_name][shop_type].append(shop)
+        if topology is not None:
+            city_names = topology.city_names_of(shop.shop_id)
+        else:
+            city_names = [city.name for city in shop.cities]
+        for city_name in city_names:
+            grouped[city_name][shop.type].append(shop)
     
     # Convert defaultdict to regular dict for template rendering
     return {city: dict(types) for city, types in grouped.items()}
@@ -149,7 +154,7 @@ def add_item():
     if redirect_response:
         return redirect_response
     shops = Shop.query.filter_by(gm_profile_id=gm_profile.id).all()
-    grouped_shops = group_shops_for_display(shops)
+    grouped_shops = group_shops_for_display(shops, get_shop_topology(gm_profile.id))
     return render_template("GM_add_item.html", shops=shops, grouped_shops=grouped_shops)
 
 
@@ -220,7 +225,7 @@ def edit_item(item_id):
     if redirect_response:
         return redirect_response
     shops = Shop.query.filter_by(gm_profile_id=gm_profile.id).all()
-    grouped_shops = group_shops_for_display(shops)
+    grouped_shops = group_shops_for_display(shops, get_shop_topology(gm_profile.id))
     linked_shop_ids = [inv.shop_id for inv in item.inventory if inv.shop_id]
     return render_template("GM_edit_item.html", item=item, shops=shops, grouped_shops=grouped_shops, linked_shop_ids=linked_shop_ids)
 
@@ -233,8 +238,9 @@ def item_detail(item_id):
     if redirect_response:
         return redirect_response
     shops = Shop.query.filter_by(gm_profile_id=gm_profile.id).all()
-    grouped_shops = group_shops_for_display(shops)
+    grouped_shops = group_shops_for_display(shops, get_shop_topology(gm_profile.id))
     linked_shop_ids = [inv.shop_id for inv in item.inventory if inv.shop_id]
+    prices = current_prices(gm_profile.id, [inv.inventory_id for inv in item.inventory])
     
     # Parse properties_json for display
     properties = {}
@@ -244,7 +250,7 @@ def item_detail(item_id):
         except json.JSONDecodeError:
             properties = {}
     
-    return render_template("GM_item_detail.html", item=item, grouped_shops=grouped_shops, linked_shop_ids=linked_shop_ids, properties=properties)
+    return render_template("GM_item_detail.html", item=item, grouped_shops=grouped_shops, linked_shop_ids=linked_shop_ids, properties=properties, prices=prices)
 
 
 def delete_item(item_id):
@@ -8,6 +8,7 @@ from app.extensions import db
 from app.models.backend import City, Shop, Item, ShopInventory
 from app.services.logging_config import gm_logger
 from app.routes.handlers.gm_helpers import get_current_gm_profile
+from app.services.economy import current_prices
 from collections import defaultdict
 
 
@@ -202,8 +203,11 @@ def view_shop_items(shop_id):
         for inv in shop_inventory:
             gm_logger.debug(f"Inventory entry: item_id={inv.item_id}, stock={inv.stock}, price={inv.dynamic_price}")
         
+        # Prices as of the current tick (lazily priced rows are evaluated here)
+        prices = current_prices(shop.gm_profile_id, [inv.inventory_id for inv in shop_inventory])
+
         gm_logger.info(f"Rendering template GM_view_shop_items.html with shop_id={shop_id}")
-        return render_template("GM_view_shop_items.html", items=items, shop=shop, city=city)
+        return render_template("GM_view_shop_items.html", items=items, shop=shop, city=city, prices=prices)
         
     except Exception as e:
         gm_logger.error(f"Error in view_shop_items for shop_id {shop_id}: {str(e)}", exc_info=True)
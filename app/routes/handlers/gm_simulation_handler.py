@@ -2,26 +2,37 @@
 GM Simulation Handler
 Handles all simulation-related business logic for GM routes
 """
+import logging
 from flask import render_template, request, redirect, url_for, flash, jsonify, session
 from flask_login import current_user
 from app.services.logging_config import gm_logger
-from app.services.simulation import SimulationEngine
-from app.scripts.seeder import seed_gm_data
+from app.services.simulation import SimulationEngine, TickInProgressError
+from app.services.job_runner import enqueue_job, find_active_job, request_cancel
+from app.models.jobs import SimulationJob
+from app.config.simulation_config import default_config
 from app.extensions import db
 from app.routes.handlers.gm_helpers import get_current_gm_profile
 from datetime import datetime
 
 
-def _debug_request(request_type: str, route: str):
-    """Debug helper for request logging."""
-    simulation_engine = SimulationEngine()
+def _debug_request(request_type: str, route: str, state=None):
+    """Debug helper for request logging (no-op unless the gm logger is at DEBUG)."""
+    if not gm_logger.isEnabledFor(logging.DEBUG):
+        return
     gm_logger.debug(
-        f"{request_type} request to {route}:\n"
-        f"  Method: {request.method}\n"
-        f"  Form data: {request.form}\n"
-        f"  Args: {request.args}\n"
-        f"  Current speed: {simulation_engine.current_speed}\n"
-        f"  Last tick: {simulation_engine.last_tick_time}"
+        "%s request to %s:\n"
+        "  Method: %s\n"
+        "  Form data: %s\n"
+        "  Args: %s\n"
+        "  Current speed: %s\n"
+        "  Last tick: %s",
+        request_type,
+        route,
+        request.method,
+        request.form,
+        request.args,
+        state.current_speed if state else 'n/a',
+        state.last_tick_time if state else 'n/a',
     )
 
 
@@ -32,41 +43,51 @@ def home():
         return redirect_response
 
     simulation_engine = SimulationEngine()
-    _debug_request("GET", "/gm/")
+    state = simulation_engine.get_state(gm_profile.id)
+    db.session.commit()  # persist the state row if this is the GM's first visit
+    _debug_request("GET", "/gm/", state)
     
-    # Check if we should run a tick based on current speed
-    if simulation_engine.should_run_tick():
-        try:
-            stats = simulation_engine.run_tick(gm_profile.id)
+    # Run a tick if one is due for this GM's speed (skipped if another worker is already ticking)
+    try:
+        stats = simulation_engine.run_due_tick(gm_profile.id)
+        if stats:
             flash(
                 f"Simulation tick completed: Updated {stats['shops_updated']} shops "
                 f"and {stats['items_updated']} items.",
                 "system"
             )
-        except Exception as e:
-            flash(f"Error during simulation tick: {str(e)}", "danger")
+    except Exception as e:
+        flash(f"Error during simulation tick: {str(e)}", "danger")
+    state = simulation_engine.get_state(gm_profile.id)
     
     # Log current simulation state
-    gm_logger.debug(
-        f"GM dashboard state:\n"
-        f"  User ID: {gm_profile.id}\n"
-        f"  Current speed: {simulation_engine.current_speed}\n"
-        f"  Last tick: {simulation_engine.last_tick_time}\n"
-        f"  Time since last tick: {datetime.now() - simulation_engine.last_tick_time}"
-    )
+    if gm_logger.isEnabledFor(logging.DEBUG):
+        gm_logger.debug(
+            "GM dashboard state:\n"
+            "  User ID: %s\n"
+            "  Current speed: %s\n"
+            "  Current tick: %s\n"
+            "  Last tick: %s\n"
+            "  Time since last tick: %s",
+            gm_profile.id,
+            state.current_speed,
+            state.current_tick,
+            state.last_tick_time,
+            datetime.utcnow() - state.last_tick_time,
+        )
     
     return render_template(
         "GM_Home.html",
-        current_tick=0,  # Will be stored in database
-        current_speed=simulation_engine.current_speed,
-        last_tick_time=simulation_engine.last_tick_time,
-        simulation_status="active" if simulation_engine.current_speed != "pause" else "paused"
+        current_tick=state.current_tick,
+        current_speed=state.current_speed,
+        last_tick_time=state.last_tick_time,
+        simulation_status="active" if state.current_speed != "pause" else "paused",
+        active_job=find_active_job(gm_profile.id)
     )
 
 
 def seed_world():
     """Route to trigger the seeding of the GM's world data."""
-    simulation_engine = SimulationEngine()
     _debug_request("POST", "/gm/seed_world")
     
     gm_profile, redirect_response = get_current_gm_profile()
@@ -74,22 +95,22 @@ def seed_world():
         return redirect_response
 
     try:
-        # Call the seeding function with the GM's profile ID
-        success = seed_gm_data(
+        # Seeding hundreds of shops can take a while, so it runs on a background worker
+        job = enqueue_job(
             gm_profile.id,
-            num_cities=10,
-            num_shops_per_city=10,
-            num_global_items=75, # Global distinct items to choose from
-            num_items_per_shop=10 # Items assigned to each shop
+            "seed_world",
+            {
+                "num_cities": 10,
+                "num_shops_per_city": 10,
+                "num_global_items": 75, # Global distinct items to choose from
+                "num_items_per_shop": 10, # Items assigned to each shop
+            },
         )
-        if success:
-            flash("Your world has been successfully seeded!", "success")
-        else:
-            flash("Failed to seed world. Check server logs for details.", "error")
+        flash(f"World seeding queued (job #{job.id}). Progress is shown on your dashboard.", "info")
     except Exception as e:
         db.session.rollback() # Ensure rollback on error
-        gm_logger.error(f"Error during seeding world: {str(e)}", exc_info=True)
-        flash(f"An error occurred during seeding: {str(e)}", "error")
+        gm_logger.error(f"Error queueing world seeding: {str(e)}", exc_info=True)
+        flash(f"An error occurred while queueing seeding: {str(e)}", "error")
 
     # Redirect back to the GM home page (dashboard)
     return redirect(url_for("gm.gm_home"))
@@ -109,12 +130,15 @@ def run_simulation_tick():
         
         # Log the tick execution
         gm_logger.debug(
-            f"Manual tick execution:\n"
-            f"  Campaign ID: {gm_profile.id}\n"
-            f"  Shops updated: {stats['shops_updated']}\n"
-            f"  Items updated: {stats['items_updated']}\n"
-            f"  Last tick time: {simulation_engine.last_tick_time}\n"
-            f"  Time since last tick: {datetime.now() - simulation_engine.last_tick_time}"
+            "Manual tick execution:\n"
+            "  Campaign ID: %s\n"
+            "  Tick: %s\n"
+            "  Shops updated: %s\n"
+            "  Items updated: %s",
+            gm_profile.id,
+            stats['tick'],
+            stats['shops_updated'],
+            stats['items_updated'],
         )
         
         return jsonify({
@@ -123,6 +147,9 @@ def run_simulation_tick():
             "stats": stats
         })
         
+    except TickInProgressError as e:
+        gm_logger.info(str(e))
+        flash("A simulation tick is already running for your world. Try again in a moment.", "info")
     except Exception as e:
         gm_logger.error(f"Error during simulation tick: {str(e)}")
         flash(f"Error during simulation tick: {str(e)}", "danger")
@@ -131,7 +158,7 @@ def run_simulation_tick():
 
 
 def update_simulation_speed():
-    """Update the simulation speed setting and run the appropriate time period."""
+    """Update the simulation speed setting and queue the appropriate time period as a background job."""
     simulation_engine = SimulationEngine()
     _debug_request("POST", "/gm/simulation/speed")
     
@@ -148,28 +175,25 @@ def update_simulation_speed():
             return redirect(url_for("gm.gm_home"))
 
         if speed == "pause":
-            simulation_engine.set_speed(speed)
+            simulation_engine.set_speed(gm_profile.id, speed)
             flash("Simulation paused", "info")
         else:
             time_period = speed_to_period[speed]
-            simulation_engine.set_speed(speed)
-            stats = simulation_engine.run_time_period(gm_profile.id, time_period)
+            simulation_engine.set_speed(gm_profile.id, speed)
+            # Long periods (a year is 365 ticks) run on a background worker; the dashboard polls progress.
+            # If the GM is already ticking, the worker requeues the job and its status says so
+            job = enqueue_job(gm_profile.id, "simulate_period", {"time_period": time_period})
 
-            # Log the simulation results
             gm_logger.debug(
-                f"Time period simulation completed:\n"
-                f"  Period: {time_period}\n"
-                f"  Ticks completed: {stats['ticks_completed']}\n"
-                f"  Shops updated: {stats['shops_updated']}\n"
-                f"  Items updated: {stats['items_updated']}\n"
-                f"  Duration: {stats['total_duration']:.2f}s"
-            )
-            
-            flash(
-                f"Simulated {time_period}: Updated {stats['shops_updated']} shops "
-                f"and {stats['items_updated']} items in {stats['total_duration']:.2f}s",
-                "system"
+                "Time period simulation queued:\n"
+                "  Period: %s\n"
+                "  Job: %s (%s)",
+                time_period,
+                job.id,
+                job.status,
             )
+
+            flash(f"Simulating 1 {time_period} in the background (job #{job.id}).", "info")
         
     except Exception as e:
         gm_logger.error(f"Error during simulation: {str(e)}")
@@ -178,6 +202,83 @@ def update_simulation_speed():
     return redirect(url_for("gm.gm_home"))
 
 
+# Upper bounds for forecast query args, so one forecast can't tie up a sim-worker for long
+MAX_FORECAST_DAYS = 90
+MAX_FORECAST_MEMBERS = 200
+
+
+def price_forecast():
+    """
+    Queue a Monte Carlo price forecast (percentile bands of the GM's item prices over the next
+    days; the world is left untouched). Query args: days, members, item_id (repeatable).
+    Returns 202 with the job; poll its status URL and read the bands from its result.
+    """
+    gm_profile, redirect_response = get_current_gm_profile()
+    if redirect_response:
+        return redirect_response
+
+    try:
+        days = int(request.args.get("days", default_config.forecast_days))
+        members = int(request.args.get("members", default_config.forecast_members))
+        item_ids = [int(item_id) for item_id in request.args.getlist("item_id")] or None
+    except ValueError:
+        return jsonify({"error": "days, members and item_id must be integers"}), 400
+    if not 1 <= days <= MAX_FORECAST_DAYS or not 1 <= members <= MAX_FORECAST_MEMBERS:
+        return jsonify({
+            "error": f"days must be 1-{MAX_FORECAST_DAYS} and members 1-{MAX_FORECAST_MEMBERS}"
+        }), 400
+
+    params = {"days": days, "members": members, "item_ids": item_ids}
+    try:
+        job = enqueue_job(gm_profile.id, "price_forecast", params)
+    except Exception as e:
+        db.session.rollback()
+        gm_logger.error(f"Error queueing price forecast: {str(e)}", exc_info=True)
+        return jsonify({"error": "Could not queue the forecast"}), 500
+    if job.params != params:
+        return jsonify({
+            "error": "Another price forecast is already queued or running",
+            "job_id": job.id,
+            "status_url": url_for("gm.gm_job_status", job_id=job.id),
+        }), 409
+    return jsonify({
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": url_for("gm.gm_job_status", job_id=job.id),
+    }), 202
+
+
+def job_status(job_id):
+    """Return a background job's status and progress as JSON (polled by the GM dashboard)."""
+    gm_profile, redirect_response = get_current_gm_profile()
+    if redirect_response:
+        return redirect_response
+
+    job = db.session.get(SimulationJob, job_id)
+    if not job or job.gm_profile_id != gm_profile.id:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict())
+
+
+def cancel_job(job_id):
+    """Cancel a queued job, or ask a running one to stop after its current step."""
+    _debug_request("POST", f"/gm/jobs/{job_id}/cancel")
+
+    gm_profile, redirect_response = get_current_gm_profile()
+    if redirect_response:
+        return redirect_response
+
+    job = db.session.get(SimulationJob, job_id)
+    if not job or job.gm_profile_id != gm_profile.id:
+        flash("Job not found.", "error")
+    elif not job.is_active:
+        flash(f"Job #{job.id} already finished ({job.status}).", "info")
+    else:
+        request_cancel(job)
+        flash(f"Cancellation requested for job #{job.id}.", "info")
+    return redirect(url_for("gm.gm_home"))
+
+
 def debug_form():
     """Debug form submission"""
     print("FORM KEYS:", request.form.keys())
@@ -7,6 +7,8 @@ from flask_login import current_user
 from app.extensions import db
 from app.models.users import Player, PlayerInventory
 from app.models.backend import City, Shop, ShopInventory, Item
+from app.models.market import GlobalMarket
+from app.services.economy import current_prices, get_item_catalog
 from app.routes.handlers.player_character_handler import (
     _get_or_create_active_character,
     _serialize_character,
@@ -59,9 +61,10 @@ def player_home():
         for item in shop_items:
             print(f"[DEBUG] Item: {item.name} (ID: {item.item_id})")
 
-        # Build distinct item types and rarities for search filters
-        item_types = sorted({item.type for item in shop_items if getattr(item, "type", None)})
-        rarities = sorted({item.rarity for item in shop_items if getattr(item, "rarity", None)})
+        # Distinct item types and rarities (Common -> Legendary) for search filters, from the item catalog cache
+        item_types, rarities = get_item_catalog(gm_profile.id).filter_options(
+            item.item_id for item in shop_items
+        )
 
         # Build a mapping of shop_id -> items (for cascading item dropdowns)
         shop_items_by_shop = {}
@@ -89,23 +92,60 @@ def player_home():
                 }
             )
 
-        # Get market data for visualizations - top items by average price
+        # Get market data for visualizations - top items by average price,
+        # read from the GlobalMarket aggregates the simulation tick maintains
         market_data = (
             db.session.query(
                 Item.name,
                 Item.base_price,
-                db.func.avg(ShopInventory.dynamic_price).label('avg_price'),
-                db.func.count(ShopInventory.shop_id).label('shop_count'),
-                db.func.sum(ShopInventory.stock).label('total_stock')
+                GlobalMarket.average_price.label('avg_price'),
+                GlobalMarket.listing_count.label('shop_count'),
+                GlobalMarket.total_supply.label('total_stock')
             )
-            .join(ShopInventory, ShopInventory.item_id == Item.item_id)
-            .join(Shop, Shop.shop_id == ShopInventory.shop_id)
-            .filter(Shop.gm_profile_id == gm_profile.id)
-            .group_by(Item.item_id, Item.name, Item.base_price)
-            .order_by(db.func.avg(ShopInventory.dynamic_price).desc())
+            .join(GlobalMarket, GlobalMarket.item_id == Item.item_id)
+            .filter(GlobalMarket.gm_profile_id == gm_profile.id)
+            .order_by(GlobalMarket.average_price.desc())
             .limit(6)
             .all()
         )
+        if not market_data:
+            # No tick has run yet for this GM: aggregate live, at current (lazily evaluated) prices
+            listings = (
+                db.session.query(
+                    Item.item_id,
+                    Item.name,
+                    Item.base_price,
+                    ShopInventory.inventory_id,
+                    ShopInventory.dynamic_price,
+                    ShopInventory.stock
+                )
+                .join(ShopInventory, ShopInventory.item_id == Item.item_id)
+                .join(Shop, Shop.shop_id == ShopInventory.shop_id)
+                .filter(Shop.gm_profile_id == gm_profile.id)
+                .all()
+            )
+            prices = current_prices(gm_profile.id, [row.inventory_id for row in listings])
+            by_item = {}
+            for row in listings:
+                entry = by_item.setdefault(row.item_id, {
+                    'name': row.name, 'base_price': row.base_price, 'prices': [], 'total_stock': 0
+                })
+                entry['prices'].append(prices.get(row.inventory_id, row.dynamic_price) or 0)
+                entry['total_stock'] += row.stock or 0
+            market_data = sorted(
+                (
+                    {
+                        'name': entry['name'],
+                        'base_price': entry['base_price'],
+                        'avg_price': sum(entry['prices']) / len(entry['prices']),
+                        'shop_count': len(entry['prices']),
+                        'total_stock': entry['total_stock'],
+                    }
+                    for entry in by_item.values()
+                ),
+                key=lambda item: item['avg_price'],
+                reverse=True,
+            )[:6]
         print(f"[DEBUG] Found {len(market_data)} items for market visualization")
 
         # Get player's inventory with item details
@@ -8,6 +8,7 @@ from app.extensions import db
 from app.models.users import Player, PlayerInventory
 from app.models.backend import City, Shop, ShopInventory, Item, shop_cities
 from app.routes.handlers.player_helpers import get_current_player
+from app.services.economy import current_prices, get_item_catalog
 
 
 def view_market():
@@ -68,10 +69,8 @@ def search_item():
             print(f"[DEBUG] Shop: {shop.name} (ID: {shop.shop_id})")
             print(f"[DEBUG] Cities: {[city.name for city in shop.cities]}")
 
-        items = Item.query.all()
-        print(f"[DEBUG] Found {len(items)} total items in database")
-        for item in items:
-            print(f"[DEBUG] Item: {item.name} (ID: {item.item_id})")
+        catalog = get_item_catalog(player.gm_profile_id)
+        print(f"[DEBUG] Item catalog holds {catalog.size} items for GM Profile {player.gm_profile_id}")
 
         # Get filter parameters
         city_id = request.args.get("city")
@@ -96,7 +95,8 @@ def search_item():
                 Shop.shop_id,
                 Item.item_id,
                 ShopInventory.stock,
-                ShopInventory.dynamic_price
+                ShopInventory.dynamic_price,
+                ShopInventory.inventory_id
             )
             .join(ShopInventory, ShopInventory.item_id == Item.item_id)
             .join(Shop, ShopInventory.shop_id == Shop.shop_id)
@@ -112,10 +112,9 @@ def search_item():
             query = query.filter(Shop.shop_id == shop_id)
         if item_id:
             query = query.filter(Item.item_id == item_id)
-        if item_type:
-            query = query.filter(Item.type == item_type)
-        if rarity:
-            query = query.filter(Item.rarity == rarity)
+        if item_type or rarity:
+            # Type/rarity resolved against the catalog cache; rarity matches by tier ("rare" == "Rare")
+            query = query.filter(Item.item_id.in_(catalog.matching_item_ids(item_type=item_type, rarity=rarity)))
         if item_name:
             # Case-insensitive partial match on item name
             query = query.filter(Item.name.ilike(f"%{item_name}%"))
@@ -123,6 +122,7 @@ def search_item():
         # Execute query
         results = query.all()
         print(f"[DEBUG] Found {len(results)} matching results")
+        prices = current_prices(player.gm_profile_id, {result.inventory_id for result in results})
 
         # Format results
         formatted_results = [{
@@ -132,7 +132,7 @@ def search_item():
             'shop_id': result.shop_id,
             'item_id': result.item_id,
             'stock': result.stock,
-            'price': result.dynamic_price
+            'price': prices.get(result.inventory_id, result.dynamic_price)
         } for result in results]
 
         return jsonify(formatted_results)
@@ -8,6 +8,7 @@ from app.extensions import db
 from app.models.users import Player, PlayerInventory
 from app.models.backend import City, Shop, ShopInventory, Item
 from app.routes.handlers.player_helpers import get_current_player
+from app.services.economy import current_prices, materialize_prices
 
 
 def view_shops():
@@ -84,6 +85,7 @@ def view_shop(shop_id):
                 Item.type,
                 ShopInventory.stock,
                 ShopInventory.dynamic_price,
+                ShopInventory.inventory_id,
                 Item.item_id,
                 Item.base_price
             )
@@ -91,12 +93,14 @@ def view_shop(shop_id):
             .filter(ShopInventory.shop_id == shop_id)
             .all()
         )
+        # Prices as of the current tick (lazily priced rows are evaluated here)
+        prices = current_prices(shop.gm_profile_id, [r.inventory_id for r in rows])
         shop_items = [
             {
                 "name": r.name,
                 "type": r.type,
                 "stock": r.stock,
-                "dynamic_price": r.dynamic_price,
+                "dynamic_price": prices.get(r.inventory_id, r.dynamic_price),
                 "item_id": r.item_id,
                 "base_price": r.base_price,
             }
@@ -198,6 +202,10 @@ def buy_item(shop_id, item_id):
         if not inventory:
             return jsonify({'success': False, 'message': 'Item not found in shop'})
 
+        # Charge the price as of the current tick (lazy pricing may not have written it yet)
+        if materialize_prices(shop.gm_profile_id, [inventory.inventory_id]):
+            db.session.refresh(inventory)
+
         # Get quantity from request (default to 1 if not specified)
         quantity = int(request.form.get('quantity', 1))
         if quantity <= 0:
@@ -0,0 +1,120 @@
+"""
+Price chart API: downsampled price series for one shop item, read from the rollup tier when the
+range allows it and from the per-tick price vectors otherwise. Ranges are in game ticks (days). Responses carry an ETag keyed on the GM's latest
+tick, so clients polling a chart get 304s until the simulation advances.
+"""
+from flask import Blueprint, request, jsonify, abort
+from flask_login import login_required, current_user
+
+from app.extensions import db
+from app.models.backend import Shop
+from app.models.users import GMProfile, Player
+from app.models.simulation_state import GMSimulationState
+from app.services.downsample import lttb_indices, minmax_indices
+from app.services.price_rollups import get_price_series
+
+price_api_bp = Blueprint("price_api", __name__, url_prefix="/api/prices")
+
+# Ticks (game days) shown when the client gives no range
+DEFAULT_RANGE = 30
+DEFAULT_POINTS = 200
+MAX_POINTS = 2000
+
+
+def _can_view_shop(shop: Shop) -> bool:
+    """The shop's GM and that GM's players may read its prices."""
+    gm_profile = db.session.get(GMProfile, shop.gm_profile_id)
+    if gm_profile and gm_profile.user_id == current_user.id:
+        return True
+    return Player.query.filter_by(
+        user_id_player=current_user.id, gm_profile_id=shop.gm_profile_id
+    ).first() is not None
+
+
+def _parse_tick(name, default):
+    raw = request.args.get(name)
+    if not raw:
+        return default, None
+    try:
+        return int(raw), None
+    except ValueError:
+        return None, (jsonify({"error": f"{name} must be a tick number"}), 400)
+
+
+@price_api_bp.route("/<int:shop_id>/<int:item_id>", methods=["GET"])
+@login_required
+def get_price_chart(shop_id, item_id):
+    """
+    Downsampled price series for an item in a shop.
+    Query args: from, to (ticks, from inclusive and to exclusive; default the last 30 ticks),
+    points (default 200, max 2000), method (lttb or minmax).
+    """
+    shop = db.session.get(Shop, shop_id)
+    if not shop or not _can_view_shop(shop):
+        abort(404)
+
+    # Nothing changes between ticks, so the latest tick (plus the query) identifies the response
+    state = GMSimulationState.query.filter_by(gm_profile_id=shop.gm_profile_id).first()
+    tick = state.current_tick if state else 0
+
+    end, err = _parse_tick("to", tick + 1)
+    if err is not None:
+        return err
+    start, err = _parse_tick("from", end - DEFAULT_RANGE)
+    if err is not None:
+        return err
+    if start >= end:
+        return jsonify({"error": "from must be before to"}), 400
+    try:
+        points = int(request.args.get("points", DEFAULT_POINTS))
+    except ValueError:
+        return jsonify({"error": "points must be an integer"}), 400
+    points = max(3, min(points, MAX_POINTS))
+    method = request.args.get("method", "lttb")
+    if method not in ("lttb", "minmax"):
+        return jsonify({"error": "method must be lttb or minmax"}), 400
+
+    # Key on the raw from/to args: an open-ended "to" means "latest", which only moves with the tick
+    etag = "-".join(str(part) for part in (
+        shop.gm_profile_id, tick, shop_id, item_id,
+        request.args.get("from", ""), request.args.get("to", ""), points, method,
+    ))
+    if request.if_none_match.contains_weak(etag):
+        response = jsonify()
+        response.status_code = 304
+        response.set_etag(etag, weak=True)
+        return response
+
+    resolution, series = get_price_series(shop.gm_profile_id, shop_id, item_id, start, end, points)
+    if len(series) > points:
+        closes = [p["close"] for p in series]
+        if method == "minmax":
+            keep = minmax_indices(closes, points // 2)
+        else:
+            keep = lttb_indices([p["tick"] for p in series], closes, points)
+        series = [series[i] for i in keep]
+
+    response = jsonify({
+        "shop_id": shop_id,
+        "item_id": item_id,
+        "resolution": resolution,
+        "method": method,
+        "tick": tick,
+        "from": start,
+        "to": end,
+        "points": [
+            {
+                "tick": p["tick"],
+                "open": p["open"],
+                "high": p["high"],
+                "low": p["low"],
+                "close": p["close"],
+                "avg": p["avg"],
+                "count": p["count"],
+            }
+            for p in series
+        ],
+    })
+    response.set_etag(etag, weak=True)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
@@ -63,9 +63,12 @@ SHOP_THEMES = {
 }
 
 # --- Seeding Function ---
-def seed_gm_data(gm_profile_id, num_cities=10, num_shops_per_city=10, num_global_items=50, num_items_per_shop=10):
+def seed_gm_data(gm_profile_id, num_cities=10, num_shops_per_city=10, num_global_items=50, num_items_per_shop=10,
+                 progress_callback=None):
     """
     Seeds a GM's world with cities, shops, and items.
+    progress_callback(done, total) is called after each committed step (items, cities, then one
+    call per city whose shops have been created).
     """
     gm_profile = GMProfile.query.get(gm_profile_id)
     if not gm_profile:
@@ -136,6 +139,9 @@ def seed_gm_data(gm_profile_id, num_cities=10, num_shops_per_city=10, num_global
         db.session.add(item)
     db.session.commit() # Commit items to get their IDs
     print(f"Created {len(global_items)} global items.")
+    total_steps = num_cities + 2
+    if progress_callback:
+        progress_callback(1, total_steps)
 
     # 2. Create Cities
     cities = []
@@ -147,10 +153,12 @@ def seed_gm_data(gm_profile_id, num_cities=10, num_shops_per_city=10, num_global
         db.session.add(city)
     db.session.commit() # Commit cities to get their IDs
     print(f"Created {len(cities)} cities.")
+    if progress_callback:
+        progress_callback(2, total_steps)
 
     # 3. Create Shops for each City and populate their inventories
     print(f"Creating {num_shops_per_city} shops per city and populating inventories...")
-    for city in cities:
+    for city_index, city in enumerate(cities):
         for i in range(num_shops_per_city):
             shop_theme = random.choice(list(SHOP_THEMES.keys()))
             shop_name = random.choice(SHOP_THEMES[shop_theme])
@@ -177,7 +185,11 @@ def seed_gm_data(gm_profile_id, num_cities=10, num_shops_per_city=10, num_global
                     dynamic_price=dynamic_price
                 )
                 db.session.add(shop_inventory_entry)
+
+        # Commit per city so large worlds don't build one huge transaction and progress is real
+        db.session.commit()
+        if progress_callback:
+            progress_callback(city_index + 3, total_steps)
     
-    db.session.commit()
     print("Seeding complete!")
     return True
\ No newline at end of file
@@ -0,0 +1,99 @@
+"""
+Version bumps for in-process caches.
+
+An after_flush listener watches the models each cache is derived from and increments the matching
+CacheVersion row for the affected GM in the same transaction. Caches call get_cache_versions()
+and rebuild when the numbers differ from the ones they were built with.
+
+Bulk Core statements (update()/insert() on tables) bypass ORM events; code that changes watched
+tables that way must call bump_cache_version() itself.
+"""
+from datetime import datetime
+from typing import Iterable, Set, Tuple
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+from app.models.cache_version import CacheVersion
+from app.models.backend import City, Shop, Item
+from app.models.economy import MarketEvent
+from app.models.market import DemandModifier, ModifierTarget
+from app.models.production import ResourceTransform
+from app.models.trade_route import TradeRoute
+from app.utils.sql import dialect_insert
+
+CACHE_MODIFIERS = "modifiers"
+CACHE_CATALOG = "catalog"
+CACHE_ITEMS = "items"
+CACHE_TOPOLOGY = "topology"
+CACHE_TRADE_ROUTES = "trade_routes"
+CACHE_EVENTS = "events"
+CACHE_TRANSFORMS = "transforms"
+
+# Model -> cache kinds invalidated when one of its rows is inserted, changed or deleted
+WATCHED_MODELS = {
+    DemandModifier: (CACHE_MODIFIERS,),
+    ModifierTarget: (CACHE_MODIFIERS,),
+    City: (CACHE_CATALOG, CACHE_TOPOLOGY),
+    Shop: (CACHE_CATALOG, CACHE_TOPOLOGY),
+    Item: (CACHE_CATALOG, CACHE_ITEMS),
+    TradeRoute: (CACHE_TRADE_ROUTES,),
+    MarketEvent: (CACHE_EVENTS,),
+    ResourceTransform: (CACHE_TRANSFORMS,),
+}
+
+# Kinds that also depend on relationship collections (e.g. Shop.cities, stored in shop_cities), so
+# a change to a collection alone invalidates them
+COLLECTION_KINDS = {CACHE_TOPOLOGY}
+
+
+def watch_model(model, *kinds: str) -> None:
+    """Register another model whose changes invalidate the given cache kinds."""
+    WATCHED_MODELS[model] = tuple(WATCHED_MODELS.get(model, ())) + tuple(kinds)
+
+
+def bump_cache_version(connection, kind: str, gm_profile_id: int) -> None:
+    """Increment (or create) the version row for one cache kind and GM."""
+    table = CacheVersion.__table__
+    stmt = dialect_insert(table).values(kind=kind, gm_profile_id=gm_profile_id, version=1, updated_at=datetime.utcnow())
+    connection.execute(stmt.on_conflict_do_update(
+        index_elements=["kind", "gm_profile_id"],
+        set_={"version": table.c.version + 1, "updated_at": stmt.excluded.updated_at},
+    ))
+
+
+def get_cache_versions(gm_profile_id: int, kinds: Iterable[str]) -> Tuple[int, ...]:
+    """Current versions for the given kinds (0 if never bumped), in the order requested."""
+    kinds = tuple(kinds)
+    rows = dict(db.session.execute(
+        select(CacheVersion.kind, CacheVersion.version).where(
+            CacheVersion.gm_profile_id == gm_profile_id,
+            CacheVersion.kind.in_(kinds),
+        )
+    ).all())
+    return tuple(rows.get(kind, 0) for kind in kinds)
+
+
+@event.listens_for(Session, "after_flush")
+def _bump_versions_after_flush(session, flush_context):
+    changed: Set[Tuple[str, int]] = set()
+    for obj in list(session.new) + list(session.deleted) + list(session.dirty):
+        kinds = WATCHED_MODELS.get(type(obj))
+        if not kinds:
+            continue
+        if obj in session.dirty:
+            if not session.is_modified(obj):
+                continue
+            if not session.is_modified(obj, include_collections=False):
+                kinds = [kind for kind in kinds if kind in COLLECTION_KINDS]
+        gm_profile_id = getattr(obj, "gm_profile_id", None)
+        if gm_profile_id is None:
+            continue
+        for kind in kinds:
+            changed.add((kind, gm_profile_id))
+    if not changed:
+        return
+    connection = session.connection()
+    for kind, gm_profile_id in sorted(changed):
+        bump_cache_version(connection, kind, gm_profile_id)
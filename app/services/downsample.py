@@ -0,0 +1,61 @@
+"""
+Shape-preserving downsampling for chart series.
+
+lttb_indices: Largest-Triangle-Three-Buckets (Steinarsson 2013); keeps the points that contribute
+most to the visual shape, always including the first and last point.
+minmax_indices: per-bucket min and max, which keeps every spike at the cost of up to 2 points per bucket.
+Both return sorted indices into the input so callers can keep any per-point payload.
+"""
+import numpy as np
+
+
+def lttb_indices(x, y, threshold: int) -> np.ndarray:
+    """Indices of the points LTTB keeps when reducing (x, y) to `threshold` points."""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if threshold >= n:
+        return np.arange(n)
+    if threshold < 3:
+        return np.array([0, n - 1])
+
+    # Interior points are split into threshold - 2 buckets
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0] = 0
+    keep[-1] = n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, stop = edges[i], edges[i + 1]
+        # Average of the next bucket (or the last point for the final bucket)
+        if i + 2 < len(edges):
+            next_start, next_stop = edges[i + 1], edges[i + 2]
+            avg_x = x[next_start:next_stop].mean()
+            avg_y = y[next_start:next_stop].mean()
+        else:
+            avg_x, avg_y = x[-1], y[-1]
+        # Triangle area between the previously kept point, each candidate and the next bucket's mean
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:stop] - y[a])
+            - (x[a] - x[start:stop]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def minmax_indices(y, buckets: int) -> np.ndarray:
+    """Indices of the min and max point of each of `buckets` equal-count buckets."""
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if buckets <= 0 or 2 * buckets >= n:
+        return np.arange(n)
+    edges = np.linspace(0, n, buckets + 1).astype(np.int64)
+    keep = []
+    for start, stop in zip(edges[:-1], edges[1:]):
+        if stop <= start:
+            continue
+        segment = y[start:stop]
+        keep.append(start + int(np.argmin(segment)))
+        keep.append(start + int(np.argmax(segment)))
+    return np.unique(np.asarray(keep, dtype=np.int64))
@@ -1,17 +1,74 @@
+from .catalog import (
+    NO_TYPE,
+    RARITY_TIERS,
+    ItemCatalog,
+    get_item_catalog,
+    invalidate_item_catalog,
+    rarity_tier,
+)
+from .crafting import (
+    CraftingPlan,
+    TransformCycleError,
+    apply_crafting,
+    crafted_stock,
+    get_crafting_plan,
+    invalidate_crafting_plan,
+    toposort_transforms,
+)
 from .demand import calculate_demand
+from .event_effects import (
+    CompiledEvents,
+    EventEffect,
+    apply_event_stock_shocks,
+    compile_effect,
+    get_compiled_events,
+    invalidate_compiled_events,
+)
+from .events import expire_due_events, reset_event_timer_sync, sync_event_timers
+from .forecast import DEFAULT_PERCENTILES, ForecastWorld, PriceForecast, forecast_prices, simulate_member
+from .incremental import (
+    dirty_rows,
+    drift_kernel,
+    drift_prices,
+    incremental_price_snapshot,
+    pricing_fingerprint,
+    write_anchors,
+)
+from .lazy import current_prices, evaluate_prices, lazy_pricing_enabled, materialize_prices
+from .markets import aggregate_markets
+from .modifier_index import ModifierIndex, get_modifier_index, invalidate_modifier_index
+from .production import apply_production, load_nodes, production_capacity, production_deliveries
+from .pricing import (
+    PRICE_CEILING_MULTIPLIER,
+    PRICE_FLOOR_MULTIPLIER,
+    price_kernel,
+    price_snapshot,
+    snapshot_noise,
+    update_shop_prices,
+    write_prices,
+)
+from .restock import apply_due_restocks, reset_restock_timer_sync, restock_rows, target_stock, write_stock
+from .rng import (
+    STREAM_CRAFTING,
+    STREAM_FORECAST,
+    STREAM_PRICE_DRIFT,
+    STREAM_PRICE_FLUCTUATION,
+    STREAM_PRODUCTION,
+    STREAM_RESTOCK,
+    counter_uniforms,
+)
+from .settlement import settle_accounts
+from .snapshot import NO_CITY, WorldSnapshot
+from .topology import ShopTopology, get_shop_topology, invalidate_shop_topology
+from .trade_network import TradeNetwork, get_trade_network, invalidate_trade_network
 
-def calculate_dynamic_price(base_price, rarity, stock_level, shop_id, city_id):
+
+def calculate_dynamic_price(base_price, rarity, stock_level, shop_id, city_id, demand_modifier=1.0):
     """
     Calculate a dynamic price based on various factors including demand, rarity, and stock levels.
+    demand_modifier is the DemandModifier total for this city/shop/item (see modifier_index);
+    it scales demand, 1.0 meaning no active modifiers.
+    rarity may be a name ("Rare") or a number.
+    Scalar wrapper around pricing.price_kernel; price many rows with the kernel directly.
     """
-    # Calculate demand factor
-    demand_factor = calculate_demand(rarity, stock_level, city_id, shop_id)
-    
-    # Apply demand factor to base price
-    new_price = base_price * demand_factor
-    
-    # Ensure price doesn't go below a minimum threshold
-    min_price = base_price * 0.5  # Minimum 50% of base price
-    new_price = max(min_price, new_price)
-    
-    return round(new_price, 2)
+    return float(price_kernel([base_price], [rarity_tier(rarity)], [stock_level], demand_modifier)[0])
@@ -0,0 +1,141 @@
+# app/services/economy/catalog.py
+"""
+Per-GM item catalog cache.
+
+The GM's items as sorted NumPy arrays: base price, rarity ordinal (Common=1 .. Legendary=5),
+item type code and the static price bounds every price is clamped to. Built with one SELECT and
+kept per process until an Item of that GM is added, edited or deleted (the "items" cache version,
+bumped by app/services/cache_invalidation.py), so pricing, search and market views look items up
+by ordinal instead of loading Item rows.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import or_, select
+
+from app.extensions import db
+from app.models.backend import Item, Shop, ShopInventory
+from app.services.cache_invalidation import CACHE_ITEMS, get_cache_versions
+
+# Final price stays within 50%-500% of base price
+PRICE_FLOOR_MULTIPLIER = 0.50
+PRICE_CEILING_MULTIPLIER = 5.00
+
+# Rarity names used by the item forms and seeder, Common (1) to Legendary (5)
+RARITY_TIERS = {"common": 1, "uncommon": 2, "rare": 3, "very rare": 4, "legendary": 5}
+
+# Type code of items without a type
+NO_TYPE = -1
+
+
+def rarity_tier(rarity) -> int:
+    """Rarity tier 1-5 from a rarity name or number; unknown values count as Rare (3)."""
+    rarity = str(rarity or "").strip().lower()
+    if rarity.isdigit():
+        return min(5, max(1, int(rarity)))
+    return RARITY_TIERS.get(rarity, 3)
+
+
+class ItemCatalog:
+    """Item arrays for one GM, aligned and sorted by item_id (see module docstring)."""
+
+    def __init__(self, gm_profile_id: int, rows):
+        self.gm_profile_id = gm_profile_id
+        n = len(rows)
+        columns = list(zip(*rows)) if rows else [()] * 4
+        self.item_ids = np.fromiter(columns[0], dtype=np.int64, count=n)
+        self.base_price = np.fromiter((p or 0.0 for p in columns[1]), dtype=np.float64, count=n)
+        tiers: Dict[str, int] = {}
+        self.rarity = np.fromiter(
+            (tiers.setdefault(r, rarity_tier(r)) for r in columns[2]), dtype=np.int64, count=n
+        )
+        # Rarity labels as entered, ordered Common -> Legendary (for filter dropdowns)
+        self.rarity_names: List[str] = sorted((r for r in tiers if r), key=lambda r: (tiers[r], r))
+        self.type_names: List[str] = sorted({t for t in columns[3] if t})
+        type_codes = {name: code for code, name in enumerate(self.type_names)}
+        self.type_code = np.fromiter(
+            (type_codes.get(t, NO_TYPE) for t in columns[3]), dtype=np.int64, count=n
+        )
+        self.price_floor = self.base_price * PRICE_FLOOR_MULTIPLIER
+        self.price_ceiling = self.base_price * PRICE_CEILING_MULTIPLIER
+
+    @property
+    def size(self) -> int:
+        return len(self.item_ids)
+
+    def ordinals(self, item_ids) -> np.ndarray:
+        """Positions of item_ids in the catalog; ids not in it map to -1."""
+        item_ids = np.asarray(item_ids, dtype=np.int64)
+        if self.size == 0:
+            return np.full(item_ids.shape, -1, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self.item_ids, item_ids), self.size - 1)
+        return np.where(self.item_ids[pos] == item_ids, pos, -1)
+
+    def type_code_of(self, type_name: Optional[str]) -> int:
+        try:
+            return self.type_names.index(type_name)
+        except ValueError:
+            return NO_TYPE
+
+    def matching_item_ids(self, item_type: Optional[str] = None, rarity=None, item_ids: Optional[Iterable[int]] = None) -> List[int]:
+        """Ids of items with the given type and/or rarity (name or number), optionally within item_ids."""
+        mask = np.ones(self.size, dtype=bool)
+        if item_ids is not None:
+            mask &= np.isin(self.item_ids, np.fromiter(item_ids, dtype=np.int64))
+        if item_type:
+            code = self.type_code_of(item_type)
+            mask &= (self.type_code == code) & (code != NO_TYPE)
+        if rarity:
+            mask &= self.rarity == rarity_tier(rarity)
+        return self.item_ids[mask].tolist()
+
+    def filter_options(self, item_ids: Optional[Iterable[int]] = None) -> Tuple[List[str], List[str]]:
+        """(type names, rarity names) present among item_ids (all items if None), for search filters."""
+        if item_ids is None:
+            return list(self.type_names), list(self.rarity_names)
+        ords = self.ordinals(np.fromiter(item_ids, dtype=np.int64))
+        ords = ords[ords >= 0]
+        codes = set(self.type_code[ords].tolist())
+        tiers = set(self.rarity[ords].tolist())
+        return (
+            [name for code, name in enumerate(self.type_names) if code in codes],
+            [name for name in self.rarity_names if rarity_tier(name) in tiers],
+        )
+
+    @classmethod
+    def build(cls, gm_profile_id: int) -> "ItemCatalog":
+        # The GM's items plus any item its shops stock, so every inventory row resolves
+        stocked = (
+            select(ShopInventory.item_id)
+            .join(Shop, ShopInventory.shop_id == Shop.shop_id)
+            .where(Shop.gm_profile_id == gm_profile_id)
+        )
+        rows = db.session.execute(
+            select(Item.item_id, Item.base_price, Item.rarity, Item.type)
+            .where(or_(Item.gm_profile_id == gm_profile_id, Item.item_id.in_(stocked)))
+            .order_by(Item.item_id)
+        ).all()
+        return cls(gm_profile_id, rows)
+
+
+# gm_profile_id -> (versions, catalog); one entry per GM per process
+_catalog_cache: Dict[int, Tuple[Tuple[int, ...], ItemCatalog]] = {}
+
+
+def get_item_catalog(gm_profile_id: int) -> ItemCatalog:
+    """Cached ItemCatalog for a GM, rebuilt when the GM's items have changed since it was built."""
+    versions = get_cache_versions(gm_profile_id, (CACHE_ITEMS,))
+    cached = _catalog_cache.get(gm_profile_id)
+    if cached and cached[0] == versions:
+        return cached[1]
+    catalog = ItemCatalog.build(gm_profile_id)
+    _catalog_cache[gm_profile_id] = (versions, catalog)
+    return catalog
+
+
+def invalidate_item_catalog(gm_profile_id: Optional[int] = None) -> None:
+    """Drop cached catalogs in this process (all GMs if gm_profile_id is None)."""
+    if gm_profile_id is None:
+        _catalog_cache.clear()
+    else:
+        _catalog_cache.pop(gm_profile_id, None)
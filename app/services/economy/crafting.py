@@ -0,0 +1,287 @@
+# app/services/economy/crafting.py
+"""
+ResourceTransform crafting chains.
+
+A transform lets every shop of `shop_type` that lists both items turn input_item stock into
+output_item stock at conversion_rate outputs per input. The transforms of a GM form a graph over
+items; it is sorted topologically once (Kahn's algorithm) and cached until transforms change
+(CACHE_TRANSFORMS). Each transform's layer is the depth of its input item, so no transform's output
+feeds another transform of the same layer, and evaluating the layers in order resolves whole
+chains (ore -> ingot -> sword) within one tick.
+
+Per tick, each (transform, shop) instance consumes crafting_rate of its input stock, split evenly
+between the transforms sharing that input in the shop; outputs are rounded stochastically with the
+counter-based RNG. Transforms on a cycle (a -> b -> a) can't be ordered; they are skipped and logged.
+Transforms downstream of a cycle (b -> c) still run, in a layer after the cycle's items, which are
+then supplied only by restocking and production.
+"""
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+
+from app.extensions import db
+from app.models.backend import Shop
+from app.models.production import ResourceTransform
+from app.services.cache_invalidation import CACHE_TRANSFORMS, get_cache_versions
+from app.services.economy.restock import write_stock
+from app.services.economy.rng import STREAM_CRAFTING, counter_uniforms
+from app.services.logging_config import simulation_logger
+
+
+class TransformCycleError(ValueError):
+    """Raised by toposort_transforms(strict=True) when transforms form a cycle."""
+
+    def __init__(self, item_ids):
+        self.item_ids = sorted(item_ids)
+        super().__init__(f"Resource transforms form a cycle through items {self.item_ids}")
+
+
+def _kahn_depth(src: np.ndarray, dst: np.ndarray, n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Kahn's algorithm over n items; returns (depth per item, in-degree left, > 0 where unsorted)."""
+    # CSR of outgoing edges per item
+    order = np.argsort(src, kind="stable")
+    indptr = np.concatenate([[0], np.cumsum(np.bincount(src, minlength=n))])
+    targets = dst[order]
+
+    indegree = np.bincount(dst, minlength=n)
+    depth = np.zeros(n, dtype=np.int64)
+    frontier = np.flatnonzero(indegree == 0)
+    while len(frontier):
+        starts, ends = indptr[frontier], indptr[frontier + 1]
+        counts = ends - starts
+        edge_pos = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        nxt = targets[edge_pos]
+        np.maximum.at(depth, nxt, np.repeat(depth[frontier], counts) + 1)
+        np.subtract.at(indegree, nxt, 1)
+        frontier = np.unique(nxt[indegree[nxt] == 0])
+    return depth, indegree
+
+
+def _cycle_edges(src: np.ndarray, dst: np.ndarray, unsorted: np.ndarray) -> np.ndarray:
+    """
+    Mask of the edges that lie on a cycle: u -> v with v reaching u again. Only items Kahn's
+    algorithm left unsorted (on or downstream of a cycle) are searched.
+    """
+    candidates = np.flatnonzero(unsorted[src] & unsorted[dst])
+    successors: Dict[int, List[int]] = {}
+    for e in candidates.tolist():
+        successors.setdefault(int(src[e]), []).append(int(dst[e]))
+
+    reach: Dict[int, set] = {}
+    for start in successors:
+        seen, stack = set(), [start]
+        while stack:
+            for nxt in successors.get(stack.pop(), ()):
+                if nxt not in seen:
+                    seen.add(nxt)
+                    stack.append(nxt)
+        reach[start] = seen
+
+    on_cycle = np.zeros(len(src), dtype=bool)
+    for e in candidates.tolist():
+        on_cycle[e] = int(src[e]) in reach.get(int(dst[e]), ())
+    return on_cycle
+
+
+def toposort_transforms(input_items, output_items, strict: bool = False) -> Tuple[np.ndarray, List[int]]:
+    """
+    Kahn's algorithm over the item graph (edge input -> output per transform).
+    Returns (layer per transform, -1 for transforms on a cycle; item ids on a cycle). Transforms
+    downstream of a cycle are not on it and are layered after the cycle's items.
+    With strict=True a cycle raises TransformCycleError instead.
+    """
+    input_items = np.asarray(input_items, dtype=np.int64)
+    output_items = np.asarray(output_items, dtype=np.int64)
+    items, inverse = np.unique(np.concatenate([input_items, output_items]), return_inverse=True)
+    inverse = inverse.reshape(-1)
+    src, dst = inverse[:len(input_items)], inverse[len(input_items):]
+    n = len(items)
+
+    depth, indegree = _kahn_depth(src, dst, n)
+    on_cycle = np.zeros(len(src), dtype=bool)
+    if (indegree > 0).any():
+        # Every cycle lies within the unsorted items; dropping its edges leaves a DAG in which the
+        # cycle's items are sources, so whatever they feed sorts after them
+        on_cycle = _cycle_edges(src, dst, indegree > 0)
+        depth, _ = _kahn_depth(src[~on_cycle], dst[~on_cycle], n)
+
+    cycle_items = items[np.unique(np.concatenate([src[on_cycle], dst[on_cycle]]))].tolist()
+    if cycle_items and strict:
+        raise TransformCycleError(cycle_items)
+    layers = np.where(on_cycle, -1, depth[src])
+    return layers, cycle_items
+
+
+@dataclass
+class CraftingPlan:
+    """A GM's orderable transforms, sorted by layer."""
+    gm_profile_id: int
+    transform_id: np.ndarray
+    input_item: np.ndarray
+    output_item: np.ndarray
+    conversion_rate: np.ndarray
+    shop_type: List[str]
+    layer: np.ndarray
+    cycle_items: List[int]
+
+    @property
+    def layer_count(self) -> int:
+        return int(self.layer.max()) + 1 if len(self.layer) else 0
+
+    @classmethod
+    def build(cls, gm_profile_id: int) -> "CraftingPlan":
+        rows = db.session.execute(
+            select(
+                ResourceTransform.transform_id,
+                ResourceTransform.input_item_id,
+                ResourceTransform.output_item_id,
+                ResourceTransform.conversion_rate,
+                ResourceTransform.shop_type,
+            )
+            .where(ResourceTransform.gm_profile_id == gm_profile_id)
+            .order_by(ResourceTransform.transform_id)
+        ).all()
+        layers, cycle_items = toposort_transforms([r.input_item_id for r in rows], [r.output_item_id for r in rows])
+        if cycle_items:
+            simulation_logger.warning(
+                "Skipping resource transforms on a cycle for GM %s (items %s); transforms fed by the cycle still run",
+                gm_profile_id,
+                cycle_items,
+            )
+        keep = np.flatnonzero(layers >= 0)
+        keep = keep[np.argsort(layers[keep], kind="stable")]
+        rows = [rows[i] for i in keep.tolist()]
+        return cls(
+            gm_profile_id=gm_profile_id,
+            transform_id=np.array([r.transform_id for r in rows], dtype=np.int64),
+            input_item=np.array([r.input_item_id for r in rows], dtype=np.int64),
+            output_item=np.array([r.output_item_id for r in rows], dtype=np.int64),
+            conversion_rate=np.array([max(0.0, r.conversion_rate) for r in rows], dtype=np.float64),
+            shop_type=[(r.shop_type or "").strip().lower() for r in rows],
+            layer=layers[keep],
+            cycle_items=cycle_items,
+        )
+
+
+# gm_profile_id -> (versions, plan); one entry per GM per process
+_plan_cache: Dict[int, Tuple[Tuple[int, ...], CraftingPlan]] = {}
+
+
+def get_crafting_plan(gm_profile_id: int) -> CraftingPlan:
+    """Cached CraftingPlan for a GM, rebuilt when its transforms change."""
+    versions = get_cache_versions(gm_profile_id, (CACHE_TRANSFORMS,))
+    cached = _plan_cache.get(gm_profile_id)
+    if cached and cached[0] == versions:
+        return cached[1]
+    plan = CraftingPlan.build(gm_profile_id)
+    _plan_cache[gm_profile_id] = (versions, plan)
+    return plan
+
+
+def invalidate_crafting_plan(gm_profile_id: Optional[int] = None) -> None:
+    """Drop cached plans in this process (all GMs if gm_profile_id is None)."""
+    if gm_profile_id is None:
+        _plan_cache.clear()
+    else:
+        _plan_cache.pop(gm_profile_id, None)
+
+
+def crafting_instances(plan: CraftingPlan, snapshot, shop_types: Dict[int, str]):
+    """
+    Expand transforms to (transform, shop) instances that can run in this snapshot.
+    Returns aligned arrays (transform index, input row, output row).
+    """
+    empty = np.zeros(0, dtype=np.int64)
+    if not len(plan.transform_id) or not snapshot.size:
+        return empty, empty, empty
+    type_codes = {name: code for code, name in enumerate(sorted(set(plan.shop_type)))}
+    row_type = np.array(
+        [type_codes.get((shop_types.get(shop_id) or "").strip().lower(), -1) for shop_id in snapshot.shop_id.tolist()],
+        dtype=np.int64,
+    )
+    transform_type = np.array([type_codes[name] for name in plan.shop_type], dtype=np.int64)
+
+    # Join transforms to candidate input rows on (input item, shop type)
+    row_key = snapshot.item_id * (len(type_codes) + 1) + row_type
+    transform_key = plan.input_item * (len(type_codes) + 1) + transform_type
+    row_order = np.argsort(row_key, kind="stable")
+    sorted_keys = row_key[row_order]
+    lo = np.searchsorted(sorted_keys, transform_key, side="left")
+    hi = np.searchsorted(sorted_keys, transform_key, side="right")
+    counts = hi - lo
+    transform_index = np.repeat(np.arange(len(transform_key)), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    in_rows = row_order[np.repeat(lo, counts) + offsets]
+
+    # The same shop must also list the output item
+    shop_item = snapshot.shop_id.astype(np.int64) << 32 | snapshot.item_id
+    item_order = np.argsort(shop_item, kind="stable")
+    wanted = snapshot.shop_id[in_rows].astype(np.int64) << 32 | plan.output_item[transform_index]
+    pos = np.minimum(np.searchsorted(shop_item[item_order], wanted), len(item_order) - 1)
+    found = shop_item[item_order][pos] == wanted
+    return transform_index[found], in_rows[found], item_order[pos][found]
+
+
+def crafted_stock(plan: CraftingPlan, snapshot, instances, tick: int, rate: float, seed: int = 0) -> Tuple[np.ndarray, int]:
+    """
+    Stock per snapshot row after one tick of crafting over the (transform index, input row,
+    output row) instances from crafting_instances(), and the units crafted. Writes nothing.
+    """
+    transform_index, in_rows, out_rows = instances
+    stock = snapshot.stock.copy()
+    rate = min(rate, 1.0)
+    instance_layer = plan.layer[transform_index]
+    crafted = 0
+    for layer in range(plan.layer_count):
+        sel = np.flatnonzero(instance_layer == layer)
+        if not len(sel):
+            continue
+        layer_in, layer_out = in_rows[sel], out_rows[sel]
+        consumers = np.bincount(layer_in, minlength=snapshot.size)[layer_in]
+        consumed = np.floor(stock[layer_in] * rate / consumers).astype(np.int64)
+        draws = counter_uniforms(
+            seed,
+            snapshot.gm_profile_id,
+            tick,
+            snapshot.inventory_id[layer_out],
+            STREAM_CRAFTING,
+            lane=plan.transform_id[transform_index[sel]],
+        )
+        produced = np.floor(consumed * plan.conversion_rate[transform_index[sel]] + draws * (consumed > 0))
+        produced = produced.astype(np.int64)
+        np.subtract.at(stock, layer_in, consumed)
+        np.add.at(stock, layer_out, produced)
+        crafted += int(produced.sum())
+    return stock, crafted
+
+
+def apply_crafting(
+    snapshot,
+    tick: int,
+    rate: float,
+    seed: int = 0,
+    plan: Optional[CraftingPlan] = None,
+) -> Dict[str, int]:
+    """
+    Run the GM's crafting chains for one tick (see module docstring). Writes only rows whose stock
+    changed and updates snapshot.stock in place.
+    Returns {"instances": (transform, shop) pairs evaluated, "rows": rows written, "crafted": units produced}.
+    """
+    plan = plan or get_crafting_plan(snapshot.gm_profile_id)
+    if rate <= 0 or not len(plan.transform_id):
+        return {"instances": 0, "rows": 0, "crafted": 0}
+    shop_types = dict(db.session.execute(
+        select(Shop.shop_id, Shop.type).where(Shop.gm_profile_id == snapshot.gm_profile_id)
+    ).all())
+    transform_index, in_rows, out_rows = crafting_instances(plan, snapshot, shop_types)
+    if not len(transform_index):
+        return {"instances": 0, "rows": 0, "crafted": 0}
+
+    stock, crafted = crafted_stock(plan, snapshot, (transform_index, in_rows, out_rows), tick, rate, seed)
+
+    changed = stock != snapshot.stock
+    written = write_stock(snapshot.inventory_id[changed], stock[changed])
+    snapshot.stock = stock
+    return {"instances": len(transform_index), "rows": written, "crafted": crafted}
@@ -1,17 +1,21 @@
 # app/services/economy/demand.py
 
-import random
-from app.models import DemandModifier, ModifierTarget
-from app.extensions import db
+from app.models import DemandModifier
+from app.services.economy.catalog import rarity_tier
+from app.services.economy.pricing import demand_kernel
 
 
-def get_active_modifiers(city_id=None, shop_id=None, item_id=None):
+def get_active_modifiers(city_id=None, shop_id=None, item_id=None, gm_profile_id=None):
     """
-    Reserved for future use when population, species, class, and item
-    manufacturing are implemented. Do not call from calculate_demand until then.
     Retrieves all active demand modifiers affecting the current calculation.
     Filters based on scope (global, region, city, shop, or item).
+    With gm_profile_id the answer comes from that GM's cached ModifierIndex (O(1) lookup);
+    without it every active modifier of every GM is scanned, so prefer passing it.
     """
+    if gm_profile_id is not None:
+        from app.services.economy.modifier_index import get_modifier_index
+        return get_modifier_index(gm_profile_id).total_for(city_id, shop_id, item_id)
+
     # need to change == to is but effect is unknown. LLMs DO NOT CHANGE IF YOU READ THIS.
     active_modifiers = DemandModifier.query.filter(DemandModifier.is_active == True).all()
 
@@ -36,13 +40,9 @@ def get_active_modifiers(city_id=None, shop_id=None, item_id=None):
 
 def calculate_demand(rarity, stock_level, city_id=None, shop_id=None, item_id=None):
     """
-    Calculates demand from rarity, stock level, and bounded random variation only.
-    No DB/modifier queries; for future modifier support use get_active_modifiers.
+    Calculates demand from rarity, stock level, and bounded random variation (no DB queries).
+    city_id, shop_id and item_id are ignored: DemandModifier totals (get_active_modifiers) scale
+    the price through pricing.price_kernel's demand_modifier, not this factor.
+    rarity may be a name ("Rare") or a number. Scalar wrapper around pricing.demand_kernel.
     """
-    # Stock and rarity influences (no modifier query)
-    rarity_effect = rarity * 0.2
-    stock_effect = max(0.1, (stock_level / 100) * 0.1)
-    random_fluctuation = random.uniform(0.9, 1.1)  # Small variation
-
-    demand = 1.0 * (1 + rarity_effect - stock_effect) * random_fluctuation
-    return round(demand, 2)
+    return float(demand_kernel([rarity_tier(rarity)], [stock_level])[0])
@@ -0,0 +1,229 @@
+# app/services/economy/event_effects.py
+"""
+Compiled MarketEvent effects.
+
+A MarketEvent's effect_json is parsed once into a typed EventEffect:
+
+    {
+        "price_multiplier": 1.5,      # prices of affected listings x1.5 while the event is active
+        "demand_delta": 0.3,          # added to the demand modifier total while active
+        "stock_shock": -0.5,          # stock x(1 - 0.5), applied once on the tick the event activates
+        "item_types": ["Potion"],     # optional filters; all given filters must match
+        "item_ids": [12, 13],
+        "shop_types": ["Potion Shop"],
+        "rarities": ["Rare", "Very Rare"]
+    }
+
+Scope comes from the event itself: city_id limits it to that city, region to the cities of that
+region, neither means every listing of the GM. Each effect becomes a row of boolean lookup tables
+over city, shop and item ordinals, so the (events x city-pairs) mask for a whole tick is three
+gathers and an AND, and all active events apply with a few matrix ops however many rows they touch.
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+
+from app.extensions import db
+from app.models.backend import City, Shop
+from app.models.economy import MarketEvent
+from app.services.cache_invalidation import CACHE_CATALOG, CACHE_EVENTS, get_cache_versions
+from app.services.economy.catalog import ItemCatalog, get_item_catalog, rarity_tier
+from app.services.economy.restock import write_stock
+from app.services.logging_config import simulation_logger
+
+_EFFECT_KINDS = (CACHE_EVENTS, CACHE_CATALOG)
+
+
+@dataclass
+class EventEffect:
+    """Typed form of one active event's effect_json plus its scope."""
+    event_id: int
+    activated_tick: Optional[int]
+    price_multiplier: float = 1.0
+    demand_delta: float = 0.0
+    stock_shock: float = 0.0
+    # None = no restriction
+    city_ids: Optional[set] = None
+    item_ids: Optional[set] = None
+    item_types: Optional[set] = None
+    shop_types: Optional[set] = None
+    rarity_tiers: Optional[set] = field(default=None)
+
+
+def _name_set(values) -> Optional[set]:
+    return None if values is None else {str(v).strip().lower() for v in values}
+
+
+def compile_effect(event, cities_by_region: Dict[str, List[int]]) -> EventEffect:
+    """Parse one MarketEvent; raises ValueError on malformed effect_json."""
+    effect = event.effect_json or {}
+    if not isinstance(effect, dict):
+        raise ValueError("effect_json must be an object")
+
+    city_ids = None
+    if event.city_id is not None:
+        city_ids = {event.city_id}
+    elif event.region:
+        city_ids = set(cities_by_region.get(event.region, []))
+
+    price_multiplier = float(effect.get("price_multiplier", 1.0))
+    if price_multiplier <= 0:
+        raise ValueError("price_multiplier must be positive")
+    stock_shock = float(effect.get("stock_shock", 0.0))
+    if stock_shock < -1:
+        raise ValueError("stock_shock cannot remove more than all stock")
+    rarities = effect.get("rarities")
+    return EventEffect(
+        event_id=event.event_id,
+        activated_tick=event.activated_tick,
+        price_multiplier=price_multiplier,
+        demand_delta=float(effect.get("demand_delta", 0.0)),
+        stock_shock=stock_shock,
+        city_ids=city_ids,
+        item_ids=None if effect.get("item_ids") is None else {int(i) for i in effect["item_ids"]},
+        item_types=_name_set(effect.get("item_types")),
+        shop_types=_name_set(effect.get("shop_types")),
+        rarity_tiers=None if rarities is None else {rarity_tier(r) for r in rarities},
+    )
+
+
+class CompiledEvents:
+    """Lookup tables for a GM's active event effects (see module docstring)."""
+
+    def __init__(self, gm_profile_id: int, effects: List[EventEffect], cities, shops, catalog: ItemCatalog):
+        self.gm_profile_id = gm_profile_id
+        self.effects = effects
+        self.city_ids = np.array([c.city_id for c in cities], dtype=np.int64)
+        self.shop_ids = np.array([s.shop_id for s in shops], dtype=np.int64)
+        self.item_ids = catalog.item_ids
+
+        n_events = len(effects)
+        # One row per event, one column per ordinal plus a trailing "unknown / no city" slot
+        self.city_ok = np.ones((n_events, len(cities) + 1), dtype=bool)
+        self.shop_ok = np.ones((n_events, len(shops) + 1), dtype=bool)
+        self.item_ok = np.ones((n_events, catalog.size + 1), dtype=bool)
+        shop_types = [(s.type or "").strip().lower() for s in shops]
+        type_names = [name.strip().lower() for name in catalog.type_names]
+        for e, effect in enumerate(effects):
+            if effect.city_ids is not None:
+                self.city_ok[e] = np.append(np.isin(self.city_ids, list(effect.city_ids)), False)
+            if effect.shop_types is not None:
+                self.shop_ok[e, :-1] = [t in effect.shop_types for t in shop_types]
+            if effect.item_ids is not None:
+                self.item_ok[e, :-1] &= np.isin(self.item_ids, list(effect.item_ids))
+            if effect.item_types is not None:
+                codes = [code for code, name in enumerate(type_names) if name in effect.item_types]
+                self.item_ok[e, :-1] &= np.isin(catalog.type_code, codes)
+            if effect.rarity_tiers is not None:
+                self.item_ok[e, :-1] &= np.isin(catalog.rarity, list(effect.rarity_tiers))
+
+        self.log_price_multiplier = np.log(np.array([e.price_multiplier for e in effects], dtype=np.float64))
+        self.demand_delta = np.array([e.demand_delta for e in effects], dtype=np.float64)
+        self.stock_shock = np.array([e.stock_shock for e in effects], dtype=np.float64)
+        self.activated_tick = np.array(
+            [-1 if e.activated_tick is None else e.activated_tick for e in effects], dtype=np.int64
+        )
+
+    def __len__(self) -> int:
+        return len(self.effects)
+
+    @staticmethod
+    def _ordinals(sorted_ids: np.ndarray, ids: np.ndarray) -> np.ndarray:
+        if len(sorted_ids) == 0:
+            return np.zeros(len(ids), dtype=np.int64)
+        pos = np.minimum(np.searchsorted(sorted_ids, ids), len(sorted_ids) - 1)
+        return np.where(sorted_ids[pos] == ids, pos, len(sorted_ids))
+
+    def pair_mask(self, snapshot) -> np.ndarray:
+        """(events x snapshot pairs) boolean mask of the (row, city) pairs each event affects."""
+        rows = snapshot.pair_row
+        return (
+            self.city_ok[:, self._ordinals(self.city_ids, snapshot.pair_city_id)]
+            & self.shop_ok[:, self._ordinals(self.shop_ids, snapshot.shop_id)[rows]]
+            & self.item_ok[:, self._ordinals(self.item_ids, snapshot.item_id)[rows]]
+        )
+
+    def demand_deltas(self, mask: np.ndarray) -> np.ndarray:
+        """Summed demand_delta per pair."""
+        return self.demand_delta @ mask
+
+    def price_factors(self, mask: np.ndarray) -> np.ndarray:
+        """Product of the price multipliers of all events affecting each pair."""
+        return np.exp(self.log_price_multiplier @ mask)
+
+    def shocked_stock(self, snapshot, tick: int) -> np.ndarray:
+        """
+        Stock per snapshot row after the stock shocks of events activated at this tick. A row
+        counts as affected if any of its city pairs is; shocks of several events compound.
+        """
+        starting = (self.activated_tick == tick) & (self.stock_shock != 0)
+        if not starting.any():
+            return snapshot.stock.copy()
+        pair_hit = self.pair_mask(snapshot)[starting]
+        row_hit = np.zeros((int(starting.sum()), snapshot.size), dtype=bool)
+        for e in range(len(row_hit)):
+            row_hit[e, snapshot.pair_row[pair_hit[e]]] = True
+        factor = np.exp(np.log1p(self.stock_shock[starting]).clip(min=-50) @ row_hit)
+        return np.maximum(0, np.round(snapshot.stock * factor)).astype(np.int64)
+
+    @classmethod
+    def build(cls, gm_profile_id: int) -> "CompiledEvents":
+        events = MarketEvent.query.filter(
+            MarketEvent.gm_profile_id == gm_profile_id,
+            MarketEvent.is_active == True,  # noqa: E712
+        ).order_by(MarketEvent.event_id).all()
+        cities = db.session.execute(
+            select(City.city_id, City.region).where(City.gm_profile_id == gm_profile_id).order_by(City.city_id)
+        ).all()
+        shops = db.session.execute(
+            select(Shop.shop_id, Shop.type).where(Shop.gm_profile_id == gm_profile_id).order_by(Shop.shop_id)
+        ).all()
+
+        cities_by_region: Dict[str, List[int]] = {}
+        for city in cities:
+            if city.region:
+                cities_by_region.setdefault(city.region, []).append(city.city_id)
+
+        effects = []
+        for event in events:
+            try:
+                effects.append(compile_effect(event, cities_by_region))
+            except (TypeError, ValueError) as e:
+                simulation_logger.warning("Skipping MarketEvent %s: invalid effect_json (%s)", event.event_id, e)
+        return cls(gm_profile_id, effects, cities, shops, get_item_catalog(gm_profile_id))
+
+
+# gm_profile_id -> (versions, compiled events); one entry per GM per process
+_compiled_cache: Dict[int, Tuple[Tuple[int, ...], CompiledEvents]] = {}
+
+
+def get_compiled_events(gm_profile_id: int) -> CompiledEvents:
+    """Cached CompiledEvents for a GM, recompiled when its events or catalog change."""
+    versions = get_cache_versions(gm_profile_id, _EFFECT_KINDS)
+    cached = _compiled_cache.get(gm_profile_id)
+    if cached and cached[0] == versions:
+        return cached[1]
+    compiled = CompiledEvents.build(gm_profile_id)
+    _compiled_cache[gm_profile_id] = (versions, compiled)
+    return compiled
+
+
+def invalidate_compiled_events(gm_profile_id: Optional[int] = None) -> None:
+    """Drop compiled events in this process (all GMs if gm_profile_id is None)."""
+    if gm_profile_id is None:
+        _compiled_cache.clear()
+    else:
+        _compiled_cache.pop(gm_profile_id, None)
+
+
+def apply_event_stock_shocks(snapshot, events: CompiledEvents, tick: int) -> int:
+    """Apply stock shocks of events activated at this tick; updates snapshot.stock. Returns rows written."""
+    if not len(events):
+        return 0
+    new_stock = events.shocked_stock(snapshot, tick)
+    changed = new_stock != snapshot.stock
+    written = write_stock(snapshot.inventory_id[changed], new_stock[changed])
+    snapshot.stock = new_stock
+    return written
@@ -0,0 +1,78 @@
+# app/services/economy/events.py
+"""
+MarketEvent lifecycle on the game clock.
+
+An active event is stamped with activated_tick the first tick it is seen; if it has duration_ticks
+an expiry SimulationTimer is scheduled for activated_tick + duration_ticks, and the tick that
+reaches it deactivates the event. Syncing events with their timers only happens when the GM's
+events changed (CACHE_EVENTS version), so a quiet tick costs one indexed timer lookup.
+"""
+from datetime import datetime
+from typing import Dict, Tuple
+
+from sqlalchemy import select, update
+
+from app.extensions import db
+from app.models.economy import MarketEvent
+from app.services.cache_invalidation import CACHE_EVENTS, bump_cache_version, get_cache_versions
+from app.services.timers import TIMER_EVENT_EXPIRY, cancel_timers, due_timers, schedule_timers, scheduled_entities
+
+# gm_profile_id -> events version the expiry timers were last synced against (per process)
+_events_synced: Dict[int, Tuple[int, ...]] = {}
+
+
+def sync_event_timers(gm_profile_id: int, tick: int) -> int:
+    """
+    Stamp newly active events with activated_tick and (re)schedule expiry timers; timers of events
+    that were deactivated, deleted or lost their duration are dropped. Returns events stamped.
+    """
+    version = get_cache_versions(gm_profile_id, (CACHE_EVENTS,))
+    if _events_synced.get(gm_profile_id) == version:
+        return 0
+    events = db.session.execute(
+        select(MarketEvent.event_id, MarketEvent.activated_tick, MarketEvent.duration_ticks).where(
+            MarketEvent.gm_profile_id == gm_profile_id,
+            MarketEvent.is_active == True,  # noqa: E712
+        )
+    ).all()
+
+    new_ids = [e.event_id for e in events if e.activated_tick is None]
+    if new_ids:
+        db.session.execute(
+            update(MarketEvent).where(MarketEvent.event_id.in_(new_ids)).values(activated_tick=tick)
+        )
+        # Core UPDATE bypasses the flush listener
+        bump_cache_version(db.session.connection(), CACHE_EVENTS, gm_profile_id)
+
+    scheduled = scheduled_entities(gm_profile_id, TIMER_EVENT_EXPIRY)
+    expiries = {
+        e.event_id: (tick if e.activated_tick is None else e.activated_tick) + e.duration_ticks
+        for e in events if e.duration_ticks is not None
+    }
+    schedule_timers(gm_profile_id, TIMER_EVENT_EXPIRY, [
+        (event_id, due) for event_id, due in expiries.items() if scheduled.get(event_id) != due
+    ])
+    cancel_timers(gm_profile_id, TIMER_EVENT_EXPIRY, [event_id for event_id in scheduled if event_id not in expiries])
+    _events_synced[gm_profile_id] = get_cache_versions(gm_profile_id, (CACHE_EVENTS,))
+    return len(new_ids)
+
+
+def reset_event_timer_sync(gm_profile_id: int) -> None:
+    """Forget the sync state for a GM (e.g. after a rolled-back tick) so the next tick re-syncs."""
+    _events_synced.pop(gm_profile_id, None)
+
+
+def expire_due_events(gm_profile_id: int, tick: int) -> int:
+    """Deactivate events whose expiry timer is due at this tick. Returns the number expired."""
+    sync_event_timers(gm_profile_id, tick)
+    due = due_timers(gm_profile_id, TIMER_EVENT_EXPIRY, tick)
+    if not due:
+        return 0
+    db.session.execute(
+        update(MarketEvent)
+        .where(MarketEvent.gm_profile_id == gm_profile_id, MarketEvent.event_id.in_(due))
+        .values(is_active=False, end_date=datetime.utcnow())
+    )
+    cancel_timers(gm_profile_id, TIMER_EVENT_EXPIRY, due)
+    bump_cache_version(db.session.connection(), CACHE_EVENTS, gm_profile_id)
+    return len(due)
@@ -0,0 +1,310 @@
+# app/services/economy/forecast.py
+"""
+Monte Carlo price forecasts.
+
+forecast_prices() estimates where item prices are likely to be N days out without running the
+live simulation. It copies the GM's economy into a ForecastWorld: the WorldSnapshot plus the
+modifier index, active events, trade network, resource nodes, crafting instances and restock
+schedule, all as plain arrays. It then runs K independent members of N ticks each in a process
+pool. Each member replays the tick's supply and pricing stages on its own copy of the stock:
+
+    due restocks -> production -> crafting -> price_snapshot()
+
+Members differ only in their seed. Member 0 uses the live random_seed, so it follows the path real
+ticks would take if nothing else changed. Demand modifiers, events and trade routes are held at
+their state on the first forecast tick: GM edits, modifier date windows, event expiry and player
+purchases are not projected. Every day is priced with the full kernel, which is the model
+incremental pricing approximates.
+
+Per member and day, an item's price is the mean of its listings; the members are then reduced to
+percentile bands. Nothing is written to the database, and the workers never open a connection.
+GMs request forecasts through the "price_forecast" SimulationJob (app/services/job_runner.py), so
+the ensemble runs on a sim-worker rather than inside a web request.
+"""
+import multiprocessing as mp
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import select
+
+from app.config.simulation_config import default_config
+from app.extensions import db
+from app.models.backend import Shop
+from app.models.simulation_state import GMSimulationState
+from app.services.economy.crafting import CraftingPlan, crafted_stock, crafting_instances, get_crafting_plan
+from app.services.economy.event_effects import CompiledEvents, get_compiled_events
+from app.services.economy.lazy import evaluate_prices, lazy_pricing_enabled
+from app.services.economy.modifier_index import ModifierIndex, get_modifier_index
+from app.services.economy.pricing import price_snapshot
+from app.services.economy.production import load_nodes, production_capacity, production_deliveries
+from app.services.economy.restock import restock_interval, restock_rows, target_stock
+from app.services.economy.rng import STREAM_FORECAST, counter_bits
+from app.services.economy.snapshot import WorldSnapshot
+from app.services.economy.trade_network import TradeNetwork, get_trade_network
+from app.services.timers import TIMER_RESTOCK, scheduled_entities
+
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+
+
+@dataclass
+class ForecastWorld:
+    """Everything a forecast member needs, detached from the database (picklable)."""
+    snapshot: WorldSnapshot
+    # First tick the forecast simulates (the GM's next tick)
+    start_tick: int
+    modifier_index: ModifierIndex
+    events: Optional[CompiledEvents]
+    trade_network: Optional[TradeNetwork]
+    diffusion_rate: float
+    # Restock schedule per snapshot row: target stock, ticks between restocks, next due tick
+    restock_rate: float
+    restock_target: np.ndarray
+    restock_interval: np.ndarray
+    next_restock: np.ndarray
+    nodes: Optional[Dict[str, np.ndarray]]
+    # Stock cap per row for production deliveries (None = uncapped)
+    production_capacity: Optional[np.ndarray]
+    crafting_plan: Optional[CraftingPlan]
+    crafting_instances: Optional[tuple]
+    crafting_rate: float
+    # Sorted ids of the listed items and each row's position in it
+    item_ids: np.ndarray
+    item_position: np.ndarray
+
+    @classmethod
+    def load(cls, gm_profile_id: int, config=None) -> "ForecastWorld":
+        """Read the GM's current economy (read-only; the caller's session is left unchanged)."""
+        config = config or default_config
+        state = GMSimulationState.query.filter_by(gm_profile_id=gm_profile_id).first()
+        current_tick = state.current_tick if state and state.current_tick else 0
+        start_tick = current_tick + 1
+
+        snapshot = WorldSnapshot.load(gm_profile_id)
+        if lazy_pricing_enabled(config):
+            snapshot.dynamic_price = evaluate_prices(
+                gm_profile_id, current_tick, snapshot.inventory_id, snapshot.item_id, snapshot.dynamic_price,
+                snapshot.anchor_price, snapshot.priced_tick, seed=config.random_seed,
+            )
+        item_ids, item_position = np.unique(snapshot.item_id, return_inverse=True)
+
+        if config.enable_demand_simulation:
+            modifier_index = get_modifier_index(gm_profile_id, tick=start_tick)
+        else:
+            modifier_index = ModifierIndex(gm_profile_id, [], [], [], [])
+        events = get_compiled_events(gm_profile_id) if config.enable_event_simulation else None
+        trade_network = (
+            get_trade_network(gm_profile_id, config.region_route_weight) if config.trade_diffusion_rate > 0 else None
+        )
+
+        supply = config.enable_supply_simulation
+        shop_types = dict(db.session.execute(
+            select(Shop.shop_id, Shop.type).where(Shop.gm_profile_id == gm_profile_id)
+        ).all())
+        row_interval = np.array(
+            [restock_interval(shop_types.get(shop_id)) for shop_id in snapshot.shop_id.tolist()], dtype=np.int64
+        )
+        # Shops without a timer yet get the one sync_restock_timers() would give them
+        scheduled = scheduled_entities(gm_profile_id, TIMER_RESTOCK)
+        next_restock = np.array([
+            scheduled.get(shop_id, start_tick + shop_id % interval)
+            for shop_id, interval in zip(snapshot.shop_id.tolist(), row_interval.tolist())
+        ], dtype=np.int64)
+
+        nodes = load_nodes(gm_profile_id) if supply else None
+        plan = instances = None
+        if supply and config.crafting_rate > 0:
+            plan = get_crafting_plan(gm_profile_id)
+            instances = crafting_instances(plan, snapshot, shop_types)
+            if not len(instances[0]):
+                plan = instances = None
+
+        return cls(
+            snapshot=snapshot,
+            start_tick=start_tick,
+            modifier_index=modifier_index,
+            events=events if events is not None and len(events) else None,
+            trade_network=trade_network,
+            diffusion_rate=config.trade_diffusion_rate,
+            restock_rate=config.restock_rate if supply else 0.0,
+            restock_target=target_stock(snapshot) if supply else np.zeros(snapshot.size, dtype=np.int64),
+            restock_interval=row_interval,
+            next_restock=next_restock,
+            nodes=nodes if nodes is not None and len(nodes["node_id"]) else None,
+            production_capacity=production_capacity(snapshot, config.production_capacity) if supply else None,
+            crafting_plan=plan,
+            crafting_instances=instances,
+            crafting_rate=config.crafting_rate,
+            item_ids=item_ids,
+            item_position=item_position.reshape(-1),
+        )
+
+    def item_means(self, prices: np.ndarray) -> np.ndarray:
+        """Mean listing price per item (aligned with item_ids)."""
+        sums = np.bincount(self.item_position, weights=prices, minlength=len(self.item_ids))
+        return sums / np.maximum(np.bincount(self.item_position, minlength=len(self.item_ids)), 1)
+
+
+def simulate_member(world: ForecastWorld, days: int, seed: int) -> np.ndarray:
+    """(days x items) mean listing price per item on each forecast day of one member."""
+    snapshot = replace(world.snapshot, stock=world.snapshot.stock.copy())
+    next_restock = world.next_restock.copy()
+    daily = np.empty((days, len(world.item_ids)))
+    for day in range(days):
+        tick = world.start_tick + day
+        if world.restock_rate > 0:
+            due = np.flatnonzero(next_restock <= tick)
+            if len(due):
+                rates = 1 - (1 - min(world.restock_rate, 1.0)) ** world.restock_interval[due]
+                snapshot.stock[due] = restock_rows(
+                    snapshot, due, tick, rates, seed, targets=world.restock_target[due]
+                )
+                next_restock[due] = tick + world.restock_interval[due]
+        if world.nodes is not None:
+            _, delivered = production_deliveries(
+                snapshot, world.nodes, tick, seed, capacity=world.production_capacity
+            )
+            snapshot.stock = snapshot.stock + delivered
+        if world.crafting_plan is not None:
+            snapshot.stock, _ = crafted_stock(
+                world.crafting_plan, snapshot, world.crafting_instances, tick, world.crafting_rate, seed
+            )
+        prices = price_snapshot(
+            snapshot,
+            world.modifier_index,
+            tick,
+            seed=seed,
+            trade_network=world.trade_network,
+            diffusion_rate=world.diffusion_rate,
+            events=world.events,
+        )
+        daily[day] = world.item_means(prices)
+    return daily
+
+
+def member_seeds(seed: int, gm_profile_id: int, members: int) -> List[int]:
+    """Seed per member: the live seed first, then independent seeds derived from it."""
+    derived = counter_bits(seed, gm_profile_id, 0, np.arange(1, max(members, 1)), STREAM_FORECAST).view(np.int64)
+    return [seed] + derived.tolist()[:members - 1]
+
+
+# Set in each pool worker by _init_worker, so the world is sent once per process, not per task
+_worker_world: Optional[ForecastWorld] = None
+
+
+def _init_worker(world: ForecastWorld) -> None:
+    global _worker_world
+    _worker_world = world
+
+
+def _run_members(days: int, seeds: Sequence[int]) -> np.ndarray:
+    return np.stack([simulate_member(_worker_world, days, seed) for seed in seeds])
+
+
+@dataclass
+class PriceForecast:
+    """Percentile bands per listed item: bands[p, day, item] for percentiles[p]."""
+    gm_profile_id: int
+    start_tick: int
+    days: int
+    members: int
+    percentiles: tuple
+    item_ids: np.ndarray
+    current_price: np.ndarray
+    bands: np.ndarray
+
+    def to_dict(self, item_names: Optional[Dict[int, str]] = None) -> Dict:
+        item_names = item_names or {}
+        return {
+            "gm_profile_id": self.gm_profile_id,
+            "start_tick": self.start_tick,
+            "days": self.days,
+            "members": self.members,
+            "percentiles": list(self.percentiles),
+            "items": [
+                {
+                    "item_id": item_id,
+                    "name": item_names.get(item_id),
+                    "current_price": round(float(self.current_price[i]), 2),
+                    "bands": {
+                        f"p{p:g}": np.round(self.bands[k, :, i], 2).tolist()
+                        for k, p in enumerate(self.percentiles)
+                    },
+                }
+                for i, item_id in enumerate(self.item_ids.tolist())
+            ],
+        }
+
+
+def forecast_prices(
+    gm_profile_id: int,
+    days: Optional[int] = None,
+    members: Optional[int] = None,
+    percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+    item_ids: Optional[Iterable[int]] = None,
+    workers: Optional[int] = None,
+    config=None,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+) -> PriceForecast:
+    """
+    Run a members x days ensemble for a GM (see module docstring) and return per-item percentile
+    bands of the daily mean listing price, for item_ids only if given. workers=1 runs in-process,
+    as does any call from a thread other than the main one: the pool is forked, and forking a
+    threaded web worker is not safe, so GM requests go through the price_forecast job instead.
+    progress_callback(members_done, members) is called as members finish; exceptions it raises
+    (e.g. JobCancelled) stop the forecast.
+    """
+    config = config or default_config
+    days = max(1, days or config.forecast_days)
+    members = max(1, members or config.forecast_members)
+    workers = workers or config.forecast_workers or os.cpu_count() or 1
+    if threading.current_thread() is not threading.main_thread():
+        workers = 1
+
+    world = ForecastWorld.load(gm_profile_id, config)
+    seeds = member_seeds(config.random_seed, gm_profile_id, members)
+    results = []
+    if workers <= 1 or members == 1 or world.snapshot.size == 0:
+        for seed in seeds:
+            results.append(simulate_member(world, days, seed)[np.newaxis])
+            if progress_callback:
+                progress_callback(len(results), members)
+    else:
+        # A few chunks per process so progress moves steadily
+        chunks = [
+            chunk.tolist()
+            for chunk in np.array_split(np.array(seeds, dtype=np.int64), min(workers * 4, members))
+        ]
+        # Workers only run NumPy on the copied world, so forking the app process is safe
+        context = mp.get_context("fork") if "fork" in mp.get_all_start_methods() else None
+        pool = ProcessPoolExecutor(
+            max_workers=min(workers, len(chunks)), mp_context=context, initializer=_init_worker, initargs=(world,)
+        )
+        try:
+            futures = [pool.submit(_run_members, days, chunk) for chunk in chunks]
+            done = 0
+            for future, chunk in zip(futures, chunks):
+                results.append(future.result())
+                done += len(chunk)
+                if progress_callback:
+                    progress_callback(done, members)
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+    ensemble = np.concatenate(results)  # members x days x items
+
+    columns = np.arange(len(world.item_ids))
+    if item_ids is not None:
+        columns = np.flatnonzero(np.isin(world.item_ids, np.fromiter(item_ids, dtype=np.int64)))
+    return PriceForecast(
+        gm_profile_id=gm_profile_id,
+        start_tick=world.start_tick,
+        days=days,
+        members=members,
+        percentiles=tuple(percentiles),
+        item_ids=world.item_ids[columns],
+        current_price=world.item_means(world.snapshot.dynamic_price)[columns],
+        bands=np.percentile(ensemble[:, :, columns], percentiles, axis=0),
+    )
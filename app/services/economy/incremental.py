@@ -0,0 +1,128 @@
+# app/services/economy/incremental.py
+"""
+Dirty-set incremental pricing.
+
+A row's price only moves materially when its inputs change; otherwise it is its last full price
+with a new random fluctuation. Each tick therefore splits the snapshot in two:
+
+- dirty rows get the full price_snapshot() recompute (modifiers, events, trade diffusion). A row is
+  dirty when its stock differs from the stock it was last priced at (purchases, restocks,
+  production, crafting, event shocks) or it was never priced. Diffusion couples the listings of an
+  item across cities, so every row of a dirty item is recomputed with it, which makes the dirty
+  prices identical to a full pass.
+- clean rows drift: anchor_price (the full price at neutral fluctuation, stored at the last
+  recompute) times a fresh fluctuation, clamped and rounded. One gather and one multiply per row.
+
+World-wide inputs (modifier totals, items, events, trade routes, topology and the pricing
+settings) are summarised by pricing_fingerprint(); when it differs from the one stored on
+GMSimulationState every row is dirty. Tick cost then scales with what changed, not with inventory size.
+"""
+import hashlib
+from typing import Tuple
+
+import numpy as np
+from sqlalchemy import update
+
+from app.extensions import db
+from app.models.backend import ShopInventory
+from app.services.cache_invalidation import (
+    CACHE_EVENTS,
+    CACHE_ITEMS,
+    CACHE_MODIFIERS,
+    CACHE_TOPOLOGY,
+    CACHE_TRADE_ROUTES,
+    get_cache_versions,
+)
+from app.services.economy.pricing import FLUCTUATION_HIGH, FLUCTUATION_LOW, price_snapshot
+from app.services.economy.rng import STREAM_PRICE_DRIFT, counter_uniforms
+
+_FINGERPRINT_KINDS = (CACHE_MODIFIERS, CACHE_ITEMS, CACHE_EVENTS, CACHE_TRADE_ROUTES, CACHE_TOPOLOGY)
+
+# Uniform that gives a fluctuation of exactly 1.0
+_NEUTRAL_NOISE = (1.0 - FLUCTUATION_LOW) / (FLUCTUATION_HIGH - FLUCTUATION_LOW)
+
+
+def pricing_fingerprint(gm_profile_id: int, modifier_index, seed: int, diffusion_rate: float, region_weight: float) -> str:
+    """
+    Digest of everything that can change many prices at once. The modifier arrays are hashed
+    rather than versioned because modifier date windows open and close without any edit.
+    """
+    digest = hashlib.sha1()
+    digest.update(repr((get_cache_versions(gm_profile_id, _FINGERPRINT_KINDS), seed, diffusion_rate, region_weight)).encode())
+    if modifier_index is not None:
+        digest.update(repr(modifier_index.global_add).encode())
+        for values in (modifier_index.city_add, modifier_index.shop_add, modifier_index.item_add, modifier_index.region_add):
+            digest.update(np.ascontiguousarray(values).tobytes())
+    return digest.hexdigest()
+
+
+def dirty_rows(snapshot) -> np.ndarray:
+    """Boolean mask of rows needing a full recompute: changed stock or never priced, closed over items."""
+    changed = np.isnan(snapshot.anchor_price) | (snapshot.stock != snapshot.priced_stock)
+    if not changed.any():
+        return changed
+    return np.isin(snapshot.item_id, np.unique(snapshot.item_id[changed]))
+
+
+def drift_kernel(gm_profile_id: int, tick: int, inventory_ids, anchors, floors, ceilings, seed: int = 0) -> np.ndarray:
+    """Drifted prices for aligned arrays: anchor x the row's fluctuation at `tick`, clamped and rounded."""
+    noise = counter_uniforms(seed, gm_profile_id, tick, inventory_ids, STREAM_PRICE_DRIFT)
+    fluctuation = FLUCTUATION_LOW + (FLUCTUATION_HIGH - FLUCTUATION_LOW) * noise
+    return np.round(np.clip(np.asarray(anchors, dtype=np.float64) * fluctuation, floors, ceilings), 2)
+
+
+def drift_prices(snapshot, rows: np.ndarray, tick: int, seed: int = 0) -> np.ndarray:
+    """Cheap price update for clean rows: anchor_price x fluctuation, clamped and rounded."""
+    return drift_kernel(
+        snapshot.gm_profile_id,
+        tick,
+        snapshot.inventory_id[rows],
+        snapshot.anchor_price[rows],
+        snapshot.price_floor[rows],
+        snapshot.price_ceiling[rows],
+        seed,
+    )
+
+
+def incremental_price_snapshot(
+    snapshot,
+    modifier_index,
+    tick: int,
+    seed: int = 0,
+    trade_network=None,
+    diffusion_rate: float = 0.0,
+    events=None,
+    full: bool = False,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    New price per snapshot row, recomputing only dirty rows (all rows if full).
+    Returns (prices, dirty mask, anchor prices of the dirty rows).
+    """
+    dirty = np.ones(snapshot.size, dtype=bool) if full else dirty_rows(snapshot)
+    prices = np.empty(snapshot.size)
+    anchors = np.empty(0)
+    if dirty.any():
+        rows = np.flatnonzero(dirty)
+        sub = snapshot if full else snapshot.subset(rows)
+        kwargs = dict(trade_network=trade_network, diffusion_rate=diffusion_rate, events=events)
+        prices[rows] = price_snapshot(sub, modifier_index, tick, seed=seed, **kwargs)
+        anchors = price_snapshot(
+            sub, modifier_index, tick, seed=seed, noise=np.full(len(sub.pair_row), _NEUTRAL_NOISE), **kwargs
+        )
+    clean = np.flatnonzero(~dirty)
+    if len(clean):
+        prices[clean] = drift_prices(snapshot, clean, tick, seed)
+    return prices, dirty, anchors
+
+
+def write_anchors(inventory_ids, anchors, stock) -> int:
+    """Bulk UPDATE of anchor_price / priced_stock by primary key in the caller's transaction; returns rows written."""
+    params = [
+        {"inventory_id": inventory_id, "anchor_price": anchor, "priced_stock": priced_stock}
+        for inventory_id, anchor, priced_stock in zip(
+            np.asarray(inventory_ids).tolist(), np.asarray(anchors).tolist(), np.asarray(stock).tolist()
+        )
+    ]
+    if params:
+        db.session.execute(update(ShopInventory), params)
+    return len(params)
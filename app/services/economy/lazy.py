@@ -0,0 +1,135 @@
+# app/services/economy/lazy.py
+"""
+Lazy on-read pricing.
+
+With SimulationConfig.lazy_pricing the tick only writes the rows it fully recomputed (dirty rows,
+see incremental.py) plus, every lazy_compaction_interval ticks, all rows. Every other row keeps the
+dynamic_price of the tick in priced_tick; its price at a later tick T is the incremental drift
+
+    drift_kernel(anchor_price, T) = anchor_price x fluctuation(seed, GM, T, inventory row)
+
+which depends only on the anchor and T, so it can be evaluated whenever the row is read and gives
+exactly what an eager tick would have written. A year of ticks for shops nobody visits therefore
+writes nothing for them. Everything that shows a price goes through current_prices(); writers that
+use a price (purchases) call materialize_prices() first so the stored price is the one charged.
+Both take the tick's SimulationConfig so readers agree with a custom-config engine.
+"""
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+from sqlalchemy import select, update
+
+from app.config.simulation_config import default_config
+from app.extensions import db
+from app.models.backend import Shop, ShopInventory
+from app.models.simulation_state import GMSimulationState
+from app.services.economy.catalog import get_item_catalog
+from app.services.economy.incremental import drift_kernel
+
+
+def lazy_pricing_enabled(config=None) -> bool:
+    config = config or default_config
+    return config.lazy_pricing and config.incremental_pricing
+
+
+def evaluate_prices(
+    gm_profile_id: int,
+    tick: int,
+    inventory_ids,
+    item_ids,
+    stored_prices,
+    anchor_prices,
+    priced_ticks,
+    seed: int = 0,
+) -> np.ndarray:
+    """
+    Price of each row at `tick` for aligned arrays (anchor NaN / priced tick -1 when unknown).
+    Rows materialized at or after `tick`, or without an anchor, keep their stored price.
+    """
+    prices = np.asarray(stored_prices, dtype=np.float64).copy()
+    anchors = np.asarray(anchor_prices, dtype=np.float64)
+    stale = (np.asarray(priced_ticks, dtype=np.int64) < tick) & ~np.isnan(anchors)
+    if stale.any():
+        catalog = get_item_catalog(gm_profile_id)
+        item_ordinal = catalog.ordinals(np.asarray(item_ids, dtype=np.int64)[stale])
+        prices[stale] = drift_kernel(
+            gm_profile_id,
+            tick,
+            np.asarray(inventory_ids, dtype=np.int64)[stale],
+            anchors[stale],
+            catalog.price_floor[item_ordinal],
+            catalog.price_ceiling[item_ordinal],
+            seed,
+        )
+    return prices
+
+
+def _load_rows(gm_profile_id: int, inventory_ids: Optional[Iterable[int]]):
+    query = select(
+        ShopInventory.inventory_id,
+        ShopInventory.item_id,
+        ShopInventory.dynamic_price,
+        ShopInventory.anchor_price,
+        ShopInventory.priced_tick,
+    )
+    if inventory_ids is None:
+        query = query.join(Shop, ShopInventory.shop_id == Shop.shop_id).where(Shop.gm_profile_id == gm_profile_id)
+    else:
+        query = query.where(ShopInventory.inventory_id.in_(list(inventory_ids)))
+    rows = db.session.execute(query.order_by(ShopInventory.inventory_id)).all()
+    n = len(rows)
+    columns = list(zip(*rows)) if rows else [()] * 5
+    return (
+        np.fromiter(columns[0], dtype=np.int64, count=n),
+        np.fromiter(columns[1], dtype=np.int64, count=n),
+        np.fromiter(columns[2], dtype=np.float64, count=n),
+        np.fromiter((np.nan if a is None else a for a in columns[3]), dtype=np.float64, count=n),
+        np.fromiter((-1 if t is None else t for t in columns[4]), dtype=np.int64, count=n),
+    )
+
+
+def _current_tick(gm_profile_id: int) -> int:
+    return GMSimulationState.get_or_create(gm_profile_id).current_tick or 0
+
+
+def current_prices(gm_profile_id: int, inventory_ids: Iterable[int], config=None) -> Dict[int, float]:
+    """
+    inventory_id -> price as of the GM's current tick (the stored price unless lazy pricing is on).
+    config must be the one the GM's ticks run with (default_config for the default engine).
+    """
+    config = config or default_config
+    inventory_ids = list(inventory_ids)
+    if not inventory_ids:
+        return {}
+    ids, item_ids, stored, anchors, priced_ticks = _load_rows(gm_profile_id, inventory_ids)
+    if lazy_pricing_enabled(config):
+        stored = evaluate_prices(
+            gm_profile_id, _current_tick(gm_profile_id), ids, item_ids, stored, anchors, priced_ticks,
+            seed=config.random_seed,
+        )
+    return dict(zip(ids.tolist(), stored.tolist()))
+
+
+def materialize_prices(gm_profile_id: int, inventory_ids: Optional[Iterable[int]] = None, config=None) -> int:
+    """
+    Write the current price of stale rows (all of the GM's rows if inventory_ids is None) in the
+    caller's transaction. Used before a price is charged and for periodic compaction.
+    config is the GM's tick config, as for current_prices(). Returns the number of rows written.
+    """
+    config = config or default_config
+    if not lazy_pricing_enabled(config):
+        return 0
+    tick = _current_tick(gm_profile_id)
+    ids, item_ids, stored, anchors, priced_ticks = _load_rows(gm_profile_id, inventory_ids)
+    stale = (priced_ticks < tick) & ~np.isnan(anchors)
+    if not stale.any():
+        return 0
+    prices = evaluate_prices(
+        gm_profile_id, tick, ids[stale], item_ids[stale], stored[stale], anchors[stale], priced_ticks[stale],
+        seed=config.random_seed,
+    )
+    db.session.execute(update(ShopInventory), [
+        {"inventory_id": inventory_id, "dynamic_price": price, "priced_tick": tick}
+        for inventory_id, price in zip(ids[stale].tolist(), prices.tolist())
+    ])
+    return int(stale.sum())
@@ -0,0 +1,126 @@
+# app/services/economy/markets.py
+"""
+Materialized market aggregates.
+
+After pricing, the tick groups the snapshot arrays (NumPy, no per-row ORM work) into one
+RegionalMarket row per (city, item) and one GlobalMarket row per item, then bulk-upserts them.
+Player market views read these rows instead of joining inventory, shops, cities and items.
+
+- total_supply: units in stock across the listings.
+- total_demand: implied units demanded, stock scaled by price / base price (a listing priced 20%
+  above base counts 1.2 units of demand per unit of stock).
+- average_price: unweighted mean dynamic price of the listings.
+
+A shop linked to several cities counts in each city's regional row but only once globally.
+GlobalMarket rows are keyed by (GM, item): a GM's shops may stock items another GM created, and
+both GMs then keep their own row for that item. Regional rows are keyed by (city, item), and
+cities belong to one GM.
+"""
+from datetime import datetime
+from typing import Dict
+
+import numpy as np
+from sqlalchemy import delete
+
+from app.extensions import db
+from app.models.market import GlobalMarket, RegionalMarket
+from app.services.economy.snapshot import NO_CITY
+from app.utils.sql import dialect_insert
+
+
+def _group(keys: np.ndarray, supply: np.ndarray, demand: np.ndarray, prices: np.ndarray):
+    """Group aligned arrays by key rows; returns (unique keys, supply, demand, mean price, count)."""
+    unique_keys, inverse = np.unique(keys, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    groups = len(unique_keys)
+    counts = np.bincount(inverse, minlength=groups)
+    return (
+        unique_keys,
+        np.bincount(inverse, weights=supply, minlength=groups),
+        np.bincount(inverse, weights=demand, minlength=groups),
+        np.bincount(inverse, weights=prices, minlength=groups) / counts,
+        counts,
+    )
+
+
+def _upsert(model, conflict_columns, rows) -> None:
+    if not rows:
+        return
+    insert_stmt = dialect_insert(model.__table__)
+    new = insert_stmt.excluded
+    db.session.execute(
+        insert_stmt.on_conflict_do_update(
+            index_elements=conflict_columns,
+            set_={
+                "total_supply": new.total_supply,
+                "total_demand": new.total_demand,
+                "average_price": new.average_price,
+                "listing_count": new.listing_count,
+                "last_updated": new.last_updated,
+            },
+        ),
+        rows,
+    )
+
+
+def aggregate_markets(snapshot, prices: np.ndarray, updated_at: datetime) -> Dict[str, int]:
+    """
+    Recompute and upsert RegionalMarket/GlobalMarket rows for the snapshot's GM from this tick's
+    prices, and delete rows for (city, item) pairs that no longer have listings.
+    Runs in the caller's transaction. Returns {"regional": rows, "global": rows}.
+    """
+    gm_profile_id = snapshot.gm_profile_id
+    prices = np.asarray(prices, dtype=np.float64)
+    supply = snapshot.stock.astype(np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        price_ratio = np.where(snapshot.base_price > 0, prices / snapshot.base_price, 1.0)
+    demand = supply * price_ratio
+
+    regional_rows, global_rows = [], []
+    if snapshot.size:
+        in_city = snapshot.pair_city_id != NO_CITY
+        rows = snapshot.pair_row[in_city]
+        if len(rows):
+            keys = np.column_stack([snapshot.pair_city_id[in_city], snapshot.item_id[rows]])
+            keys, g_supply, g_demand, g_price, g_count = _group(keys, supply[rows], demand[rows], prices[rows])
+            regional_rows = [
+                {
+                    "city_id": city_id,
+                    "item_id": item_id,
+                    "total_supply": int(round(s)),
+                    "total_demand": int(round(d)),
+                    "average_price": round(p, 2),
+                    "listing_count": c,
+                    "last_updated": updated_at,
+                    "gm_profile_id": gm_profile_id,
+                }
+                for (city_id, item_id), s, d, p, c in zip(
+                    keys.tolist(), g_supply.tolist(), g_demand.tolist(), g_price.tolist(), g_count.tolist()
+                )
+            ]
+
+        keys, g_supply, g_demand, g_price, g_count = _group(snapshot.item_id[:, None], supply, demand, prices)
+        global_rows = [
+            {
+                "item_id": item_id,
+                "total_supply": int(round(s)),
+                "total_demand": int(round(d)),
+                "average_price": round(p, 2),
+                "listing_count": c,
+                "last_updated": updated_at,
+                "gm_profile_id": gm_profile_id,
+            }
+            for (item_id,), s, d, p, c in zip(
+                keys.tolist(), g_supply.tolist(), g_demand.tolist(), g_price.tolist(), g_count.tolist()
+            )
+        ]
+
+    _upsert(RegionalMarket, ["city_id", "item_id"], regional_rows)
+    _upsert(GlobalMarket, ["gm_profile_id", "item_id"], global_rows)
+
+    # Anything not refreshed in this pass has no listings any more
+    for model in (RegionalMarket, GlobalMarket):
+        db.session.execute(
+            delete(model).where(model.gm_profile_id == gm_profile_id, model.last_updated < updated_at)
+        )
+    return {"regional": len(regional_rows), "global": len(global_rows)}
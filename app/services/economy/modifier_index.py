@@ -0,0 +1,177 @@
+# app/services/economy/modifier_index.py
+"""
+Precompiled demand-modifier index.
+
+Built once per GM per tick from DemandModifier.get_active_modifiers(gm_profile_id): every active
+modifier is folded into dense additive arrays (per city, shop, item and region ordinal), so the
+modifier total for any (city, shop, item) is a few array gathers instead of a scan over all
+modifiers and their targets.
+
+Semantics follow demand.get_active_modifiers: the total starts at 1.0, each global modifier adds its
+effect_value once, and each matching target adds its modifier's effect_value. Region targets, which
+the old scan ignored, are applied too: a "region" target's entity_id names a city, and every city in
+that city's region is affected.
+"""
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+
+from app.extensions import db
+from app.models.backend import City, Shop, Item
+from app.models.market import DemandModifier, ModifierTarget
+from app.services.cache_invalidation import CACHE_CATALOG, CACHE_MODIFIERS, get_cache_versions
+
+_INDEX_KINDS = (CACHE_MODIFIERS, CACHE_CATALOG)
+
+
+class ModifierIndex:
+    """Dense per-entity modifier sums for one GM (see module docstring)."""
+
+    def __init__(self, gm_profile_id: int, city_ids, city_regions, shop_ids, item_ids):
+        self.gm_profile_id = gm_profile_id
+        # Sorted ids; an entity's ordinal is its position here
+        self.city_ids = np.asarray(city_ids, dtype=np.int64)
+        self.shop_ids = np.asarray(shop_ids, dtype=np.int64)
+        self.item_ids = np.asarray(item_ids, dtype=np.int64)
+
+        region_names = sorted({r for r in city_regions if r})
+        self._region_ordinals = {name: i for i, name in enumerate(region_names)}
+        # Region ordinal per city ordinal; cities without a region point at a trailing zero slot
+        self.city_region = np.array(
+            [self._region_ordinals.get(r, len(region_names)) for r in city_regions], dtype=np.int64
+        )
+
+        self.global_add = 0.0
+        self.city_add = np.zeros(len(self.city_ids) + 1)
+        self.shop_add = np.zeros(len(self.shop_ids) + 1)
+        self.item_add = np.zeros(len(self.item_ids) + 1)
+        self.region_add = np.zeros(len(region_names) + 1)
+        self.modifier_count = 0
+
+    # -- ordinals ------------------------------------------------------------
+
+    @staticmethod
+    def _ordinals(sorted_ids: np.ndarray, ids) -> np.ndarray:
+        """Map ids to ordinals; unknown ids (or None) map to the trailing zero slot len(sorted_ids)."""
+        ids = np.array([-1 if i is None else i for i in np.atleast_1d(ids)], dtype=np.int64)
+        if len(sorted_ids) == 0:
+            return np.zeros(len(ids), dtype=np.int64)
+        pos = np.minimum(np.searchsorted(sorted_ids, ids), len(sorted_ids) - 1)
+        return np.where(sorted_ids[pos] == ids, pos, len(sorted_ids))
+
+    def city_ordinals(self, city_ids) -> np.ndarray:
+        return self._ordinals(self.city_ids, city_ids)
+
+    def shop_ordinals(self, shop_ids) -> np.ndarray:
+        return self._ordinals(self.shop_ids, shop_ids)
+
+    def item_ordinals(self, item_ids) -> np.ndarray:
+        return self._ordinals(self.item_ids, item_ids)
+
+    # -- lookups -------------------------------------------------------------
+
+    def totals(self, city_ord: np.ndarray, shop_ord: np.ndarray, item_ord: np.ndarray) -> np.ndarray:
+        """Modifier totals for aligned ordinal arrays (use len(city_ids) etc. for "no city")."""
+        region_ord = np.append(self.city_region, len(self.region_add) - 1)[city_ord]
+        return (
+            1.0
+            + self.global_add
+            + self.city_add[city_ord]
+            + self.shop_add[shop_ord]
+            + self.item_add[item_ord]
+            + self.region_add[region_ord]
+        )
+
+    def city_effects(self, city_ord: np.ndarray) -> np.ndarray:
+        """City plus region part of the totals, for callers that combine cities separately."""
+        region_ord = np.append(self.city_region, len(self.region_add) - 1)[city_ord]
+        return self.city_add[city_ord] + self.region_add[region_ord]
+
+    def total_for(self, city_id: Optional[int], shop_id: Optional[int], item_id: Optional[int]) -> float:
+        """Scalar convenience wrapper around totals()."""
+        return float(self.totals(
+            self.city_ordinals(city_id), self.shop_ordinals(shop_id), self.item_ordinals(item_id)
+        )[0])
+
+    # -- building ------------------------------------------------------------
+
+    def _add_target(self, entity_type: str, entity_id: int, value: float) -> None:
+        """Add a target's effect; targets pointing at another GM's (or deleted) entities are ignored."""
+        if entity_type == "city":
+            ordinal = self.city_ordinals(entity_id)[0]
+            if ordinal < len(self.city_ids):
+                self.city_add[ordinal] += value
+        elif entity_type == "shop":
+            ordinal = self.shop_ordinals(entity_id)[0]
+            if ordinal < len(self.shop_ids):
+                self.shop_add[ordinal] += value
+        elif entity_type == "item":
+            ordinal = self.item_ordinals(entity_id)[0]
+            if ordinal < len(self.item_ids):
+                self.item_add[ordinal] += value
+        elif entity_type == "region":
+            ordinal = self.city_ordinals(entity_id)[0]
+            if ordinal < len(self.city_ids):
+                self.region_add[self.city_region[ordinal]] += value
+
+    @classmethod
+    def build(cls, gm_profile_id: int) -> "ModifierIndex":
+        cities = db.session.execute(
+            select(City.city_id, City.region).where(City.gm_profile_id == gm_profile_id).order_by(City.city_id)
+        ).all()
+        shop_ids = db.session.execute(
+            select(Shop.shop_id).where(Shop.gm_profile_id == gm_profile_id).order_by(Shop.shop_id)
+        ).scalars().all()
+        item_ids = db.session.execute(
+            select(Item.item_id).where(Item.gm_profile_id == gm_profile_id).order_by(Item.item_id)
+        ).scalars().all()
+        index = cls(
+            gm_profile_id,
+            [c.city_id for c in cities],
+            [c.region for c in cities],
+            shop_ids,
+            item_ids,
+        )
+
+        modifiers = {m.id: m for m in DemandModifier.get_active_modifiers(gm_profile_id)}
+        for mod in modifiers.values():
+            if mod.scope == "global":
+                index.global_add += mod.effect_value
+        index.modifier_count = len(modifiers)
+        if modifiers:
+            # All targets in one query rather than a lazy load per modifier
+            targets = db.session.execute(
+                select(ModifierTarget.modifier_id, ModifierTarget.entity_type, ModifierTarget.entity_id)
+                .where(ModifierTarget.modifier_id.in_(list(modifiers)))
+            ).all()
+            for modifier_id, entity_type, entity_id in targets:
+                index._add_target(entity_type, entity_id, modifiers[modifier_id].effect_value)
+        return index
+
+
+# gm_profile_id -> (tick, versions, index); one entry per GM per process
+_index_cache: Dict[int, Tuple[Optional[int], Tuple[int, ...], ModifierIndex]] = {}
+
+
+def get_modifier_index(gm_profile_id: int, tick: Optional[int] = None) -> ModifierIndex:
+    """
+    Cached ModifierIndex for a GM. Rebuilt when the tick changes (modifier date windows move with
+    time) or when modifiers/catalog have been edited since it was built. tick=None (outside the
+    tick loop) accepts whichever tick's index is cached.
+    """
+    versions = get_cache_versions(gm_profile_id, _INDEX_KINDS)
+    cached = _index_cache.get(gm_profile_id)
+    if cached and (tick is None or cached[0] == tick) and cached[1] == versions:
+        return cached[2]
+    index = ModifierIndex.build(gm_profile_id)
+    _index_cache[gm_profile_id] = (tick, versions, index)
+    return index
+
+
+def invalidate_modifier_index(gm_profile_id: Optional[int] = None) -> None:
+    """Drop cached indexes in this process (all GMs if gm_profile_id is None)."""
+    if gm_profile_id is None:
+        _index_cache.clear()
+    else:
+        _index_cache.pop(gm_profile_id, None)
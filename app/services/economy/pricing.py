@@ -0,0 +1,189 @@
+# app/services/economy/pricing.py
+"""
+Vectorized pricing kernel shared by every economy code path.
+
+price_kernel() prices whole arrays of inventory rows at once: demand from the rarity ordinal
+(Common=1 .. Legendary=5, see catalog.py), stock and a bounded random fluctuation, scaled by the
+DemandModifier total, applied to the base price and clamped to
+PRICE_FLOOR_MULTIPLIER..PRICE_CEILING_MULTIPLIER of base. The scalar helpers
+(calculate_demand, calculate_dynamic_price) and the simulation tick all go through it, so there
+is exactly one pricing formula.
+
+Randomness comes in as `noise` (uniforms in [0, 1), one per row) or is drawn from `rng`.
+price_snapshot() always uses counter-based noise from economy.rng keyed by (GM, tick, inventory row,
+city), so a tick's prices can be recomputed exactly from the same inputs.
+"""
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import update
+
+from app.config.simulation_config import default_config
+from app.extensions import db
+from app.models.backend import ShopInventory
+from app.models.simulation_state import GMSimulationState
+from app.models.users import GMProfile
+from app.services.economy.catalog import PRICE_CEILING_MULTIPLIER, PRICE_FLOOR_MULTIPLIER
+from app.services.economy.modifier_index import get_modifier_index
+from app.services.economy.rng import STREAM_PRICE_FLUCTUATION, counter_uniforms
+from app.services.economy.snapshot import WorldSnapshot
+from app.services.economy.trade_network import get_trade_network
+
+# Demand = (1 + rarity * RARITY_WEIGHT - max(MIN_STOCK_EFFECT, stock / 100 * STOCK_WEIGHT)) * fluctuation
+RARITY_WEIGHT = 0.2
+STOCK_WEIGHT = 0.1
+MIN_STOCK_EFFECT = 0.1
+FLUCTUATION_LOW = 0.9
+FLUCTUATION_HIGH = 1.1
+
+_default_rng = np.random.default_rng()
+
+
+def _noise(size: int, rng: Optional[np.random.Generator], noise) -> np.ndarray:
+    if noise is not None:
+        return np.broadcast_to(np.asarray(noise, dtype=np.float64), (size,))
+    return (rng or _default_rng).random(size)
+
+
+def demand_kernel(rarity, stock, rng: Optional[np.random.Generator] = None, noise=None) -> np.ndarray:
+    """Demand factor per row (rounded to 2 decimals) from rarity and stock arrays."""
+    rarity = np.asarray(rarity, dtype=np.float64)
+    stock = np.asarray(stock, dtype=np.float64)
+    rarity, stock = np.broadcast_arrays(rarity, stock)
+    fluctuation = FLUCTUATION_LOW + (FLUCTUATION_HIGH - FLUCTUATION_LOW) * _noise(rarity.size, rng, noise)
+    stock_effect = np.maximum(MIN_STOCK_EFFECT, stock / 100 * STOCK_WEIGHT)
+    return np.round((1 + rarity * RARITY_WEIGHT - stock_effect) * fluctuation.reshape(rarity.shape), 2)
+
+
+def price_kernel(
+    base_price,
+    rarity,
+    stock,
+    demand_modifier=1.0,
+    rng: Optional[np.random.Generator] = None,
+    noise=None,
+) -> np.ndarray:
+    """
+    Prices for aligned arrays of base price, rarity and stock.
+    demand_modifier is the DemandModifier total per row (1.0 = no active modifiers; negatives count as 0).
+    Returns clamped prices rounded to 2 decimals.
+    """
+    base_price = np.asarray(base_price, dtype=np.float64)
+    demand = demand_kernel(rarity, stock, rng=rng, noise=noise)
+    demand = demand * np.maximum(0.0, np.asarray(demand_modifier, dtype=np.float64))
+    price = np.clip(base_price * demand, base_price * PRICE_FLOOR_MULTIPLIER, base_price * PRICE_CEILING_MULTIPLIER)
+    return np.round(price, 2)
+
+
+def snapshot_noise(snapshot, tick: int, seed: int = 0) -> np.ndarray:
+    """Price-fluctuation uniforms for every (row, city) pair of a snapshot at a tick."""
+    return counter_uniforms(
+        seed,
+        snapshot.gm_profile_id,
+        tick,
+        snapshot.inventory_id[snapshot.pair_row],
+        STREAM_PRICE_FLUCTUATION,
+        lane=snapshot.pair_city_id,
+    )
+
+
+def price_snapshot(
+    snapshot,
+    modifier_index,
+    tick: int,
+    seed: int = 0,
+    noise=None,
+    trade_network=None,
+    diffusion_rate: float = 0.0,
+    events=None,
+) -> np.ndarray:
+    """
+    New price per snapshot row at a tick. Each row is priced once per linked city (city and region
+    modifiers differ between cities); active event effects (CompiledEvents) add their demand
+    deltas and price multipliers; with a trade_network the per-city prices then take one
+    diffusion step across trade routes, and the city prices are averaged per row. Deterministic
+    for the same snapshot, modifiers, events, routes, tick and seed; pass noise (one value per
+    pair) to override the draws.
+    """
+    if snapshot.size == 0:
+        return np.empty(0)
+    row_modifiers = modifier_index.totals(
+        np.full(snapshot.size, len(modifier_index.city_ids), dtype=np.int64),
+        modifier_index.shop_ordinals(snapshot.shop_id),
+        modifier_index.item_ordinals(snapshot.item_id),
+    )
+    pair_row = snapshot.pair_row
+    pair_modifiers = row_modifiers[pair_row] + modifier_index.city_effects(
+        modifier_index.city_ordinals(snapshot.pair_city_id)
+    )
+    event_mask = events.pair_mask(snapshot) if events is not None and len(events) else None
+    if event_mask is not None:
+        pair_modifiers = pair_modifiers + events.demand_deltas(event_mask)
+    pair_prices = price_kernel(
+        snapshot.base_price[pair_row],
+        snapshot.rarity[pair_row],
+        snapshot.stock[pair_row],
+        pair_modifiers,
+        noise=snapshot_noise(snapshot, tick, seed) if noise is None else noise,
+    )
+    adjusted = False
+    if event_mask is not None:
+        pair_prices = pair_prices * events.price_factors(event_mask)
+        adjusted = True
+    if trade_network is not None and diffusion_rate > 0:
+        pair_prices = trade_network.diffuse_pair_prices(snapshot, pair_prices, diffusion_rate)
+        adjusted = True
+    if adjusted:
+        pair_prices = np.round(np.clip(
+            pair_prices, snapshot.price_floor[pair_row], snapshot.price_ceiling[pair_row]
+        ), 2)
+    sums = np.bincount(pair_row, weights=pair_prices, minlength=snapshot.size)
+    counts = np.bincount(pair_row, minlength=snapshot.size)
+    return np.round(sums / np.maximum(counts, 1), 2)
+
+
+def write_prices(inventory_ids, prices, tick: Optional[int] = None) -> int:
+    """
+    Bulk UPDATE of dynamic_price by primary key in the caller's transaction; returns rows written.
+    With tick, priced_tick is set too (the tick the written price belongs to, see economy/lazy.py).
+    """
+    params = [
+        {"inventory_id": inventory_id, "dynamic_price": price}
+        for inventory_id, price in zip(np.asarray(inventory_ids).tolist(), np.asarray(prices).tolist())
+    ]
+    if tick is not None:
+        for row in params:
+            row["priced_tick"] = tick
+    if params:
+        db.session.execute(update(ShopInventory), params)
+    return len(params)
+
+
+def update_shop_prices(gm_profile_id: Optional[int] = None, seed: Optional[int] = None) -> int:
+    """
+    Reprice inventory outside the tick (one GM, or every GM if gm_profile_id is None) and commit.
+    Prices use each GM's current tick, so they match what that tick would produce for the current
+    stock and modifiers. Only rows whose price changed are written. Returns the number of rows updated.
+    """
+    seed = default_config.random_seed if seed is None else seed
+    if gm_profile_id is None:
+        gm_ids = db.session.execute(db.select(GMProfile.id)).scalars().all()
+    else:
+        gm_ids = [gm_profile_id]
+
+    updated = 0
+    for gm_id in gm_ids:
+        snapshot = WorldSnapshot.load(gm_id)
+        tick = GMSimulationState.get_or_create(gm_id).current_tick or 0
+        prices = price_snapshot(
+            snapshot,
+            get_modifier_index(gm_id),
+            tick,
+            seed,
+            trade_network=get_trade_network(gm_id, default_config.region_route_weight),
+            diffusion_rate=default_config.trade_diffusion_rate,
+        )
+        changed = prices != snapshot.dynamic_price
+        updated += write_prices(snapshot.inventory_id[changed], prices[changed])
+    db.session.commit()
+    return updated
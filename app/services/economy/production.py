@@ -0,0 +1,134 @@
+# app/services/economy/production.py
+"""
+Batched ResourceNode production.
+
+Every node of a GM produces production_rate x quality units of its item per tick. A node's output
+goes to the shops in the node's city that list that item, split evenly between their inventory
+rows; output with no listing in the city is recorded but not stocked. Fractional units are rounded
+stochastically with the counter-based RNG, so low-rate nodes still deliver over time and results
+are reproducible per (GM, tick, row).
+
+Deliveries stop at a listing's capacity, production_capacity x its restock target stock
+(app/services/economy/restock.py): a fed row fills up to capacity and then holds there, and the
+output it cannot take is recorded but not stocked, like output with no listing. Without the cap a
+fed row's stock grows every tick and its price settles on the kernel's floor. Stock a GM sets above
+capacity is left alone; production_capacity = 0 removes the cap.
+
+The whole stage is a handful of grouped NumPy operations over the node and snapshot arrays plus
+one bulk stock UPDATE and one bulk ProductionHistory INSERT.
+"""
+from datetime import datetime
+from typing import Dict, Optional
+
+import numpy as np
+from sqlalchemy import insert, select
+
+from app.extensions import db
+from app.models.production import ProductionHistory, ResourceNode
+from app.services.economy.restock import target_stock, write_stock
+from app.services.economy.rng import STREAM_PRODUCTION, counter_uniforms
+from app.services.economy.snapshot import NO_CITY
+
+
+def load_nodes(gm_profile_id: int) -> Dict[str, np.ndarray]:
+    """Node columns for a GM as arrays (nodes without an item are skipped)."""
+    rows = db.session.execute(
+        select(
+            ResourceNode.node_id,
+            ResourceNode.city_id,
+            ResourceNode.item_id,
+            ResourceNode.production_rate,
+            ResourceNode.quality,
+        ).where(ResourceNode.gm_profile_id == gm_profile_id, ResourceNode.item_id.isnot(None))
+    ).all()
+    columns = list(zip(*rows)) if rows else [()] * 5
+    n = len(rows)
+    return {
+        "node_id": np.fromiter(columns[0], dtype=np.int64, count=n),
+        "city_id": np.fromiter(columns[1], dtype=np.int64, count=n),
+        "item_id": np.fromiter(columns[2], dtype=np.int64, count=n),
+        "production_rate": np.fromiter(columns[3], dtype=np.float64, count=n),
+        "quality": np.fromiter(columns[4], dtype=np.float64, count=n),
+    }
+
+
+def production_capacity(snapshot, multiplier: float) -> Optional[np.ndarray]:
+    """Stock capacity per snapshot row for deliveries (None when multiplier <= 0, i.e. uncapped)."""
+    if multiplier <= 0:
+        return None
+    return np.floor(target_stock(snapshot) * multiplier).astype(np.int64)
+
+
+def production_deliveries(snapshot, nodes: Dict[str, np.ndarray], tick: int, seed: int = 0, capacity=None):
+    """
+    Returns (units produced per node, whole units delivered per snapshot row) for one tick.
+    capacity (one per row, see production_capacity()) limits each row's stock after delivery.
+    """
+    produced = np.maximum(0.0, nodes["production_rate"]) * np.clip(nodes["quality"], 0.0, 1.0)
+    delivered = np.zeros(snapshot.size, dtype=np.int64)
+    if not len(produced) or not snapshot.size:
+        return produced, delivered
+
+    # Key every node and every (row, city) pair by (city, item) and match them up
+    in_city = snapshot.pair_city_id != NO_CITY
+    pair_index = np.flatnonzero(in_city)
+    pair_keys = np.column_stack([snapshot.pair_city_id[in_city], snapshot.item_id[snapshot.pair_row[in_city]]])
+    node_keys = np.column_stack([nodes["city_id"], nodes["item_id"]])
+    keys, inverse = np.unique(np.vstack([pair_keys, node_keys]), axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    pair_key, node_key = inverse[:len(pair_keys)], inverse[len(pair_keys):]
+
+    output_per_key = np.bincount(node_key, weights=produced, minlength=len(keys))
+    listings_per_key = np.bincount(pair_key, minlength=len(keys))
+    share = output_per_key[pair_key] / np.maximum(listings_per_key[pair_key], 1)
+
+    draws = counter_uniforms(
+        seed,
+        snapshot.gm_profile_id,
+        tick,
+        snapshot.inventory_id[snapshot.pair_row[pair_index]],
+        STREAM_PRODUCTION,
+        lane=snapshot.pair_city_id[pair_index],
+    )
+    units = np.floor(share + draws).astype(np.int64)
+    np.add.at(delivered, snapshot.pair_row[pair_index], units)
+    if capacity is not None:
+        delivered = np.minimum(delivered, np.maximum(0, capacity - snapshot.stock))
+    return produced, delivered
+
+
+def apply_production(
+    snapshot,
+    tick: int,
+    recorded_at: datetime,
+    seed: int = 0,
+    record_history: bool = True,
+    capacity: float = 0.0,
+) -> Dict[str, int]:
+    """
+    Run one tick of production for the snapshot's GM: add delivered units to shop stock (rows
+    that receive nothing are not written), update snapshot.stock in place and append one
+    ProductionHistory row per node. capacity is the production_capacity multiplier (0 = uncapped).
+    Runs in the caller's transaction.
+    Returns {"nodes": nodes, "rows": inventory rows written, "units": units delivered}.
+    """
+    nodes = load_nodes(snapshot.gm_profile_id)
+    if not len(nodes["node_id"]):
+        return {"nodes": 0, "rows": 0, "units": 0}
+    produced, delivered = production_deliveries(
+        snapshot, nodes, tick, seed, capacity=production_capacity(snapshot, capacity)
+    )
+
+    changed = delivered > 0
+    new_stock = snapshot.stock + delivered
+    written = write_stock(snapshot.inventory_id[changed], new_stock[changed])
+    snapshot.stock = new_stock
+
+    if record_history:
+        db.session.execute(insert(ProductionHistory), [
+            {"node_id": node_id, "date": recorded_at, "amount_produced": amount, "quality": quality}
+            for node_id, amount, quality in zip(
+                nodes["node_id"].tolist(), produced.tolist(), nodes["quality"].tolist()
+            )
+        ])
+    return {"nodes": len(produced), "rows": written, "units": int(delivered.sum())}
@@ -0,0 +1,214 @@
+# app/services/economy/restock.py
+"""
+Vectorized, timer-driven restocking.
+
+Each shop restocks every restock_interval(shop type) ticks; a SimulationTimer per shop says when
+it is next due, so a tick only touches the inventory of shops that are due. Every inventory row
+has a target stock level:
+
+    target = RARITY_TARGETS[rarity tier] * city factor * shop type factor   (at least 1)
+
+The city factor comes from the population (or, without one, the size category) of the largest
+city the shop is linked to; shops without a city use 1.0. On each restock a row below target
+regains a fraction of the gap (see apply_due_restocks), with the fractional part rounded stochastically from the counter-based RNG
+so small gaps still refill over time. Rows at or above target are left alone (GMs may overstock).
+"""
+from typing import Dict, Tuple
+
+import numpy as np
+from sqlalchemy import select, update
+
+from app.extensions import db
+from app.models.backend import City, Shop, ShopInventory
+from app.services.cache_invalidation import CACHE_CATALOG, get_cache_versions
+from app.services.economy.rng import STREAM_RESTOCK, counter_uniforms
+from app.services.economy.snapshot import NO_CITY
+from app.services.timers import TIMER_RESTOCK, cancel_timers, due_timers, schedule_timers, scheduled_entities
+
+# Target stock per rarity tier before city/shop factors (index = tier; 0 unused)
+RARITY_TARGETS = np.array([0, 20, 10, 5, 2, 1], dtype=np.float64)
+
+# City size categories from the city forms, smallest first, with their restock factor
+CITY_SIZE_FACTORS = {
+    "hamlet": 0.25,
+    "village": 0.5,
+    "small town": 0.75,
+    "large town": 1.0,
+    "small city": 1.25,
+    "medium city": 1.5,
+    "large city": 2.0,
+    "metropolis": 3.0,
+}
+# Lower population bound of each size category after the first (same order as CITY_SIZE_FACTORS)
+POPULATION_BOUNDS = np.array([200, 1_000, 5_000, 20_000, 50_000, 200_000, 1_000_000])
+_SIZE_FACTOR_BY_RANK = np.array(list(CITY_SIZE_FACTORS.values()))
+
+# Shops that carry many units of few items restock more, specialists less
+SHOP_TYPE_FACTORS = {
+    "general store": 1.5,
+    "pawn shop": 1.2,
+    "blacksmith": 1.2,
+    "weapon shop": 1.0,
+    "armor shop": 1.0,
+    "potion shop": 1.0,
+    "bookstore": 0.8,
+    "magic shop": 0.6,
+    "jeweler": 0.5,
+}
+
+# Ticks (game days) between restocks by shop type
+SHOP_RESTOCK_INTERVALS = {
+    "general store": 7,
+    "pawn shop": 7,
+    "potion shop": 7,
+    "blacksmith": 7,
+    "weapon shop": 14,
+    "armor shop": 14,
+    "bookstore": 30,
+    "magic shop": 30,
+    "jeweler": 30,
+}
+DEFAULT_RESTOCK_INTERVAL = 7
+
+
+def city_factors(populations, sizes) -> np.ndarray:
+    """Restock factor per city: by population if known, else by size category, else 1.0."""
+    factors = np.ones(len(populations))
+    for i, (population, size) in enumerate(zip(populations, sizes)):
+        if population:
+            factors[i] = _SIZE_FACTOR_BY_RANK[np.searchsorted(POPULATION_BOUNDS, population, side="right")]
+        elif size:
+            factors[i] = CITY_SIZE_FACTORS.get(size.strip().lower(), 1.0)
+    return factors
+
+
+def restock_interval(shop_type) -> int:
+    """Ticks between restocks for a shop type."""
+    return SHOP_RESTOCK_INTERVALS.get((shop_type or "").strip().lower(), DEFAULT_RESTOCK_INTERVAL)
+
+
+def target_stock(snapshot, rows=None) -> np.ndarray:
+    """Target stock for the given snapshot row indices (all rows if None); see module docstring."""
+    rows = np.arange(snapshot.size) if rows is None else np.asarray(rows, dtype=np.int64)
+    if len(rows) == 0:
+        return np.zeros(0, dtype=np.int64)
+    shop_ids = np.unique(snapshot.shop_id[rows]).tolist()
+    in_rows = np.zeros(snapshot.size, dtype=bool)
+    in_rows[rows] = True
+    pairs = in_rows[snapshot.pair_row]
+    pair_cities = snapshot.pair_city_id[pairs]
+
+    city_ids = np.unique(pair_cities[pair_cities != NO_CITY]).tolist()
+    cities = db.session.execute(
+        select(City.city_id, City.population, City.size).where(City.city_id.in_(city_ids))
+    ).all() if city_ids else []
+    shops = db.session.execute(
+        select(Shop.shop_id, Shop.type).where(Shop.shop_id.in_(shop_ids))
+    ).all()
+
+    factor_by_city = dict(zip(
+        [c.city_id for c in cities],
+        city_factors([c.population for c in cities], [c.size for c in cities]).tolist(),
+    ))
+    pair_factor = np.array([factor_by_city.get(city_id, 1.0) for city_id in pair_cities.tolist()])
+    # Rows are looked up by position within `rows`
+    position = np.full(snapshot.size, -1, dtype=np.int64)
+    position[rows] = np.arange(len(rows))
+    row_city_factor = np.zeros(len(rows))
+    np.maximum.at(row_city_factor, position[snapshot.pair_row[pairs]], pair_factor)
+
+    factor_by_shop = {s.shop_id: SHOP_TYPE_FACTORS.get((s.type or "").strip().lower(), 1.0) for s in shops}
+    row_shop_factor = np.array([factor_by_shop.get(shop_id, 1.0) for shop_id in snapshot.shop_id[rows].tolist()])
+
+    tiers = np.clip(snapshot.rarity[rows], 1, 5)
+    return np.maximum(1, np.round(RARITY_TARGETS[tiers] * row_city_factor * row_shop_factor)).astype(np.int64)
+
+
+def restock_rows(snapshot, rows, tick: int, rates, seed: int = 0, targets=None) -> np.ndarray:
+    """
+    New stock for the given row indices after restocking; rates (scalar or one per row) is the
+    fraction of the gap to target closed. Deterministic per GM, tick and row. targets (one per
+    row) skips the target_stock() lookup.
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    stock = snapshot.stock[rows]
+    if len(rows) == 0:
+        return stock.copy()
+    if targets is None:
+        targets = target_stock(snapshot, rows)
+    gap = np.maximum(0, targets - stock) * np.clip(rates, 0.0, 1.0)
+    draws = counter_uniforms(seed, snapshot.gm_profile_id, tick, snapshot.inventory_id[rows], STREAM_RESTOCK)
+    return stock + np.floor(gap + draws).astype(np.int64)
+
+
+def write_stock(inventory_ids, stock) -> int:
+    """Bulk UPDATE of stock by primary key in the caller's transaction; returns rows written."""
+    params = [
+        {"inventory_id": inventory_id, "stock": units}
+        for inventory_id, units in zip(np.asarray(inventory_ids).tolist(), np.asarray(stock).tolist())
+    ]
+    if params:
+        db.session.execute(update(ShopInventory), params)
+    return len(params)
+
+
+# gm_profile_id -> catalog version the restock timers were last synced against (per process)
+_timers_synced: Dict[int, Tuple[int, ...]] = {}
+
+
+def sync_restock_timers(gm_profile_id: int, tick: int) -> int:
+    """
+    Give every shop of the GM a restock timer and drop timers of deleted shops. Only does work when
+    the GM's catalog changed since the last sync in this process. New shops are staggered over
+    their interval so restocks spread across ticks. Returns the number of timers created.
+    """
+    version = get_cache_versions(gm_profile_id, (CACHE_CATALOG,))
+    if _timers_synced.get(gm_profile_id) == version:
+        return 0
+    shops = db.session.execute(
+        select(Shop.shop_id, Shop.type).where(Shop.gm_profile_id == gm_profile_id)
+    ).all()
+    scheduled = scheduled_entities(gm_profile_id, TIMER_RESTOCK)
+    shop_ids = {s.shop_id for s in shops}
+    created = schedule_timers(gm_profile_id, TIMER_RESTOCK, [
+        (s.shop_id, tick + s.shop_id % restock_interval(s.type))
+        for s in shops if s.shop_id not in scheduled
+    ])
+    cancel_timers(gm_profile_id, TIMER_RESTOCK, [shop_id for shop_id in scheduled if shop_id not in shop_ids])
+    _timers_synced[gm_profile_id] = version
+    return created
+
+
+def reset_restock_timer_sync(gm_profile_id: int) -> None:
+    """Forget the sync state for a GM (e.g. after a rolled-back tick) so the next tick re-syncs."""
+    _timers_synced.pop(gm_profile_id, None)
+
+
+def apply_due_restocks(snapshot, tick: int, rate: float, seed: int = 0) -> Dict[str, int]:
+    """
+    Restock the shops whose restock timer is due and reschedule them one interval ahead.
+    A shop restocking every N ticks closes 1 - (1 - rate)^N of its gap, the same as N daily steps.
+    Writes only rows whose stock changed and updates snapshot.stock in place so later stages
+    (pricing) see the new levels. Returns {"shops": shops due, "rows": rows written, "units": units added}.
+    """
+    gm_profile_id = snapshot.gm_profile_id
+    sync_restock_timers(gm_profile_id, tick)
+    due_shops = due_timers(gm_profile_id, TIMER_RESTOCK, tick)
+    if not due_shops or rate <= 0:
+        return {"shops": len(due_shops), "rows": 0, "units": 0}
+
+    shops = db.session.execute(select(Shop.shop_id, Shop.type).where(Shop.shop_id.in_(due_shops))).all()
+    intervals = {shop.shop_id: restock_interval(shop.type) for shop in shops}
+    rows = np.flatnonzero(np.isin(snapshot.shop_id, list(intervals)))
+    row_intervals = np.array([intervals[shop_id] for shop_id in snapshot.shop_id[rows].tolist()])
+    new_stock = restock_rows(snapshot, rows, tick, 1 - (1 - min(rate, 1.0)) ** row_intervals, seed)
+
+    changed = new_stock != snapshot.stock[rows]
+    units = int((new_stock - snapshot.stock[rows])[changed].sum())
+    written = write_stock(snapshot.inventory_id[rows][changed], new_stock[changed])
+    snapshot.stock[rows] = new_stock
+
+    schedule_timers(gm_profile_id, TIMER_RESTOCK, [(shop_id, tick + n) for shop_id, n in intervals.items()])
+    # Timers of shops that no longer exist
+    cancel_timers(gm_profile_id, TIMER_RESTOCK, [shop_id for shop_id in due_shops if shop_id not in intervals])
+    return {"shops": len(due_shops), "rows": written, "units": units}
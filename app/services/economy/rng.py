@@ -0,0 +1,54 @@
+# app/services/economy/rng.py
+"""
+Counter-based randomness for the economy.
+
+Every random draw is a pure function of (seed, gm_profile_id, tick, entity_id, stream, lane): the
+inputs are chained through the SplitMix64 finalizer, which turns them into a well-mixed 64-bit
+value. Nothing is stateful, so a price can be recomputed identically later (lazy pricing, replay,
+verification), and workers pricing disjoint rows in any order get the same numbers as a serial run.
+
+Streams separate independent uses of the same entity in the same tick (price fluctuation, restock,
+...); lane distinguishes several draws per entity in one stream (e.g. one per linked city).
+"""
+import numpy as np
+
+# Stream ids; append new ones, never renumber (that would change every past draw)
+STREAM_PRICE_FLUCTUATION = 1
+STREAM_RESTOCK = 2
+STREAM_PRODUCTION = 3
+STREAM_CRAFTING = 4
+STREAM_PRICE_DRIFT = 5
+STREAM_FORECAST = 6
+
+_GOLDEN_GAMMA = np.uint64(0x9E3779B97F4A7C15)
+_MIX_1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX_2 = np.uint64(0x94D049BB133111EB)
+_UNIT_53 = 1.0 / (1 << 53)
+
+
+def _as_u64(values) -> np.ndarray:
+    """Reinterpret integers (negative ones included) as uint64 two's-complement words."""
+    return np.atleast_1d(np.asarray(values, dtype=np.int64)).view(np.uint64)
+
+
+def splitmix64(x: np.ndarray) -> np.ndarray:
+    """SplitMix64 output function applied element-wise (uint64 arithmetic wraps)."""
+    z = x + _GOLDEN_GAMMA
+    z = (z ^ (z >> np.uint64(30))) * _MIX_1
+    z = (z ^ (z >> np.uint64(27))) * _MIX_2
+    return z ^ (z >> np.uint64(31))
+
+
+def counter_bits(seed: int, gm_profile_id: int, tick: int, entity_ids, stream: int, lane=0) -> np.ndarray:
+    """64 random bits per entity id for the given key; entity_ids and lane broadcast together."""
+    entity_ids, lane = np.broadcast_arrays(_as_u64(entity_ids), _as_u64(lane))
+    h = splitmix64(_as_u64(seed) ^ _as_u64(gm_profile_id))
+    h = splitmix64(h ^ _as_u64(tick))
+    h = splitmix64(h ^ _as_u64(stream))
+    h = splitmix64(h ^ entity_ids)
+    return splitmix64(h ^ lane)
+
+
+def counter_uniforms(seed: int, gm_profile_id: int, tick: int, entity_ids, stream: int, lane=0) -> np.ndarray:
+    """Uniform floats in [0, 1) (53-bit resolution), one per entity id, for the given key."""
+    return (counter_bits(seed, gm_profile_id, tick, entity_ids, stream, lane) >> np.uint64(11)) * _UNIT_53
@@ -0,0 +1,139 @@
+# app/services/economy/settlement.py
+"""
+Settlement of PlayerInvestment income and ShopMaintenance costs on the game clock.
+
+Settlement is measured in ticks (one tick = one game day), not wall-clock time:
+- an investment earns amount_invested x income_yield per day (income_yield is a daily fraction);
+- a shop's maintenance costs daily_cost per day and is shared by the shop's investors in proportion
+  to stake_percentage (0-100). Shops have no balance of their own, so the share not covered by
+  investor stakes (stakes summing to under 100%) is not charged to anyone;
+- days due = tick - last settled tick, so a settlement that runs after several skipped days
+  catches up exactly, and run_time_period (one settlement per tick) pays one day per tick.
+Rows seen for the first time start accruing at the current tick.
+
+Player.currency is whole units: each investment's net amount is added to its pending_income and
+only the whole part is credited, the fraction carries over. A balance never drops below zero:
+maintenance a player can't pay stays in their investments' pending_income as a negative amount
+(debt) and is settled out of later income.
+
+The pass loads the GM's investments and maintenance rows once, computes everything with NumPy and
+writes back with three bulk UPDATEs, all in the tick's transaction.
+"""
+from datetime import datetime
+from typing import Dict
+
+import numpy as np
+from sqlalchemy import bindparam, func, select, update
+
+from app.extensions import db
+from app.models.economy import PlayerInvestment, ShopMaintenance
+from app.models.users import Player
+
+
+def _days_due(last_ticks, tick: int) -> np.ndarray:
+    last = np.array([tick if t is None else t for t in last_ticks], dtype=np.int64)
+    return np.maximum(0, tick - last)
+
+
+def settle_accounts(gm_profile_id: int, tick: int, now: datetime) -> Dict[str, int]:
+    """
+    Settle every investment and maintenance row of a GM up to `tick`.
+    Returns {"investments": rows settled, "maintenance": rows settled, "players": players credited,
+    "credited": net whole currency credited}.
+    """
+    investments = db.session.execute(
+        select(
+            PlayerInvestment.investment_id,
+            PlayerInvestment.player_id,
+            PlayerInvestment.shop_id,
+            PlayerInvestment.amount_invested,
+            PlayerInvestment.income_yield,
+            PlayerInvestment.stake_percentage,
+            PlayerInvestment.last_payout_tick,
+            PlayerInvestment.pending_income,
+        ).where(PlayerInvestment.gm_profile_id == gm_profile_id)
+    ).all()
+    maintenance = db.session.execute(
+        select(
+            ShopMaintenance.maintenance_id,
+            ShopMaintenance.shop_id,
+            ShopMaintenance.daily_cost,
+            ShopMaintenance.last_payment_tick,
+        ).where(ShopMaintenance.gm_profile_id == gm_profile_id)
+    ).all()
+    result = {"investments": len(investments), "maintenance": len(maintenance), "players": 0, "credited": 0}
+    if not investments and not maintenance:
+        return result
+
+    # Maintenance due per shop
+    charge_by_shop: Dict[int, float] = {}
+    if maintenance:
+        cost_due = np.array([m.daily_cost or 0.0 for m in maintenance]) * _days_due(
+            [m.last_payment_tick for m in maintenance], tick
+        )
+        for shop_id, cost in zip([m.shop_id for m in maintenance], cost_due.tolist()):
+            charge_by_shop[shop_id] = charge_by_shop.get(shop_id, 0.0) + cost
+        db.session.execute(update(ShopMaintenance), [
+            {"maintenance_id": m.maintenance_id, "last_payment_tick": tick, "last_payment": now}
+            for m in maintenance
+        ])
+
+    if not investments:
+        return result
+
+    days = _days_due([i.last_payout_tick for i in investments], tick)
+    amount = np.array([i.amount_invested or 0.0 for i in investments])
+    income_yield = np.array([i.income_yield or 0.0 for i in investments])
+    stake = np.clip(np.array([i.stake_percentage or 0.0 for i in investments]), 0.0, 100.0) / 100.0
+    shop_charge = np.array([charge_by_shop.get(i.shop_id, 0.0) for i in investments])
+
+    total = np.array([i.pending_income or 0.0 for i in investments]) + amount * income_yield * days - shop_charge * stake
+    credited = np.floor(total)
+
+    player_ids, inverse = np.unique(np.array([i.player_id for i in investments], dtype=np.int64), return_inverse=True)
+    inverse = inverse.reshape(-1)
+    per_player = np.bincount(inverse, weights=credited, minlength=len(player_ids))
+    if (per_player < 0).any():
+        # Debit at most the current balance; rows are locked so the balance can't move meanwhile
+        balances = dict(db.session.execute(
+            select(Player.id, func.coalesce(Player.currency, 0))
+            .where(Player.id.in_(player_ids.tolist()))
+            .with_for_update()
+        ).all())
+        balance = np.array([balances.get(player_id, 0) for player_id in player_ids.tolist()], dtype=np.float64)
+        shortfall = np.maximum(0.0, -(balance + per_player))
+        if shortfall.any():
+            # Hand the unpaid part back to the player's debited investments, pro rata
+            debits = np.minimum(credited, 0.0)
+            debit_per_player = np.bincount(inverse, weights=debits, minlength=len(player_ids))
+            share = np.divide(debits, debit_per_player[inverse], out=np.zeros_like(debits), where=debits < 0)
+            credited = credited + share * shortfall[inverse]
+            per_player = per_player + shortfall
+    pending = total - credited
+
+    db.session.execute(update(PlayerInvestment), [
+        {
+            "investment_id": i.investment_id,
+            "last_payout_tick": tick,
+            "pending_income": carry,
+            "last_payout": now,
+        }
+        for i, carry in zip(investments, pending.tolist())
+    ])
+
+    nonzero = per_player != 0
+    if nonzero.any():
+        # Increment in SQL so purchases committed meanwhile are not overwritten
+        table = Player.__table__
+        db.session.execute(
+            update(table)
+            .where(table.c.id == bindparam("player_id"))
+            .values(currency=func.coalesce(table.c.currency, 0) + bindparam("delta")),
+            [
+                {"player_id": player_id, "delta": int(round(delta))}
+                for player_id, delta in zip(player_ids[nonzero].tolist(), per_player[nonzero].tolist())
+            ],
+        )
+    result["players"] = int(nonzero.sum())
+    result["credited"] = int(per_player.sum())
+    return result
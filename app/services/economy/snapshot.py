@@ -0,0 +1,141 @@
+# app/services/economy/snapshot.py
+"""
+Columnar snapshot of one GM's priced inventory.
+
+Loaded with one plain SELECT of inventory rows into NumPy arrays; per-item columns are gathered
+from the cached ItemCatalog and city links from the cached ShopTopology, so pricing runs as array
+operations and never touches ORM objects. Rows are ordered by
+inventory_id; pair_* arrays list every (inventory row, city) combination used for per-city pricing.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+from sqlalchemy import select
+
+from app.extensions import db
+from app.models.backend import Shop, ShopInventory
+from app.services.economy.catalog import get_item_catalog, invalidate_item_catalog
+from app.services.economy.topology import get_shop_topology
+
+# City id used for shops that are not linked to any city
+NO_CITY = -1
+
+
+@dataclass
+class WorldSnapshot:
+    gm_profile_id: int
+    inventory_id: np.ndarray
+    shop_id: np.ndarray
+    item_id: np.ndarray
+    stock: np.ndarray
+    dynamic_price: np.ndarray
+    # Incremental pricing state; anchor_price is NaN and priced_stock -1 for never-recomputed rows
+    anchor_price: np.ndarray
+    priced_stock: np.ndarray
+    # Tick dynamic_price belongs to (-1 if never materialized by a tick)
+    priced_tick: np.ndarray
+    # Per-item columns gathered from the cached ItemCatalog through item_ordinal
+    item_ordinal: np.ndarray
+    base_price: np.ndarray
+    # Rarity ordinal 1 (Common) - 5 (Legendary)
+    rarity: np.ndarray
+    price_floor: np.ndarray
+    price_ceiling: np.ndarray
+    # One entry per (row, city); rows whose shop has no city get a single NO_CITY pair
+    pair_row: np.ndarray
+    pair_city_id: np.ndarray
+
+    @property
+    def size(self) -> int:
+        return len(self.inventory_id)
+
+    def primary_city_id(self) -> np.ndarray:
+        """Lowest linked city id per row (NO_CITY if none), used when one city must be reported."""
+        primary = np.full(self.size, np.iinfo(np.int64).max, dtype=np.int64)
+        np.minimum.at(primary, self.pair_row, self.pair_city_id)
+        return primary
+
+    def subset(self, rows: np.ndarray) -> "WorldSnapshot":
+        """Snapshot of the given rows (sorted positions), with their city pairs renumbered."""
+        rows = np.asarray(rows, dtype=np.int64)
+        position = np.full(self.size, -1, dtype=np.int64)
+        position[rows] = np.arange(len(rows))
+        keep = position[self.pair_row] >= 0
+        return WorldSnapshot(
+            gm_profile_id=self.gm_profile_id,
+            inventory_id=self.inventory_id[rows],
+            shop_id=self.shop_id[rows],
+            item_id=self.item_id[rows],
+            stock=self.stock[rows],
+            dynamic_price=self.dynamic_price[rows],
+            anchor_price=self.anchor_price[rows],
+            priced_stock=self.priced_stock[rows],
+            priced_tick=self.priced_tick[rows],
+            item_ordinal=self.item_ordinal[rows],
+            base_price=self.base_price[rows],
+            rarity=self.rarity[rows],
+            price_floor=self.price_floor[rows],
+            price_ceiling=self.price_ceiling[rows],
+            pair_row=position[self.pair_row[keep]],
+            pair_city_id=self.pair_city_id[keep],
+        )
+
+    @classmethod
+    def load(cls, gm_profile_id: int) -> "WorldSnapshot":
+        rows = db.session.execute(
+            select(
+                ShopInventory.inventory_id,
+                ShopInventory.shop_id,
+                ShopInventory.item_id,
+                ShopInventory.stock,
+                ShopInventory.dynamic_price,
+                ShopInventory.anchor_price,
+                ShopInventory.priced_stock,
+                ShopInventory.priced_tick,
+            )
+            .join(Shop, ShopInventory.shop_id == Shop.shop_id)
+            .where(Shop.gm_profile_id == gm_profile_id)
+            .order_by(ShopInventory.inventory_id)
+        ).all()
+
+        n = len(rows)
+        columns = list(zip(*rows)) if rows else [()] * 8
+        item_id = np.fromiter(columns[2], dtype=np.int64, count=n)
+        catalog = get_item_catalog(gm_profile_id)
+        item_ordinal = catalog.ordinals(item_id)
+        if (item_ordinal < 0).any():
+            # Stocked an item the cached catalog has not seen (e.g. another GM's item): rebuild once
+            invalidate_item_catalog(gm_profile_id)
+            catalog = get_item_catalog(gm_profile_id)
+            item_ordinal = catalog.ordinals(item_id)
+        snapshot = cls(
+            gm_profile_id=gm_profile_id,
+            inventory_id=np.fromiter(columns[0], dtype=np.int64, count=n),
+            shop_id=np.fromiter(columns[1], dtype=np.int64, count=n),
+            item_id=item_id,
+            stock=np.fromiter((s or 0 for s in columns[3]), dtype=np.int64, count=n),
+            dynamic_price=np.fromiter(columns[4], dtype=np.float64, count=n),
+            anchor_price=np.fromiter((np.nan if a is None else a for a in columns[5]), dtype=np.float64, count=n),
+            priced_stock=np.fromiter((-1 if s is None else s for s in columns[6]), dtype=np.int64, count=n),
+            priced_tick=np.fromiter((-1 if t is None else t for t in columns[7]), dtype=np.int64, count=n),
+            item_ordinal=item_ordinal,
+            base_price=catalog.base_price[item_ordinal],
+            rarity=catalog.rarity[item_ordinal],
+            price_floor=catalog.price_floor[item_ordinal],
+            price_ceiling=catalog.price_ceiling[item_ordinal],
+            pair_row=np.empty(0, dtype=np.int64),
+            pair_city_id=np.empty(0, dtype=np.int64),
+        )
+        snapshot._load_city_pairs()
+        return snapshot
+
+    def _load_city_pairs(self) -> None:
+        topology = get_shop_topology(self.gm_profile_id)
+        position, city_ordinal = topology.expand_shops(self.shop_id)
+        # Rows whose shop has no city keep a single NO_CITY pair
+        unlinked = np.flatnonzero(np.bincount(position, minlength=self.size) == 0)
+        pair_row = np.concatenate((position, unlinked))
+        pair_city = np.concatenate((topology.city_ids[city_ordinal], np.full(len(unlinked), NO_CITY, dtype=np.int64)))
+        order = np.argsort(pair_row, kind="stable")
+        self.pair_row = pair_row[order]
+        self.pair_city_id = pair_city[order]
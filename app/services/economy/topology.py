@@ -0,0 +1,145 @@
+# app/services/economy/topology.py
+"""
+Per-GM shop/city topology cache.
+
+The shop_cities links of one GM as CSR index arrays in both directions:
+
+    cities of shop ordinal s = city_ordinals_by_shop[shop_city_indptr[s]:shop_city_indptr[s + 1]]
+    shops of city ordinal c  = shop_ordinals_by_city[city_shop_indptr[c]:city_shop_indptr[c + 1]]
+
+with sorted shop_ids/city_ids arrays mapping ids to ordinals. Built with three SELECTs and kept
+per process until a Shop or City of the GM is added, edited, deleted or re-linked (the "topology"
+cache version, which also moves on changes to Shop.cities / City.shops collections), so ticks and
+views resolve which cities a shop is in with array lookups instead of relationship loads.
+"""
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+
+from app.extensions import db
+from app.models.backend import City, Shop, shop_cities
+from app.services.cache_invalidation import CACHE_TOPOLOGY, get_cache_versions
+
+
+def _csr(sources: np.ndarray, targets: np.ndarray, n_sources: int) -> Tuple[np.ndarray, np.ndarray]:
+    """CSR (indptr, indices) of the edges sources[i] -> targets[i]; targets sorted within each source."""
+    order = np.lexsort((targets, sources))
+    counts = np.bincount(sources, minlength=n_sources)
+    indptr = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+    return indptr, targets[order].astype(np.int64)
+
+
+class ShopTopology:
+    """Shop <-> city adjacency for one GM (see module docstring)."""
+
+    def __init__(self, gm_profile_id: int, shops, cities, links):
+        self.gm_profile_id = gm_profile_id
+        # Sorted ids; an entity's ordinal is its position here
+        self.shop_ids = np.array([s.shop_id for s in shops], dtype=np.int64)
+        self.shop_types: List[str] = [s.type for s in shops]
+        self.city_ids = np.array([c.city_id for c in cities], dtype=np.int64)
+        self.city_names: List[str] = [c.name for c in cities]
+
+        link_shops = self.shop_ordinals([shop_id for shop_id, _ in links])
+        link_cities = self.city_ordinals([city_id for _, city_id in links])
+        known = (link_shops >= 0) & (link_cities >= 0)
+        link_shops, link_cities = link_shops[known], link_cities[known]
+        self.shop_city_indptr, self.city_ordinals_by_shop = _csr(link_shops, link_cities, len(self.shop_ids))
+        self.city_shop_indptr, self.shop_ordinals_by_city = _csr(link_cities, link_shops, len(self.city_ids))
+
+    @property
+    def link_count(self) -> int:
+        return len(self.city_ordinals_by_shop)
+
+    # -- ordinals ------------------------------------------------------------
+
+    @staticmethod
+    def _ordinals(sorted_ids: np.ndarray, ids) -> np.ndarray:
+        """Map ids to ordinals; unknown ids map to -1."""
+        ids = np.atleast_1d(np.asarray(ids, dtype=np.int64))
+        if len(sorted_ids) == 0:
+            return np.full(ids.shape, -1, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(sorted_ids, ids), len(sorted_ids) - 1)
+        return np.where(sorted_ids[pos] == ids, pos, -1)
+
+    def shop_ordinals(self, shop_ids) -> np.ndarray:
+        return self._ordinals(self.shop_ids, shop_ids)
+
+    def city_ordinals(self, city_ids) -> np.ndarray:
+        return self._ordinals(self.city_ids, city_ids)
+
+    # -- lookups -------------------------------------------------------------
+
+    def _city_ordinals_of(self, shop_id: int) -> np.ndarray:
+        s = self.shop_ordinals(shop_id)[0]
+        if s < 0:
+            return np.empty(0, dtype=np.int64)
+        return self.city_ordinals_by_shop[self.shop_city_indptr[s]:self.shop_city_indptr[s + 1]]
+
+    def city_ids_of(self, shop_id: int) -> List[int]:
+        """Cities a shop is linked to, by city id (empty for unknown shops)."""
+        return self.city_ids[self._city_ordinals_of(shop_id)].tolist()
+
+    def city_names_of(self, shop_id: int) -> List[str]:
+        """Names of the cities a shop is linked to, in city id order."""
+        return [self.city_names[c] for c in self._city_ordinals_of(shop_id).tolist()]
+
+    def shop_ids_in(self, city_id: int) -> List[int]:
+        """Shops linked to a city, by shop id (empty for unknown cities)."""
+        c = self.city_ordinals(city_id)[0]
+        if c < 0:
+            return []
+        return self.shop_ids[self.shop_ordinals_by_city[self.city_shop_indptr[c]:self.city_shop_indptr[c + 1]]].tolist()
+
+    def expand_shops(self, shop_ids) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (position, city ordinal) for every city link of each entry of shop_ids, in input order;
+        unknown or unlinked shops produce no pairs.
+        """
+        shop_ord = self.shop_ordinals(shop_ids)
+        valid = shop_ord >= 0
+        starts = np.where(valid, self.shop_city_indptr[np.maximum(shop_ord, 0)], 0)
+        counts = np.where(valid, self.shop_city_indptr[np.maximum(shop_ord, 0) + 1] - starts, 0)
+        position = np.repeat(np.arange(len(shop_ord), dtype=np.int64), counts)
+        # Offset of each pair within its shop's CSR row
+        offsets = np.arange(len(position), dtype=np.int64) - np.repeat(np.cumsum(counts) - counts, counts)
+        return position, self.city_ordinals_by_shop[np.repeat(starts, counts) + offsets]
+
+    @classmethod
+    def build(cls, gm_profile_id: int) -> "ShopTopology":
+        shops = db.session.execute(
+            select(Shop.shop_id, Shop.type).where(Shop.gm_profile_id == gm_profile_id).order_by(Shop.shop_id)
+        ).all()
+        cities = db.session.execute(
+            select(City.city_id, City.name).where(City.gm_profile_id == gm_profile_id).order_by(City.city_id)
+        ).all()
+        links = db.session.execute(
+            select(shop_cities.c.shop_id, shop_cities.c.city_id)
+            .join(Shop, shop_cities.c.shop_id == Shop.shop_id)
+            .where(Shop.gm_profile_id == gm_profile_id)
+        ).all()
+        return cls(gm_profile_id, shops, cities, links)
+
+
+# gm_profile_id -> (versions, topology); one entry per GM per process
+_topology_cache: Dict[int, Tuple[Tuple[int, ...], ShopTopology]] = {}
+
+
+def get_shop_topology(gm_profile_id: int) -> ShopTopology:
+    """Cached ShopTopology for a GM, rebuilt when its shops, cities or their links have changed."""
+    versions = get_cache_versions(gm_profile_id, (CACHE_TOPOLOGY,))
+    cached = _topology_cache.get(gm_profile_id)
+    if cached and cached[0] == versions:
+        return cached[1]
+    topology = ShopTopology.build(gm_profile_id)
+    _topology_cache[gm_profile_id] = (versions, topology)
+    return topology
+
+
+def invalidate_shop_topology(gm_profile_id: Optional[int] = None) -> None:
+    """Drop cached topologies in this process (all GMs if gm_profile_id is None)."""
+    if gm_profile_id is None:
+        _topology_cache.clear()
+    else:
+        _topology_cache.pop(gm_profile_id, None)
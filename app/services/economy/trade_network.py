@@ -0,0 +1,178 @@
+# app/services/economy/trade_network.py
+"""
+Trade network between a GM's cities, used to diffuse price signals each tick.
+
+Cities are linked two ways:
+- explicit TradeRoute rows (two-way, weighted), stored as a CSR adjacency (indptr/indices/weights);
+- implicit links between every pair of cities in the same region, each with region_weight. These
+  are never materialized: a region's links are a complete graph, so the neighbour sum is the
+  region total minus the city's own value, computed with one grouped sum per region.
+
+A diffusion step moves each (city, item) price signal (mean price / base price of that item's
+listings in the city) a fraction `rate` towards the weighted mean of the neighbouring cities that
+also list the item. Cost is O((routes + cities) x items) per tick, all in NumPy.
+"""
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+
+from app.extensions import db
+from app.models.backend import City
+from app.models.trade_route import TradeRoute
+from app.services.cache_invalidation import CACHE_CATALOG, CACHE_TRADE_ROUTES, get_cache_versions
+from app.services.economy.snapshot import NO_CITY
+
+_NETWORK_KINDS = (CACHE_CATALOG, CACHE_TRADE_ROUTES)
+
+
+def csr_matmul(indptr: np.ndarray, indices: np.ndarray, weights: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Sparse (CSR) matrix times dense matrix: out[i] = sum over edges i->j of weight * values[j]."""
+    out = np.zeros((len(indptr) - 1, values.shape[1]))
+    if len(indices) == 0:
+        return out
+    rows = np.flatnonzero(np.diff(indptr))
+    # Edges are grouped by source row, so each non-empty row is one contiguous reduceat segment
+    out[rows] = np.add.reduceat(weights[:, None] * values[indices], indptr[rows], axis=0)
+    return out
+
+
+class TradeNetwork:
+    """Route adjacency for one GM's cities (see module docstring)."""
+
+    def __init__(self, gm_profile_id: int, city_ids, city_regions, routes, region_weight: float = 1.0):
+        self.gm_profile_id = gm_profile_id
+        self.city_ids = np.asarray(city_ids, dtype=np.int64)
+        self.region_weight = float(region_weight)
+        n = len(self.city_ids)
+
+        region_names = sorted({r for r in city_regions if r})
+        region_ordinals = {name: i for i, name in enumerate(region_names)}
+        # Region ordinal per city ordinal, -1 for cities without a region
+        self.city_region = np.array([region_ordinals.get(r, -1) for r in city_regions], dtype=np.int64)
+        self.region_count = len(region_names)
+
+        routes = np.asarray(routes, dtype=np.float64).reshape(-1, 3)
+        src = self.city_ordinals(routes[:, 0].astype(np.int64))
+        dst = self.city_ordinals(routes[:, 1].astype(np.int64))
+        keep = (src < n) & (dst < n) & (src != dst) & (routes[:, 2] > 0)
+        # Two-way routes: add both directions, then merge duplicates by summing their weights
+        src, dst = np.concatenate([src[keep], dst[keep]]), np.concatenate([dst[keep], src[keep]])
+        edge_keys, inverse = np.unique(src * n + dst, return_inverse=True)
+        weights = np.bincount(inverse.reshape(-1), weights=np.tile(routes[keep, 2], 2), minlength=len(edge_keys))
+        rows = edge_keys // max(n, 1)
+        self.indptr = np.concatenate([[0], np.cumsum(np.bincount(rows, minlength=n))]).astype(np.int64)
+        self.indices = (edge_keys % max(n, 1)).astype(np.int64)
+        self.weights = weights
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.indices)
+
+    def city_ordinals(self, city_ids) -> np.ndarray:
+        """Ordinal per city id; unknown ids map to len(city_ids)."""
+        city_ids = np.asarray(city_ids, dtype=np.int64)
+        n = len(self.city_ids)
+        if n == 0:
+            return np.zeros(len(city_ids), dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self.city_ids, city_ids), n - 1)
+        return np.where(self.city_ids[pos] == city_ids, pos, n)
+
+    def neighbor_sums(self, values: np.ndarray) -> np.ndarray:
+        """Weighted sum of each city's neighbours' rows of values (cities x columns)."""
+        out = csr_matmul(self.indptr, self.indices, self.weights, values)
+        if self.region_weight and self.region_count:
+            in_region = self.city_region >= 0
+            totals = np.zeros((self.region_count, values.shape[1]))
+            np.add.at(totals, self.city_region[in_region], values[in_region])
+            out[in_region] += self.region_weight * (totals[self.city_region[in_region]] - values[in_region])
+        return out
+
+    def diffuse(self, signal: np.ndarray, present: np.ndarray, rate: float) -> np.ndarray:
+        """
+        One diffusion step over a (cities x items) signal. Only cells where present is True take
+        part: they are pulled towards the weighted mean of present neighbours; other cells are unchanged.
+        """
+        signal = np.where(present, signal, 0.0)
+        neighbour_total = self.neighbor_sums(signal)
+        neighbour_weight = self.neighbor_sums(present.astype(np.float64))
+        active = present & (neighbour_weight > 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            neighbour_mean = neighbour_total / neighbour_weight
+        return np.where(active, signal + rate * (neighbour_mean - signal), signal)
+
+    def diffuse_pair_prices(self, snapshot, pair_prices: np.ndarray, rate: float) -> np.ndarray:
+        """
+        Apply one diffusion step to per-(row, city) prices of a WorldSnapshot. Every listing of an
+        item in a city is scaled by the change of that city's signal. The result is not clamped or
+        rounded; pricing.price_snapshot does that.
+        """
+        pair_prices = np.asarray(pair_prices, dtype=np.float64)
+        n = len(self.city_ids)
+        if rate <= 0 or n == 0 or len(pair_prices) == 0:
+            return pair_prices
+        city_ord = self.city_ordinals(snapshot.pair_city_id)
+        linked = (snapshot.pair_city_id != NO_CITY) & (city_ord < n)
+        if not linked.any():
+            return pair_prices
+
+        rows = snapshot.pair_row[linked]
+        base = snapshot.base_price[rows]
+        item_ids, item_col = np.unique(snapshot.item_id[rows], return_inverse=True)
+        item_col = item_col.reshape(-1)
+        cell = city_ord[linked] * len(item_ids) + item_col
+        cells = n * len(item_ids)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = np.where(base > 0, pair_prices[linked] / base, 1.0)
+        counts = np.bincount(cell, minlength=cells)
+        present = (counts > 0).reshape(n, len(item_ids))
+        signal = (np.bincount(cell, weights=ratio, minlength=cells) / np.maximum(counts, 1)).reshape(n, len(item_ids))
+
+        diffused = self.diffuse(signal, present, rate)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scale = np.where(signal > 0, diffused / signal, 1.0).reshape(-1)
+
+        result = pair_prices.copy()
+        result[linked] = pair_prices[linked] * scale[cell]
+        return result
+
+    @classmethod
+    def build(cls, gm_profile_id: int, region_weight: float = 1.0) -> "TradeNetwork":
+        cities = db.session.execute(
+            select(City.city_id, City.region).where(City.gm_profile_id == gm_profile_id).order_by(City.city_id)
+        ).all()
+        routes = db.session.execute(
+            select(TradeRoute.from_city_id, TradeRoute.to_city_id, TradeRoute.weight)
+            .where(TradeRoute.gm_profile_id == gm_profile_id)
+        ).all()
+        return cls(
+            gm_profile_id,
+            [c.city_id for c in cities],
+            [c.region for c in cities],
+            [tuple(r) for r in routes],
+            region_weight=region_weight,
+        )
+
+
+# gm_profile_id -> (versions, region_weight, network); one entry per GM per process
+_network_cache: Dict[int, Tuple[Tuple[int, ...], float, TradeNetwork]] = {}
+
+
+def get_trade_network(gm_profile_id: int, region_weight: float = 1.0) -> TradeNetwork:
+    """Cached TradeNetwork for a GM, rebuilt when cities or trade routes change."""
+    versions = get_cache_versions(gm_profile_id, _NETWORK_KINDS)
+    cached = _network_cache.get(gm_profile_id)
+    if cached and cached[0] == versions and cached[1] == region_weight:
+        return cached[2]
+    network = TradeNetwork.build(gm_profile_id, region_weight)
+    _network_cache[gm_profile_id] = (versions, region_weight, network)
+    return network
+
+
+def invalidate_trade_network(gm_profile_id: Optional[int] = None) -> None:
+    """Drop cached networks in this process (all GMs if gm_profile_id is None)."""
+    if gm_profile_id is None:
+        _network_cache.clear()
+    else:
+        _network_cache.pop(gm_profile_id, None)
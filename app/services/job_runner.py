@@ -0,0 +1,312 @@
+"""
+Local background job subsystem: DB-backed queue (SimulationJob rows), worker processes,
+progress counters and cooperative cancellation. No external broker; works on a single box.
+
+Flow: a GM endpoint calls enqueue_job() and returns immediately; a worker started with
+`flask sim-worker` claims the job, runs the registered handler and reports progress through
+JobProgress, which also raises JobCancelled once a cancel has been requested.
+"""
+import os
+import time
+import socket
+import traceback
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, Optional
+
+from sqlalchemy import update, select
+
+from app.extensions import db
+from app.models.jobs import SimulationJob
+from app.services.logging_config import simulation_logger
+from app.services.simulation import TickInProgressError
+
+# How long a job that found its GM's tick lock taken waits before it can be claimed again
+TICK_BUSY_RETRY_DELAY = timedelta(seconds=5)
+
+
+class JobCancelled(Exception):
+    """Raised from JobProgress.update() when the job's cancel flag has been set."""
+
+
+class JobProgress:
+    """
+    Progress reporter handed to job handlers.
+
+    Writes go through a short-lived engine connection, not db.session, so reporting progress never
+    commits (or rolls back) the handler's own unit of work. On SQLite a concurrent writer may hold
+    the database lock; progress is best-effort, so handlers should report at commit boundaries.
+    """
+
+    def __init__(self, job_id: int, min_interval: float = 0.5):
+        self.job_id = job_id
+        self.min_interval = min_interval
+        self._last_write = 0.0
+
+    def update(self, current: int, total: Optional[int] = None, message: Optional[str] = None, force: bool = False) -> None:
+        now = time.monotonic()
+        is_final = total is not None and current >= total
+        if not force and not is_final and now - self._last_write < self.min_interval:
+            return
+        self._last_write = now
+
+        values = {"progress_current": current, "heartbeat_at": datetime.utcnow()}
+        if total is not None:
+            values["progress_total"] = total
+        if message is not None:
+            values["message"] = message[:255]
+
+        table = SimulationJob.__table__
+        cancel_requested = False
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(update(table).where(table.c.id == self.job_id).values(**values))
+                cancel_requested = bool(conn.execute(
+                    select(table.c.cancel_requested).where(table.c.id == self.job_id)
+                ).scalar())
+        except Exception as e:
+            simulation_logger.warning("Progress update failed for job %s: %s", self.job_id, e)
+        if cancel_requested:
+            raise JobCancelled(f"Job {self.job_id} was cancelled")
+
+    def __call__(self, current: int, total: Optional[int] = None) -> None:
+        """Allows passing the reporter directly as a progress_callback(current, total)."""
+        self.update(current, total)
+
+
+# --- Handlers ---------------------------------------------------------------
+
+def _run_simulate_period(job: SimulationJob, progress: JobProgress) -> Dict:
+    from app.services.simulation import SimulationEngine
+
+    time_period = (job.params or {}).get("time_period", "day")
+    stats = SimulationEngine().run_time_period(
+        job.gm_profile_id,
+        time_period,
+        commit_each_tick=True,
+        progress_callback=progress,
+    )
+    return {
+        "time_period": time_period,
+        "ticks_completed": stats["ticks_completed"],
+        "shops_updated": stats["shops_updated"],
+        "items_updated": stats["items_updated"],
+        "total_duration": round(stats["total_duration"], 3),
+    }
+
+
+def _run_seed_world(job: SimulationJob, progress: JobProgress) -> Dict:
+    from app.scripts.seeder import seed_gm_data
+
+    params = dict(job.params or {})
+    success = seed_gm_data(job.gm_profile_id, progress_callback=progress, **params)
+    if not success:
+        raise RuntimeError("Seeding failed; check server logs for details.")
+    return {"seeded": True}
+
+
+def _run_aggregate_price_history(job: SimulationJob, progress: JobProgress) -> Dict:
+    from app.cli.price_history_aggregate import aggregate_old_price_history
+
+    progress.update(0, None, "Aggregating price history", force=True)
+    groups = aggregate_old_price_history(progress_callback=progress)
+    return {"groups": groups}
+
+
+def _run_price_forecast(job: SimulationJob, progress: JobProgress) -> Dict:
+    from app.models.backend import Item
+    from app.services.economy import forecast_prices
+
+    params = job.params or {}
+    forecast = forecast_prices(
+        job.gm_profile_id,
+        days=params.get("days"),
+        members=params.get("members"),
+        item_ids=params.get("item_ids"),
+        progress_callback=progress,
+    )
+    names = dict(db.session.execute(
+        select(Item.item_id, Item.name).where(Item.item_id.in_(forecast.item_ids.tolist()))
+    ).all())
+    return forecast.to_dict(names)
+
+
+JOB_HANDLERS: Dict[str, Callable[[SimulationJob, JobProgress], Dict]] = {
+    "simulate_period": _run_simulate_period,
+    "seed_world": _run_seed_world,
+    "aggregate_price_history": _run_aggregate_price_history,
+    "price_forecast": _run_price_forecast,
+}
+
+
+# --- Queue operations ---------------------------------------------------------
+
+def find_active_job(gm_profile_id: Optional[int], kinds: Optional[Iterable[str]] = None) -> Optional[SimulationJob]:
+    """Most recent queued/running job for a GM (optionally restricted to some kinds)."""
+    query = SimulationJob.query.filter(
+        SimulationJob.gm_profile_id == gm_profile_id,
+        SimulationJob.status.in_(SimulationJob.ACTIVE_STATUSES),
+    )
+    if kinds:
+        query = query.filter(SimulationJob.kind.in_(list(kinds)))
+    return query.order_by(SimulationJob.id.desc()).first()
+
+
+def enqueue_job(gm_profile_id: Optional[int], kind: str, params: Optional[Dict] = None, dedupe: bool = True) -> SimulationJob:
+    """
+    Queue a job and commit. With dedupe=True an already active job of the same kind for the
+    same GM is returned instead of queueing a second one.
+    """
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}. Must be one of {list(JOB_HANDLERS)}")
+    if dedupe:
+        existing = find_active_job(gm_profile_id, [kind])
+        if existing:
+            return existing
+    job = SimulationJob(gm_profile_id=gm_profile_id, kind=kind, params=params or {})
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def request_cancel(job: SimulationJob) -> SimulationJob:
+    """Cancel a queued job immediately; ask a running job to stop at its next progress update."""
+    if job.status == SimulationJob.STATUS_QUEUED:
+        job.status = SimulationJob.STATUS_CANCELLED
+        job.finished_at = datetime.utcnow()
+        job.message = "Cancelled before start"
+    elif job.status == SimulationJob.STATUS_RUNNING:
+        job.cancel_requested = True
+    db.session.commit()
+    return job
+
+
+def claim_next_job(worker_id: str) -> Optional[SimulationJob]:
+    """
+    Atomically move the oldest queued job to running. On PostgreSQL, FOR UPDATE SKIP LOCKED lets
+    several workers poll the same table without handing out a job twice.
+    Jobs for a GM that already has a running job are left queued so one GM's work stays ordered,
+    and requeued jobs wait until their not_before time.
+    """
+    busy_gms = select(SimulationJob.gm_profile_id).where(
+        SimulationJob.status == SimulationJob.STATUS_RUNNING,
+        SimulationJob.gm_profile_id.isnot(None),
+    )
+    job = (
+        SimulationJob.query
+        .filter(
+            SimulationJob.status == SimulationJob.STATUS_QUEUED,
+            (SimulationJob.not_before.is_(None)) | (SimulationJob.not_before <= datetime.utcnow()),
+            (SimulationJob.gm_profile_id.is_(None)) | (SimulationJob.gm_profile_id.notin_(busy_gms)),
+        )
+        .order_by(SimulationJob.id)
+        .with_for_update(skip_locked=True)
+        .first()
+    )
+    if not job:
+        db.session.rollback()
+        return None
+    now = datetime.utcnow()
+    job.status = SimulationJob.STATUS_RUNNING
+    job.worker_id = worker_id
+    job.started_at = now
+    job.heartbeat_at = now
+    db.session.commit()
+    return job
+
+
+def recover_stale_jobs(stale_after: timedelta = timedelta(minutes=10)) -> int:
+    """Fail running jobs whose worker stopped sending heartbeats (e.g. the process was killed)."""
+    cutoff = datetime.utcnow() - stale_after
+    stale = SimulationJob.query.filter(
+        SimulationJob.status == SimulationJob.STATUS_RUNNING,
+        SimulationJob.heartbeat_at < cutoff,
+    ).all()
+    for job in stale:
+        job.status = SimulationJob.STATUS_FAILED
+        job.error = "Worker stopped responding"
+        job.finished_at = datetime.utcnow()
+    db.session.commit()
+    return len(stale)
+
+
+def execute_job(job: SimulationJob) -> SimulationJob:
+    """Run a claimed job to completion and record its final status."""
+    job_id = job.id
+    handler = JOB_HANDLERS.get(job.kind)
+    progress = JobProgress(job_id)
+    status, result, error, message = SimulationJob.STATUS_SUCCEEDED, None, None, "Done"
+    try:
+        if handler is None:
+            raise ValueError(f"No handler registered for job kind {job.kind}")
+        result = handler(job, progress)
+    except JobCancelled:
+        db.session.rollback()
+        status, message = SimulationJob.STATUS_CANCELLED, "Cancelled"
+    except TickInProgressError:
+        # Another worker or a web request is ticking this GM; put the job back in line for later.
+        db.session.rollback()
+        job = db.session.get(SimulationJob, job_id, populate_existing=True)
+        job.status = SimulationJob.STATUS_QUEUED
+        job.worker_id = None
+        job.started_at = None
+        job.not_before = datetime.utcnow() + TICK_BUSY_RETRY_DELAY
+        job.message = "Waiting for the world's current tick to finish"
+        db.session.commit()
+        simulation_logger.info("Job %s requeued: GM %s is already ticking", job_id, job.gm_profile_id)
+        return job
+    except Exception as e:
+        db.session.rollback()
+        status, error, message = SimulationJob.STATUS_FAILED, traceback.format_exc(), f"Failed: {e}"
+        simulation_logger.error("Job %s failed: %s", job_id, e)
+
+    job = db.session.get(SimulationJob, job_id, populate_existing=True)
+    job.status = status
+    job.result = result
+    job.error = error
+    job.message = message[:255]
+    job.finished_at = datetime.utcnow()
+    db.session.commit()
+    return job
+
+
+def _ensure_partitions() -> None:
+    """Make sure ticks run by this worker have a price_history partition to write to."""
+    from app.cli.price_history_partitions import ensure_price_history_partitions
+    try:
+        ensure_price_history_partitions()
+    except Exception as e:
+        simulation_logger.warning("Could not ensure price_history partitions: %s", e)
+
+
+def run_worker(app, worker_id: Optional[str] = None, poll_interval: float = 1.0,
+               stop_check: Optional[Callable[[], bool]] = None, max_jobs: Optional[int] = None) -> int:
+    """
+    Poll for queued jobs and run them one at a time until stop_check() returns True.
+    With max_jobs set, the worker instead drains the queue and returns once it is empty or
+    max_jobs have been processed. Returns the number of jobs processed.
+    """
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    processed = 0
+    with app.app_context():
+        recover_stale_jobs()
+        _ensure_partitions()
+        while not (stop_check and stop_check()):
+            if max_jobs is not None and processed >= max_jobs:
+                break
+            try:
+                job = claim_next_job(worker_id)
+            except Exception as e:
+                db.session.rollback()
+                simulation_logger.warning("Worker %s could not claim a job: %s", worker_id, e)
+                job = None
+            if job is None:
+                if max_jobs is not None:
+                    break
+                time.sleep(poll_interval)
+                continue
+            requeued = execute_job(job).status == SimulationJob.STATUS_QUEUED
+            db.session.remove()
+            # A requeued job is retried later and does not count as processed
+            if not requeued:
+                processed += 1
+    return processed
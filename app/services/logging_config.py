@@ -1,32 +1,103 @@
+import atexit
+import copy
 import logging
+import logging.handlers
 import os
+import queue
 import sys
+import threading
 from datetime import datetime
 
 # Create logs directory if it doesn't exist
 os.makedirs('app/services/logs', exist_ok=True)
 
-# Configure logging with more detailed format
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler('simulation.log'),
-        logging.FileHandler('simulation_debug.log'),
-        logging.FileHandler('simulation_error.log')
+# Root level for the whole app. DEBUG makes every request/tick pay for debug records, so it is
+# opt-in: LOG_LEVEL=DEBUG in config.env when you need them.
+LOG_LEVEL = getattr(logging, os.getenv('LOG_LEVEL', 'INFO').upper(), logging.INFO)
+
+# Keep 1 in N records of each high-frequency debug message (see SamplingFilter). 1 disables sampling.
+DEBUG_SAMPLE_RATE = max(1, int(os.getenv('LOG_DEBUG_SAMPLE_RATE', '20')))
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s'
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Lets through only every Nth DEBUG record per (logger, message template).
+    Messages logged with %-style args share a template, so a debug line emitted on every request
+    or every tick is thinned out while rare debug lines (distinct templates) still appear.
+    INFO and above always pass.
+    """
+
+    def __init__(self, rate: int):
+        super().__init__()
+        self.rate = rate
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if self.rate <= 1 or record.levelno > logging.DEBUG:
+            return True
+        key = (record.name, record.msg if isinstance(record.msg, str) else type(record.msg))
+        with self._lock:
+            count = self._counts.get(key, 0)
+            self._counts[key] = count + 1
+        return count % self.rate == 0
+
+
+class _DeferredFormatQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that only merges msg % args in the calling thread; timestamps, the format string
+    and traceback rendering are applied by the listener thread. The stock QueueHandler formats the
+    full record before enqueueing, which is the work we are moving off request/tick threads.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def _build_handlers():
+    """File/console handlers owned by the background listener thread."""
+    formatter = logging.Formatter(LOG_FORMAT)
+    short_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    def _handler(handler, level=logging.NOTSET, only_logger=None, fmt=formatter):
+        handler.setLevel(level)
+        handler.setFormatter(fmt)
+        if only_logger:
+            handler.addFilter(logging.Filter(only_logger))
+        return handler
+
+    return [
+        _handler(logging.StreamHandler(sys.stdout)),
+        _handler(logging.FileHandler('simulation.log'), logging.INFO),
+        _handler(logging.FileHandler('simulation_debug.log'), logging.DEBUG),
+        _handler(logging.FileHandler('simulation_error.log'), logging.ERROR),
+        # Per-area files (previously attached directly to each named logger)
+        _handler(logging.FileHandler('app/services/logs/simulation.log'), only_logger='simulation', fmt=short_formatter),
+        _handler(logging.FileHandler('app/services/logs/rollback.log'), only_logger='rollback', fmt=short_formatter),
+        _handler(logging.FileHandler('app/services/logs/auth.log'), only_logger='auth', fmt=short_formatter),
+        _handler(logging.FileHandler('app/services/logs/gm.log'), only_logger='gm', fmt=short_formatter),
     ]
-)
-
-# Set levels for specific handlers
-for handler in logging.getLogger().handlers:
-    if isinstance(handler, logging.FileHandler):
-        if handler.baseFilename.endswith('simulation_debug.log'):
-            handler.setLevel(logging.DEBUG)
-        elif handler.baseFilename.endswith('simulation_error.log'):
-            handler.setLevel(logging.ERROR)
-        else:
-            handler.setLevel(logging.INFO)
+
+
+# All records go through one in-memory queue; a single listener thread does the formatting and
+# file I/O, so request threads and simulation ticks never block on disk writes.
+log_queue = queue.SimpleQueue()
+queue_handler = _DeferredFormatQueueHandler(log_queue)
+queue_handler.addFilter(SamplingFilter(DEBUG_SAMPLE_RATE))
+
+root_logger = logging.getLogger()
+root_logger.setLevel(LOG_LEVEL)
+root_logger.addHandler(queue_handler)
+
+log_listener = logging.handlers.QueueListener(log_queue, *_build_handlers(), respect_handler_level=True)
+log_listener.start()
+# Flush anything still queued when the process exits
+atexit.register(log_listener.stop)
 
 # Reduce SQLAlchemy logging noise
 logging.getLogger('sqlalchemy.engine').setLevel(logging.WARNING)
@@ -79,38 +150,21 @@ event_logger = SimulationEventLogger()
 
 # Configure logging
 def setup_logging():
-    # Create formatters
-    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    
-    # Create handlers
-    simulation_handler = logging.FileHandler('app/services/logs/simulation.log')
-    simulation_handler.setFormatter(formatter)
-    
-    rollback_handler = logging.FileHandler('app/services/logs/rollback.log')
-    rollback_handler.setFormatter(formatter)
-    
-    auth_handler = logging.FileHandler('app/services/logs/auth.log')
-    auth_handler.setFormatter(formatter)
-    
-    gm_handler = logging.FileHandler('app/services/logs/gm.log')
-    gm_handler.setFormatter(formatter)
-    
-    # Create loggers
+    """
+    Named loggers for each area of the app. They have no handlers of their own: records propagate
+    to the root queue handler, and the listener routes them to their per-area files.
+    """
     simulation_logger = logging.getLogger('simulation')
-    simulation_logger.setLevel(logging.INFO)
-    simulation_logger.addHandler(simulation_handler)
+    simulation_logger.setLevel(LOG_LEVEL)
     
     rollback_logger = logging.getLogger('rollback')
     rollback_logger.setLevel(logging.INFO)
-    rollback_logger.addHandler(rollback_handler)
     
     auth_logger = logging.getLogger('auth')
-    auth_logger.setLevel(logging.DEBUG)  # Set to DEBUG for more detailed logging
-    auth_logger.addHandler(auth_handler)
+    auth_logger.setLevel(LOG_LEVEL)  # LOG_LEVEL=DEBUG for more detailed logging
     
     gm_logger = logging.getLogger('gm')
-    gm_logger.setLevel(logging.DEBUG)  # Set to DEBUG for more detailed logging
-    gm_logger.addHandler(gm_handler)
+    gm_logger.setLevel(LOG_LEVEL)  # LOG_LEVEL=DEBUG for more detailed logging
     
     return simulation_logger, rollback_logger, auth_logger, gm_logger
 
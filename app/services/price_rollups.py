@@ -0,0 +1,149 @@
+"""
+Multi-resolution price rollups (week/month OHLC) kept current by the simulation tick.
+
+Buckets follow the game clock, not the wall clock: one tick is one game day, so a bucket of
+`resolution` covers ticks [start, start + RESOLUTION_TICKS[resolution]) with start a multiple of
+its length (week = tick // 7, month = tick // 30). A year run as a background job therefore fills
+52 week buckets even though it finishes in seconds.
+
+record_price_rollups() folds one tick's prices into every resolution with a single upsert per
+resolution. get_price_series() answers chart queries from the coarsest resolution that still gives
+the requested number of points; daily points (one per tick) are read from the packed price
+vectors (app/services/price_vectors.py), which already hold every tick's price.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.extensions import db
+from app.models.price_rollup import PriceRollup
+from app.services.price_vectors import get_item_series
+from app.utils.sql import dialect_insert, greatest, least
+
+# Coarsest first; bucket length in ticks (game days)
+ROLLUP_RESOLUTIONS = ["month", "week"]
+DAY_RESOLUTION = "day"
+RESOLUTION_TICKS = {
+    "month": 30,
+    "week": 7,
+    DAY_RESOLUTION: 1,
+}
+
+
+def bucket_start(resolution: str, tick: int) -> int:
+    """First tick of the bucket containing tick."""
+    try:
+        length = RESOLUTION_TICKS[resolution]
+    except KeyError:
+        raise ValueError(f"Unknown rollup resolution: {resolution}") from None
+    return tick - tick % length
+
+
+def record_price_rollups(gm_profile_id: int, samples: Iterable[Tuple[int, int, float]], tick: int) -> int:
+    """
+    Fold one tick's (shop_id, item_id, price) samples into all rollup resolutions.
+    Runs in the caller's transaction. Returns the number of bucket rows written.
+    """
+    samples = list(samples)
+    if not samples:
+        return 0
+
+    table = PriceRollup.__table__
+    written = 0
+    for resolution in ROLLUP_RESOLUTIONS:
+        start = bucket_start(resolution, tick)
+        insert_stmt = dialect_insert(table)
+        new = insert_stmt.excluded
+        upsert = insert_stmt.on_conflict_do_update(
+            index_elements=["shop_id", "item_id", "resolution", "bucket_start"],
+            set_={
+                "high_price": greatest(table.c.high_price, new.high_price),
+                "low_price": least(table.c.low_price, new.low_price),
+                "close_price": new.close_price,
+                "price_sum": table.c.price_sum + new.price_sum,
+                "sample_count": table.c.sample_count + new.sample_count,
+                "last_tick": new.last_tick,
+            },
+        )
+        db.session.execute(upsert, [
+            {
+                "gm_profile_id": gm_profile_id,
+                "shop_id": shop_id,
+                "item_id": item_id,
+                "resolution": resolution,
+                "bucket_start": start,
+                "open_price": price,
+                "high_price": price,
+                "low_price": price,
+                "close_price": price,
+                "price_sum": price,
+                "sample_count": 1,
+                "first_tick": tick,
+                "last_tick": tick,
+            }
+            for shop_id, item_id, price in samples
+        ])
+        written += len(samples)
+    return written
+
+
+def choose_rollup_resolution(start_tick: int, end_tick: int, max_points: int) -> str:
+    """
+    Coarsest resolution whose bucket count over ticks [start_tick, end_tick) still meets
+    max_points, so the chart has enough detail while reading as few rows as possible. Falls back
+    to daily points (one per tick) for short ranges.
+    """
+    span = end_tick - start_tick
+    for resolution in ROLLUP_RESOLUTIONS:
+        if span / RESOLUTION_TICKS[resolution] >= max_points:
+            return resolution
+    return DAY_RESOLUTION
+
+
+def get_price_series(
+    gm_profile_id: int,
+    shop_id: int,
+    item_id: int,
+    start_tick: int,
+    end_tick: int,
+    max_points: int,
+    resolution: Optional[str] = None,
+) -> Tuple[str, List[Dict]]:
+    """
+    Price points for one shop item over ticks [start_tick, end_tick), oldest first.
+    Each point has tick (first tick of its bucket), open/high/low/close/avg and count; daily
+    points have all prices equal. Returns (resolution used, points).
+    """
+    resolution = resolution or choose_rollup_resolution(start_tick, end_tick, max_points)
+    if resolution == DAY_RESOLUTION:
+        ticks, prices = get_item_series(gm_profile_id, shop_id, item_id, start_tick, end_tick - 1)
+        stocked = ~np.isnan(prices)
+        return resolution, [
+            {"tick": t, "open": p, "high": p, "low": p, "close": p, "avg": p, "count": 1}
+            for t, p in zip(ticks[stocked].tolist(), prices[stocked].astype(np.float64).round(2).tolist())
+        ]
+
+    rows = (
+        PriceRollup.query
+        .filter(
+            PriceRollup.shop_id == shop_id,
+            PriceRollup.item_id == item_id,
+            PriceRollup.resolution == resolution,
+            PriceRollup.bucket_start >= bucket_start(resolution, start_tick),
+            PriceRollup.bucket_start < end_tick,
+        )
+        .order_by(PriceRollup.bucket_start)
+        .all()
+    )
+    return resolution, [
+        {
+            "tick": r.bucket_start,
+            "open": r.open_price,
+            "high": r.high_price,
+            "low": r.low_price,
+            "close": r.close_price,
+            "avg": r.avg_price,
+            "count": r.sample_count,
+        }
+        for r in rows
+    ]
@@ -0,0 +1,109 @@
+"""
+Columnar price history: one packed float32 vector per (GM, tick).
+
+record_price_vector() is called by the simulation tick; get_item_series() pulls a single shop
+item's prices across ticks with a strided read (a 4-byte substring of each tick's blob), so the
+database never ships whole vectors for a one-item chart.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func, select
+
+from app.extensions import db
+from app.models.price_vector import InventoryOrdinal, PriceVector
+
+PRICE_DTYPE = np.dtype("<f4")
+
+
+def load_ordinal_map(gm_profile_id: int) -> Dict[Tuple[int, int], int]:
+    """(shop_id, item_id) -> ordinal for one GM."""
+    rows = db.session.execute(
+        select(InventoryOrdinal.shop_id, InventoryOrdinal.item_id, InventoryOrdinal.ordinal)
+        .where(InventoryOrdinal.gm_profile_id == gm_profile_id)
+    ).all()
+    return {(shop_id, item_id): ordinal for shop_id, item_id, ordinal in rows}
+
+
+def assign_ordinals(gm_profile_id: int, keys: Iterable[Tuple[int, int]]) -> Dict[Tuple[int, int], int]:
+    """
+    Ordinal map for a GM, extended with any (shop_id, item_id) keys not seen before.
+    New ordinals are appended after the current maximum; callers must hold the GM's tick lock.
+    """
+    ordinals = load_ordinal_map(gm_profile_id)
+    next_ordinal = max(ordinals.values(), default=-1) + 1
+    new_rows = []
+    for key in keys:
+        if key not in ordinals:
+            ordinals[key] = next_ordinal
+            new_rows.append({
+                "gm_profile_id": gm_profile_id,
+                "ordinal": next_ordinal,
+                "shop_id": key[0],
+                "item_id": key[1],
+            })
+            next_ordinal += 1
+    if new_rows:
+        db.session.execute(InventoryOrdinal.__table__.insert(), new_rows)
+    return ordinals
+
+
+def encode_prices(ordinals: Dict[Tuple[int, int], int], samples: List[Tuple[int, int, float]]) -> np.ndarray:
+    """Scatter (shop_id, item_id, price) samples into a NaN-filled vector indexed by ordinal."""
+    vector = np.full(max(ordinals.values(), default=-1) + 1, np.nan, dtype=PRICE_DTYPE)
+    if samples:
+        index = np.fromiter((ordinals[(shop_id, item_id)] for shop_id, item_id, _ in samples), dtype=np.int64, count=len(samples))
+        vector[index] = np.fromiter((price for _, _, price in samples), dtype=np.float64, count=len(samples))
+    return vector
+
+
+def record_price_vector(gm_profile_id: int, tick: int, samples: List[Tuple[int, int, float]], recorded_at=None) -> int:
+    """Store one tick's prices as a packed vector (caller's transaction). Returns the vector length."""
+    ordinals = assign_ordinals(gm_profile_id, ((shop_id, item_id) for shop_id, item_id, _ in samples))
+    vector = encode_prices(ordinals, samples)
+    db.session.add(PriceVector(
+        gm_profile_id=gm_profile_id,
+        tick=tick,
+        length=len(vector),
+        prices=vector.tobytes(),
+        **({"recorded_at": recorded_at} if recorded_at else {}),
+    ))
+    return len(vector)
+
+
+def decode_prices(blob: bytes) -> np.ndarray:
+    return np.frombuffer(blob, dtype=PRICE_DTYPE)
+
+
+def get_item_series(
+    gm_profile_id: int,
+    shop_id: int,
+    item_id: int,
+    start_tick: Optional[int] = None,
+    end_tick: Optional[int] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (ticks, prices) for one shop item, oldest first; prices are NaN for ticks where it was not stocked.
+    Only the item's 4-byte slot is read from each tick's vector.
+    """
+    ordinal = db.session.query(InventoryOrdinal.ordinal).filter_by(
+        gm_profile_id=gm_profile_id, shop_id=shop_id, item_id=item_id
+    ).scalar()
+    if ordinal is None:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=PRICE_DTYPE)
+
+    offset = ordinal * PRICE_DTYPE.itemsize
+    query = (
+        select(PriceVector.tick, func.substr(PriceVector.prices, offset + 1, PRICE_DTYPE.itemsize))
+        .where(PriceVector.gm_profile_id == gm_profile_id, PriceVector.length > ordinal)
+        .order_by(PriceVector.tick)
+    )
+    if start_tick is not None:
+        query = query.where(PriceVector.tick >= start_tick)
+    if end_tick is not None:
+        query = query.where(PriceVector.tick <= end_tick)
+    rows = db.session.execute(query).all()
+
+    ticks = np.fromiter((tick for tick, _ in rows), dtype=np.int64, count=len(rows))
+    prices = np.frombuffer(b"".join(bytes(chunk) for _, chunk in rows), dtype=PRICE_DTYPE)
+    return ticks, prices
@@ -1,80 +1,89 @@
 import random
 import logging
-from typing import Dict, List, Optional
+from typing import Callable, Dict, Optional
 from datetime import datetime, timedelta
 
 from app.extensions import db
-from app.models.backend import Shop, ShopInventory, City, PriceHistory
-from app.services.economy import calculate_dynamic_price
+from app.models.simulation_state import GMSimulationState
+from app.services.tick_lock import gm_tick_lock
+from app.services.tick_pipeline import TickContext, TickPipeline
+from app.services.economy import WorldSnapshot, reset_event_timer_sync, reset_restock_timer_sync
 from app.config.simulation_config import SimulationConfig, default_config
 from app.config.price_history_config import default_price_history_retention
+from app.services.logging_config import simulation_logger
+
+VALID_SPEEDS = ["pause", "day", "week", "month", "year"]
+
+
+class TickInProgressError(RuntimeError):
+    """Raised when another request/worker is already running a tick for the same GM."""
+
 
 class SimulationEngine:
-    """Handles the simulation of the game economy."""
-    
-    _instance = None
-    
-    def __new__(cls, config: Optional[SimulationConfig] = None):
-        if cls._instance is None:
-            cls._instance = super(SimulationEngine, cls).__new__(cls)
-            cls._instance._initialized = False
-        return cls._instance
-    
-    def __init__(self, config: Optional[SimulationConfig] = None):
-        if self._initialized:
-            return
-            
+    """
+    Handles the simulation of the game economy.
+
+    The engine itself is stateless apart from configuration; per-GM speed, tick counter and
+    last tick time live in GMSimulationState so every worker process sees the same values.
+    Ticks for one GM are serialized with gm_tick_lock; different GMs tick in parallel.
+    """
+
+    def __init__(self, config: Optional[SimulationConfig] = None, pipeline: Optional[TickPipeline] = None):
         self.config = config or default_config
+        # Ordered tick stages (app/services/tick_pipeline.py); stage toggles come from config
+        self.pipeline = pipeline or TickPipeline.default()
         self._setup_logging()
-        self.current_speed = "pause"
-        self.last_tick_time = datetime.now()
         # Retention configuration for PriceHistory snapshots
         self.price_history_retention = default_price_history_retention
-        self._initialized = True
-        self._log_tick("SimulationEngine initialized")
-        self._debug_state()
-        
+
     def _setup_logging(self):
-        """Configure logging for simulation events."""
-        if self.config.enable_tick_logging:
-            logging.basicConfig(
-                filename=self.config.log_file_path,
-                level=logging.DEBUG,  # Changed to DEBUG for more detailed logging
-                format='%(asctime)s - %(levelname)s - %(message)s'
-            )
-            self.logger = logging.getLogger('simulation')
-        else:
-            self.logger = None
+        """Configure logging for simulation events (handlers live in logging_config's queue listener)."""
+        self.logger = simulation_logger if self.config.enable_tick_logging else None
+
+    _LEVELS = {"debug": logging.DEBUG, "info": logging.INFO, "warning": logging.WARNING, "error": logging.ERROR}
+
+    def _log_enabled(self, level: str) -> bool:
+        """True if a message at this level would be emitted; check before building expensive args."""
+        return bool(self.logger) and self.logger.isEnabledFor(self._LEVELS[level])
             
-    def _log_tick(self, message: str, level: str = "info"):
-        """Log a simulation event if logging is enabled."""
-        if self.logger:
-            if level == "debug":
-                self.logger.debug(message)
-            elif level == "info":
-                self.logger.info(message)
-            elif level == "warning":
-                self.logger.warning(message)
-            elif level == "error":
-                self.logger.error(message)
-        print(f"[Simulation] {message}")  # Also print to console for debugging
+    def _log_tick(self, message: str, *args, level: str = "info"):
+        """
+        Log a simulation event if logging is enabled.
+        Pass values as %-style args rather than pre-formatting: the string is only built if the
+        level is enabled, and identical templates let the debug sampler thin out repeated lines.
+        """
+        if self._log_enabled(level):
+            self.logger.log(self._LEVELS[level], message, *args)
             
-    def _debug_state(self):
-        """Log the current state of the simulation engine."""
+    def _debug_state(self, state: GMSimulationState):
+        """Log the current simulation state of one GM."""
+        if not self._log_enabled("debug"):
+            return
         self._log_tick(
-            f"Current State:\n"
-            f"  Speed: {self.current_speed}\n"
-            f"  Last Tick: {self.last_tick_time}\n"
-            f"  Time Since Last Tick: {datetime.now() - self.last_tick_time}\n"
-            f"  Speed Multiplier: {self.get_speed_multiplier()}",
-            "debug"
+            "Current State (GM %s):\n"
+            "  Speed: %s\n"
+            "  Tick: %s\n"
+            "  Last Tick: %s\n"
+            "  Time Since Last Tick: %s\n"
+            "  Speed Multiplier: %s",
+            state.gm_profile_id,
+            state.current_speed,
+            state.current_tick,
+            state.last_tick_time,
+            datetime.utcnow() - state.last_tick_time,
+            self.get_speed_multiplier(state.current_speed),
+            level="debug"
         )
+
+    def get_state(self, gm_profile_id: int) -> GMSimulationState:
+        """Return the persisted simulation state for a GM (created on first use)."""
+        return GMSimulationState.get_or_create(gm_profile_id)
             
     def _calculate_price_change(self, current_price: float) -> float:
         """Calculate a random price change within configured bounds."""
         try:
             if current_price <= 0:
-                self._log_tick(f"Warning: Invalid current price {current_price}, using minimum price", "warning")
+                self._log_tick("Warning: Invalid current price %s, using minimum price", current_price, level="warning")
                 current_price = 1.0  # Use a minimum price of 1.0 instead of base_price
                 
             change_percent = random.uniform(
@@ -85,81 +94,106 @@ class SimulationEngine:
             # Ensure we don't get a zero or negative price
             new_price = current_price * (1 + change_percent / 100)
             if new_price <= 0:
-                self._log_tick(f"Warning: Calculated price {new_price} is invalid, using minimum price", "warning")
+                self._log_tick("Warning: Calculated price %s is invalid, using minimum price", new_price, level="warning")
                 new_price = 1.0  # Use a minimum price of 1.0 instead of base_price
                 
             return round(new_price, 2)
             
         except Exception as e:
-            self._log_tick(f"Error calculating price change: {str(e)}", "error")
+            self._log_tick("Error calculating price change: %s", e, level="error")
             return 1.0  # Return minimum price on error
         
-    def set_speed(self, speed: str):
-        """Set the simulation speed."""
-        valid_speeds = ["pause", "day", "week", "month", "year"]
-        if speed not in valid_speeds:
-            raise ValueError(f"Invalid speed: {speed}. Must be one of {valid_speeds}")
-        old_speed = self.current_speed
-        self.current_speed = speed
-        self._log_tick(f"Speed changed from {old_speed} to {speed}")
-        self._debug_state()
+    def set_speed(self, gm_profile_id: int, speed: str, commit: bool = True) -> GMSimulationState:
+        """Set the simulation speed for one GM."""
+        if speed not in VALID_SPEEDS:
+            raise ValueError(f"Invalid speed: {speed}. Must be one of {VALID_SPEEDS}")
+        state = self.get_state(gm_profile_id)
+        old_speed = state.current_speed
+        state.current_speed = speed
+        if commit:
+            db.session.commit()
+        self._log_tick("Speed changed from %s to %s (GM %s)", old_speed, speed, gm_profile_id)
+        self._debug_state(state)
+        return state
         
-    def get_speed_multiplier(self) -> int:
-        """Get the time multiplier for the current speed setting (used for real-time tick scheduling)."""
-        if self.current_speed == "pause":
+    def get_speed_multiplier(self, speed: str) -> int:
+        """Get the time multiplier for a speed setting (used for real-time tick scheduling)."""
+        if speed == "pause":
             return 0
         # day, week, month, year are used as time-period buttons; return 1 if any is set
         return 1
         
-    def should_run_tick(self) -> bool:
-        """Determine if a tick should run based on current speed and time elapsed."""
-        self._debug_state()  # Log current state before checking
+    def should_run_tick(self, state: GMSimulationState) -> bool:
+        """Determine if a tick should run based on a GM's speed and time elapsed."""
+        self._debug_state(state)  # Log current state before checking
         
-        if self.current_speed == "pause":
-            self._log_tick("Simulation paused, skipping tick", "debug")
+        if state.current_speed == "pause":
+            self._log_tick("Simulation paused, skipping tick", level="debug")
             return False
             
-        multiplier = self.get_speed_multiplier()
+        multiplier = self.get_speed_multiplier(state.current_speed)
         if multiplier == 0:
-            self._log_tick("Speed multiplier is 0, skipping tick", "debug")
+            self._log_tick("Speed multiplier is 0, skipping tick", level="debug")
             return False
             
         # Calculate time since last tick
-        time_since_last = datetime.now() - self.last_tick_time
+        time_since_last = datetime.utcnow() - state.last_tick_time
         # For 1x speed, run every second
         # For other speeds, adjust accordingly
         required_interval = timedelta(seconds=1 / multiplier)
         
         should_run = time_since_last >= required_interval
-        if should_run:
-            self._log_tick(
-                f"Time to run tick:\n"
-                f"  Time elapsed: {time_since_last.total_seconds():.1f}s\n"
-                f"  Required interval: {required_interval.total_seconds():.1f}s\n"
-                f"  Speed: {self.current_speed}\n"
-                f"  Multiplier: {multiplier}",
-                "debug"
-            )
-        else:
-            self._log_tick(
-                f"Not time for tick yet:\n"
-                f"  Time elapsed: {time_since_last.total_seconds():.1f}s\n"
-                f"  Required interval: {required_interval.total_seconds():.1f}s\n"
-                f"  Speed: {self.current_speed}\n"
-                f"  Multiplier: {multiplier}",
-                "debug"
-            )
+        self._log_tick(
+            "%s:\n"
+            "  Time elapsed: %.1fs\n"
+            "  Required interval: %.1fs\n"
+            "  Speed: %s\n"
+            "  Multiplier: %s",
+            "Time to run tick" if should_run else "Not time for tick yet",
+            time_since_last.total_seconds(),
+            required_interval.total_seconds(),
+            state.current_speed,
+            multiplier,
+            level="debug"
+        )
         
         return should_run
-        
+
+    def run_due_tick(self, gm_profile_id: int) -> Optional[Dict]:
+        """
+        Run a tick for a GM only if one is due according to its speed setting.
+        Returns the tick stats, or None if no tick was due or another worker holds the tick lock.
+        The due-check is repeated under the lock so concurrent requests cannot both run the same tick.
+        """
+        if not self.should_run_tick(self.get_state(gm_profile_id)):
+            return None
+        with gm_tick_lock(gm_profile_id) as acquired:
+            if not acquired:
+                self._log_tick("Tick already in progress for GM %s, skipping", gm_profile_id, level="debug")
+                return None
+            state = GMSimulationState.get_or_create(gm_profile_id, refresh=True)
+            if not self.should_run_tick(state):
+                return None
+            return self._run_tick_locked(gm_profile_id, state, commit=True)
+
     def run_tick(self, gm_profile_id: int, commit: bool = True) -> Dict:
         """
         Execute one simulation tick (one tick = one game day).
         Args:
             gm_profile_id: The ID of the GM whose shops should be updated
             commit: If True, commit at end of tick; if False, caller commits (e.g. once per time period).
+                    Callers passing False should hold gm_tick_lock until they commit.
         Returns a dictionary containing tick results and statistics.
+        Raises TickInProgressError if another tick for this GM is running.
         """
+        with gm_tick_lock(gm_profile_id) as acquired:
+            if not acquired:
+                raise TickInProgressError(f"A simulation tick is already running for GM {gm_profile_id}")
+            state = GMSimulationState.get_or_create(gm_profile_id, refresh=True)
+            return self._run_tick_locked(gm_profile_id, state, commit=commit)
+
+    def _run_tick_locked(self, gm_profile_id: int, state: GMSimulationState, commit: bool = True) -> Dict:
+        """Tick body; caller must hold gm_tick_lock for gm_profile_id."""
         tick_start = datetime.now()
         stats = {
             'shops_updated': 0,
@@ -167,108 +201,79 @@ class SimulationEngine:
             'price_changes': [],
             'tick_duration': 0
         }
-        shops_seen = set()
 
         try:
-            self._log_tick("Starting simulation tick", "debug")
+            self._log_tick("Starting simulation tick", level="debug")
 
-            # Single batch query: all ShopInventory for GM's shops with item and shop.cities eager-loaded
-            inventory_rows = (
-                ShopInventory.query
-                .join(Shop, ShopInventory.shop_id == Shop.shop_id)
-                .filter(Shop.gm_profile_id == gm_profile_id)
-                .options(
-                    db.joinedload(ShopInventory.item),
-                    db.joinedload(ShopInventory.shop).joinedload(Shop.cities),
-                )
-                .all()
+            # Columnar snapshot of the GM's inventory, shared by every stage of the tick
+            snapshot = WorldSnapshot.load(gm_profile_id)
+            self._log_tick("Found %s inventory rows to update", snapshot.size, level="debug")
+            context = TickContext(
+                gm_profile_id=gm_profile_id,
+                tick=(state.current_tick or 0) + 1,
+                # One timestamp per tick so the snapshot rows and rollup buckets line up
+                recorded_at=datetime.utcnow(),
+                config=self.config,
+                snapshot=snapshot,
+                stats=stats,
+                state=state,
             )
-            self._log_tick(f"Found {len(inventory_rows)} inventory rows to update", "debug")
-
-            for inventory in inventory_rows:
-                old_price = inventory.dynamic_price
-                base_price = inventory.item.base_price
-                rarity = int(inventory.item.rarity) if inventory.item.rarity.isdigit() else 5
-                shop = inventory.shop
-                cities = shop.cities if shop else []
-
-                # Per-city evaluation (in memory): aggregate to one price per row for future modifiers
-                if cities:
-                    prices = []
-                    for city in cities:
-                        p = calculate_dynamic_price(
-                            base_price=base_price,
-                            rarity=rarity,
-                            stock_level=inventory.stock,
-                            shop_id=shop.shop_id,
-                            city_id=city.city_id
-                        )
-                        prices.append(p)
-                    new_price = round(sum(prices) / len(prices), 2)
-                else:
-                    new_price = calculate_dynamic_price(
-                        base_price=base_price,
-                        rarity=rarity,
-                        stock_level=inventory.stock,
-                        shop_id=shop.shop_id if shop else None,
-                        city_id=None
-                    )
-
-                inventory.dynamic_price = new_price
-                stats['items_updated'] += 1
+            self.pipeline.run(context)
 
-                # Snapshot for stock-style charts (same transaction)
-                db.session.add(PriceHistory(
-                    shop_id=inventory.shop_id,
-                    item_id=inventory.item_id,
-                    price=new_price,
-                    recorded_at=datetime.utcnow(),
-                    gm_profile_id=gm_profile_id
-                ))
-
-                if old_price > 0 and abs(new_price - old_price) / old_price > 0.10:
-                    primary_city_id = cities[0].city_id if cities else None
-                    stats['price_changes'].append({
-                        'item_id': inventory.item_id,
-                        'city_id': primary_city_id,
-                        'old_price': old_price,
-                        'new_price': new_price
-                    })
-
-                if shop and shop.shop_id not in shops_seen:
-                    shops_seen.add(shop.shop_id)
-                    stats['shops_updated'] += 1
+            state.current_tick = context.tick
+            state.last_tick_time = datetime.utcnow()
+            stats['tick'] = state.current_tick
 
             if commit:
                 db.session.commit()
 
-            self.last_tick_time = datetime.now()
             tick_duration = (datetime.now() - tick_start).total_seconds()
             stats['tick_duration'] = tick_duration
 
             self._log_tick(
-                f"Tick completed:\n"
-                f"  Shops updated: {stats['shops_updated']}\n"
-                f"  Items updated: {stats['items_updated']}\n"
-                f"  Duration: {tick_duration:.2f}s\n"
-                f"  New last tick time: {self.last_tick_time}",
-                "debug"
+                "Tick completed:\n"
+                "  Shops updated: %s\n"
+                "  Items updated: %s\n"
+                "  Duration: %.2fs\n"
+                "  Tick: %s\n"
+                "  New last tick time: %s",
+                stats['shops_updated'],
+                stats['items_updated'],
+                tick_duration,
+                state.current_tick,
+                state.last_tick_time,
+                level="debug"
             )
 
             return stats
 
         except Exception as e:
-            self._log_tick(f"Error during tick: {str(e)}", "error")
+            self._log_tick("Error during tick: %s", e, level="error")
             db.session.rollback()
+            # Timers written during this tick were rolled back with it
+            reset_restock_timer_sync(gm_profile_id)
+            reset_event_timer_sync(gm_profile_id)
             raise
 
-    def run_time_period(self, gm_profile_id: int, time_period: str) -> Dict:
+    def run_time_period(
+        self,
+        gm_profile_id: int,
+        time_period: str,
+        commit_each_tick: bool = False,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+    ) -> Dict:
         """
         Run multiple ticks to simulate a specific time period. One tick = one game day.
         Args:
             gm_profile_id: The ID of the GM whose shops should be updated
             time_period: One of "day", "week", "month", "year"
+            commit_each_tick: Commit after every tick instead of once at the end (used by background
+                              jobs so progress is durable and a cancelled job keeps finished ticks).
+            progress_callback: Called as progress_callback(ticks_done, total_ticks) after each tick.
+                               Exceptions it raises (e.g. JobCancelled) stop the period.
         Returns a dictionary containing simulation results and statistics.
+        A failing tick is rolled back and its exception re-raised; with commit_each_tick the ticks
+        before it stay committed, otherwise the whole period is rolled back.
         """
         ticks_per_period = {
             "day": 1,
@@ -285,34 +290,60 @@ class SimulationEngine:
             'items_updated': 0,
             'price_changes': [],
             'total_duration': 0,
-            'ticks_completed': 0
+            'ticks_completed': 0,
+            'stages': {}
         }
 
-        self._log_tick(f"Starting {time_period} simulation ({total_ticks} ticks)", "debug")
+        self._log_tick("Starting %s simulation (%s ticks)", time_period, total_ticks, level="debug")
 
-        for i in range(total_ticks):
-            try:
-                tick_stats = self.run_tick(gm_profile_id, commit=False)
-                total_stats['shops_updated'] += tick_stats['shops_updated']
-                total_stats['items_updated'] += tick_stats['items_updated']
-                total_stats['price_changes'].extend(tick_stats['price_changes'])
-                total_stats['total_duration'] += tick_stats['tick_duration']
-                total_stats['ticks_completed'] += 1
-            except Exception as e:
-                self._log_tick(f"Error during tick {i+1}/{total_ticks}: {str(e)}", "error")
-                db.session.rollback()
-                break
-        else:
+        # Hold the GM's tick lock for the whole period: ticks are committed together at the end.
+        with gm_tick_lock(gm_profile_id) as acquired:
+            if not acquired:
+                raise TickInProgressError(f"A simulation is already running for GM {gm_profile_id}")
+            state = GMSimulationState.get_or_create(gm_profile_id, refresh=True)
+
+            for i in range(total_ticks):
+                try:
+                    tick_stats = self._run_tick_locked(gm_profile_id, state, commit=False)
+                    total_stats['shops_updated'] += tick_stats['shops_updated']
+                    total_stats['items_updated'] += tick_stats['items_updated']
+                    total_stats['price_changes'].extend(tick_stats['price_changes'])
+                    total_stats['total_duration'] += tick_stats['tick_duration']
+                    total_stats['ticks_completed'] += 1
+                    for name, stage in tick_stats.get('stages', {}).items():
+                        totals = total_stats['stages'].setdefault(name, {'rows': 0, 'duration_ms': 0.0})
+                        totals['rows'] += stage['rows']
+                        totals['duration_ms'] += stage['duration_ms']
+                except Exception as e:
+                    db.session.rollback()
+                    if not commit_each_tick:
+                        # The period's earlier ticks were uncommitted and went with the rollback
+                        total_stats['ticks_completed'] = 0
+                    self._log_tick(
+                        "Error during tick %s/%s (%s ticks kept): %s",
+                        i + 1, total_ticks, total_stats['ticks_completed'], e, level="error",
+                    )
+                    raise
+                if commit_each_tick:
+                    db.session.commit()
+                if progress_callback:
+                    progress_callback(i + 1, total_ticks)
             db.session.commit()
 
         self._log_tick(
-            f"Time period simulation completed:\n"
-            f"  Period: {time_period}\n"
-            f"  Ticks completed: {total_stats['ticks_completed']}/{total_ticks}\n"
-            f"  Total shops updated: {total_stats['shops_updated']}\n"
-            f"  Total items updated: {total_stats['items_updated']}\n"
-            f"  Total duration: {total_stats['total_duration']:.2f}s",
-            "debug"
+            "Time period simulation completed:\n"
+            "  Period: %s\n"
+            "  Ticks completed: %s/%s\n"
+            "  Total shops updated: %s\n"
+            "  Total items updated: %s\n"
+            "  Total duration: %.2fs",
+            time_period,
+            total_stats['ticks_completed'],
+            total_ticks,
+            total_stats['shops_updated'],
+            total_stats['items_updated'],
+            total_stats['total_duration'],
+            level="debug"
         )
 
         return total_stats 
\ No newline at end of file
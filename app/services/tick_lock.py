@@ -0,0 +1,79 @@
+"""
+Per-GM tick lock so two requests, threads or gunicorn workers never run overlapping ticks for the same GM.
+
+PostgreSQL: session-level advisory lock held on a dedicated connection (independent of db.session,
+so the tick can commit while the lock is still held; the lock is released automatically if the
+process dies and the connection drops).
+Other databases (SQLite in tests/dev): in-process threading.Lock per GM, which only protects a
+single process.
+"""
+import threading
+from contextlib import contextmanager
+from typing import Dict
+
+from sqlalchemy import text
+
+from app.extensions import db
+
+# First key of the two-int advisory lock form; the second key is the gm_profile_id.
+# Keeps our locks from colliding with advisory locks taken by other code on the same database.
+TICK_LOCK_NAMESPACE = 7301
+
+_local_locks: Dict[int, threading.Lock] = {}
+_local_locks_guard = threading.Lock()
+
+
+def _get_local_lock(gm_profile_id: int) -> threading.Lock:
+    with _local_locks_guard:
+        lock = _local_locks.get(gm_profile_id)
+        if lock is None:
+            lock = threading.Lock()
+            _local_locks[gm_profile_id] = lock
+        return lock
+
+
+@contextmanager
+def gm_tick_lock(gm_profile_id: int, blocking: bool = False):
+    """
+    Acquire the tick lock for one GM. Yields True if the lock is held, False if another
+    tick is already running (only possible when blocking=False).
+    """
+    engine = db.engine
+    if engine.dialect.name == "postgresql":
+        conn = engine.connect()
+        acquired = False
+        try:
+            if blocking:
+                conn.execute(
+                    text("SELECT pg_advisory_lock(:ns, :gm)"),
+                    {"ns": TICK_LOCK_NAMESPACE, "gm": gm_profile_id},
+                )
+                acquired = True
+            else:
+                acquired = bool(conn.execute(
+                    text("SELECT pg_try_advisory_lock(:ns, :gm)"),
+                    {"ns": TICK_LOCK_NAMESPACE, "gm": gm_profile_id},
+                ).scalar())
+            # Advisory locks are session-scoped; end the implicit transaction so the
+            # connection is not left idle-in-transaction while the tick runs.
+            conn.commit()
+            yield acquired
+        finally:
+            try:
+                if acquired:
+                    conn.execute(
+                        text("SELECT pg_advisory_unlock(:ns, :gm)"),
+                        {"ns": TICK_LOCK_NAMESPACE, "gm": gm_profile_id},
+                    )
+                    conn.commit()
+            finally:
+                conn.close()
+        return
+
+    lock = _get_local_lock(gm_profile_id)
+    acquired = lock.acquire(blocking=blocking)
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            lock.release()
@@ -0,0 +1,316 @@
+"""
+Staged simulation tick.
+
+A tick is an ordered list of TickStage objects run over one shared TickContext: the GM's columnar
+WorldSnapshot plus whatever earlier stages produced (modifier index, compiled events, new prices).
+Each stage is switched on or off by SimulationConfig and reports how many rows it touched; the
+pipeline times every stage and puts {name: {"rows", "duration_ms"}} under stats["stages"].
+
+Default order: expire events, restock, production, crafting, settlement, event shocks (supply and
+world state first, so prices see today's stock), then demand modifiers, pricing, history and
+market aggregates. New economy features become a new stage instead of a longer tick function:
+
+    pipeline = TickPipeline.default()
+    pipeline.insert_after("crafting", TickStage("spoilage", apply_spoilage, enabled=lambda c: c.enable_supply_simulation))
+    engine = SimulationEngine(pipeline=pipeline)
+
+Stages run inside the tick's transaction; the engine commits (or rolls back) around the pipeline.
+"""
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import insert
+
+from app.extensions import db
+from app.models.backend import PriceHistory
+from app.models.simulation_state import GMSimulationState
+from app.config.simulation_config import SimulationConfig
+from app.services.price_rollups import record_price_rollups
+from app.services.price_vectors import record_price_vector
+from app.services.economy import (
+    NO_CITY,
+    ModifierIndex,
+    WorldSnapshot,
+    aggregate_markets,
+    apply_crafting,
+    apply_due_restocks,
+    apply_event_stock_shocks,
+    apply_production,
+    evaluate_prices,
+    expire_due_events,
+    get_compiled_events,
+    get_modifier_index,
+    get_trade_network,
+    incremental_price_snapshot,
+    lazy_pricing_enabled,
+    price_snapshot,
+    pricing_fingerprint,
+    settle_accounts,
+    write_anchors,
+    write_prices,
+)
+
+# Relative price move reported in stats["price_changes"]
+BIG_PRICE_MOVE = 0.10
+
+
+@dataclass
+class TickContext:
+    """State shared by the stages of one tick."""
+    gm_profile_id: int
+    tick: int
+    recorded_at: datetime
+    config: SimulationConfig
+    snapshot: WorldSnapshot
+    stats: Dict
+    # The GM's GMSimulationState row (tick counter, pricing fingerprint)
+    state: Optional[GMSimulationState] = None
+    # Filled in by the stages
+    modifier_index: Optional[ModifierIndex] = None
+    events: Optional[object] = None
+    new_prices: Optional[np.ndarray] = None
+    # (shop_id, item_id, price) per snapshot row, for history writers
+    samples: List = field(default_factory=list)
+
+
+@dataclass(frozen=True)
+class TickStage:
+    """One step of the tick. run(ctx) returns the number of rows it touched."""
+    name: str
+    run: Callable[[TickContext], int]
+    enabled: Callable[[SimulationConfig], bool] = lambda config: True
+
+
+class TickPipeline:
+    """Ordered tick stages (see module docstring)."""
+
+    def __init__(self, stages: Sequence[TickStage]):
+        self.stages: List[TickStage] = list(stages)
+
+    @classmethod
+    def default(cls) -> "TickPipeline":
+        return cls(DEFAULT_STAGES)
+
+    @property
+    def stage_names(self) -> List[str]:
+        return [stage.name for stage in self.stages]
+
+    def _position(self, name: str) -> int:
+        try:
+            return self.stage_names.index(name)
+        except ValueError:
+            raise KeyError(f"Unknown tick stage: {name}") from None
+
+    def insert_before(self, name: str, stage: TickStage) -> None:
+        self.stages.insert(self._position(name), stage)
+
+    def insert_after(self, name: str, stage: TickStage) -> None:
+        self.stages.insert(self._position(name) + 1, stage)
+
+    def remove(self, name: str) -> None:
+        del self.stages[self._position(name)]
+
+    def run(self, ctx: TickContext) -> Dict[str, Dict]:
+        """Run the enabled stages in order; returns (and stores in ctx.stats) the per-stage stats."""
+        timings = ctx.stats.setdefault('stages', {})
+        for stage in self.stages:
+            if not stage.enabled(ctx.config):
+                continue
+            start = time.perf_counter()
+            rows = stage.run(ctx)
+            timings[stage.name] = {
+                'rows': int(rows or 0),
+                'duration_ms': round((time.perf_counter() - start) * 1000, 3),
+            }
+        return timings
+
+
+# -- stages ------------------------------------------------------------------
+
+def expire_events_stage(ctx: TickContext) -> int:
+    """Timed events that run out today stop affecting the world."""
+    ctx.stats['events_expired'] = expire_due_events(ctx.gm_profile_id, ctx.tick)
+    return ctx.stats['events_expired']
+
+
+def restock_stage(ctx: TickContext) -> int:
+    ctx.stats['restocked'] = apply_due_restocks(
+        ctx.snapshot, ctx.tick, ctx.config.restock_rate, ctx.config.random_seed
+    )
+    return ctx.stats['restocked']['rows']
+
+
+def production_stage(ctx: TickContext) -> int:
+    ctx.stats['produced'] = apply_production(
+        ctx.snapshot,
+        ctx.tick,
+        ctx.recorded_at,
+        ctx.config.random_seed,
+        record_history=ctx.config.record_production_history,
+        capacity=ctx.config.production_capacity,
+    )
+    return ctx.stats['produced']['rows']
+
+
+def crafting_stage(ctx: TickContext) -> int:
+    ctx.stats['crafted'] = apply_crafting(
+        ctx.snapshot, ctx.tick, ctx.config.crafting_rate, ctx.config.random_seed
+    )
+    return ctx.stats['crafted']['rows']
+
+
+def settlement_stage(ctx: TickContext) -> int:
+    """Investment income and shop maintenance for the day."""
+    ctx.stats['settlement'] = settle_accounts(ctx.gm_profile_id, ctx.tick, ctx.recorded_at)
+    return ctx.stats['settlement']['investments'] + ctx.stats['settlement']['maintenance']
+
+
+def event_effects_stage(ctx: TickContext) -> int:
+    """Active events, compiled once per change; stock shocks hit on the activation tick."""
+    ctx.events = get_compiled_events(ctx.gm_profile_id)
+    ctx.stats['event_shocked_rows'] = apply_event_stock_shocks(ctx.snapshot, ctx.events, ctx.tick)
+    return ctx.stats['event_shocked_rows']
+
+
+def demand_stage(ctx: TickContext) -> int:
+    """Demand modifiers: one index per GM per tick. Rows = active modifiers."""
+    ctx.modifier_index = get_modifier_index(ctx.gm_profile_id, tick=ctx.tick)
+    return ctx.modifier_index.modifier_count
+
+
+def pricing_stage(ctx: TickContext) -> int:
+    """
+    Price every snapshot row and write back the rows whose price moved.
+    Fluctuations are keyed by (GM, tick, row, city), so the same inputs give the same prices; price
+    signals then diffuse once across trade routes. Without the demand stage every modifier is 1.0.
+    With incremental_pricing only dirty rows are fully recomputed and the rest drift; with
+    lazy_pricing on top, only recomputed rows (all rows on compaction ticks) are written and
+    recorded, the others are evaluated on read (app/services/economy/lazy.py).
+    """
+    snapshot, config = ctx.snapshot, ctx.config
+    modifier_index = ctx.modifier_index or ModifierIndex(ctx.gm_profile_id, [], [], [], [])
+    pricing_inputs = dict(
+        seed=config.random_seed,
+        trade_network=get_trade_network(ctx.gm_profile_id, config.region_route_weight),
+        diffusion_rate=config.trade_diffusion_rate,
+        events=ctx.events,
+    )
+    materialized = None
+    if config.incremental_pricing:
+        fingerprint = pricing_fingerprint(
+            ctx.gm_profile_id, modifier_index, config.random_seed, config.trade_diffusion_rate, config.region_route_weight
+        )
+        full = ctx.state is None or ctx.state.pricing_fingerprint != fingerprint
+        new_prices, dirty, anchors = incremental_price_snapshot(
+            snapshot, modifier_index, ctx.tick, full=full, **pricing_inputs
+        )
+        write_anchors(snapshot.inventory_id[dirty], anchors, snapshot.stock[dirty])
+        if ctx.state is not None:
+            ctx.state.pricing_fingerprint = fingerprint
+        ctx.stats['repriced'] = int(dirty.sum())
+        ctx.stats['drifted'] = snapshot.size - ctx.stats['repriced']
+        if lazy_pricing_enabled(config):
+            interval = config.lazy_compaction_interval
+            materialized = dirty if not interval or ctx.tick % interval else np.ones(snapshot.size, dtype=bool)
+    else:
+        new_prices = price_snapshot(snapshot, modifier_index, ctx.tick, **pricing_inputs)
+        if ctx.state is not None:
+            # Anchors are not maintained meanwhile; the next incremental pass starts with a full one
+            ctx.state.pricing_fingerprint = None
+
+    if materialized is None:
+        old_prices = snapshot.dynamic_price
+        written_rows = new_prices != old_prices
+        recorded_rows = np.ones(snapshot.size, dtype=bool)
+    else:
+        # Stored prices of lazy rows are from their priced_tick; compare with what readers saw
+        old_prices = evaluate_prices(
+            ctx.gm_profile_id,
+            ctx.tick - 1,
+            snapshot.inventory_id,
+            snapshot.item_id,
+            snapshot.dynamic_price,
+            snapshot.anchor_price,
+            snapshot.priced_tick,
+            seed=config.random_seed,
+        )
+        written_rows = recorded_rows = materialized
+        ctx.stats['materialized'] = int(materialized.sum())
+    written = write_prices(snapshot.inventory_id[written_rows], new_prices[written_rows], tick=ctx.tick)
+
+    ctx.new_prices = new_prices
+    ctx.samples = list(zip(
+        snapshot.shop_id[recorded_rows].tolist(), snapshot.item_id[recorded_rows].tolist(), new_prices[recorded_rows].tolist()
+    ))
+    ctx.stats['items_updated'] = snapshot.size
+    ctx.stats['shops_updated'] = len(np.unique(snapshot.shop_id))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        big_move = (old_prices > 0) & (np.abs(new_prices - old_prices) / old_prices > BIG_PRICE_MOVE)
+    primary_city = snapshot.primary_city_id()
+    for row in np.flatnonzero(big_move).tolist():
+        ctx.stats['price_changes'].append({
+            'item_id': int(snapshot.item_id[row]),
+            'city_id': None if primary_city[row] == NO_CITY else int(primary_city[row]),
+            'old_price': float(old_prices[row]),
+            'new_price': float(new_prices[row])
+        })
+    return written
+
+
+def history_stage(ctx: TickContext) -> int:
+    """The packed price vector, chart rollups and, if enabled, PriceHistory rows (same transaction)."""
+    if not ctx.samples:
+        return 0
+    rows = 0
+    if ctx.config.record_price_history_rows:
+        db.session.execute(insert(PriceHistory), [
+            {
+                "shop_id": shop_id,
+                "item_id": item_id,
+                "price": price,
+                "recorded_at": ctx.recorded_at,
+                "gm_profile_id": ctx.gm_profile_id,
+            }
+            for shop_id, item_id, price in ctx.samples
+        ])
+        rows += len(ctx.samples)
+    # Keep week/month chart buckets current; daily points come from the price vectors
+    rows += record_price_rollups(ctx.gm_profile_id, ctx.samples, ctx.tick)
+    if ctx.config.record_price_vectors:
+        record_price_vector(ctx.gm_profile_id, ctx.tick, ctx.samples, ctx.recorded_at)
+        rows += 1
+    return rows
+
+
+def aggregates_stage(ctx: TickContext) -> int:
+    """Per-(city, item) and per-item supply/demand/price for market views."""
+    if ctx.new_prices is None:
+        return 0
+    ctx.stats['markets_updated'] = aggregate_markets(ctx.snapshot, ctx.new_prices, ctx.recorded_at)
+    return sum(ctx.stats['markets_updated'].values())
+
+
+def _supply(config: SimulationConfig) -> bool:
+    return config.enable_supply_simulation
+
+
+def _events(config: SimulationConfig) -> bool:
+    return config.enable_event_simulation
+
+
+DEFAULT_STAGES = (
+    TickStage("expire_events", expire_events_stage, enabled=_events),
+    TickStage("restock", restock_stage, enabled=_supply),
+    TickStage("production", production_stage, enabled=_supply),
+    TickStage("crafting", crafting_stage, enabled=_supply),
+    TickStage("settlement", settlement_stage, enabled=lambda config: config.enable_settlement),
+    TickStage("event_effects", event_effects_stage, enabled=_events),
+    TickStage("demand", demand_stage, enabled=lambda config: config.enable_demand_simulation),
+    TickStage("pricing", pricing_stage),
+    TickStage("history", history_stage),
+    TickStage("aggregates", aggregates_stage, enabled=lambda config: config.record_market_aggregates),
+)
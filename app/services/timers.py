@@ -0,0 +1,69 @@
+"""
+Tick-based timers for simulation work that is due only now and then (shop restocks, event expiry).
+
+Timers live in SimulationTimer, indexed by (gm_profile_id, due_tick): a tick asks for the entities
+whose timers are due and only those are processed, so per-tick cost follows the amount of due work
+rather than the size of the world. All functions run in the caller's transaction.
+"""
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import delete, select
+
+from app.extensions import db
+from app.models.simulation_timer import SimulationTimer
+from app.utils.sql import dialect_insert
+
+TIMER_RESTOCK = "restock"
+TIMER_EVENT_EXPIRY = "event_expiry"
+
+
+def schedule_timers(gm_profile_id: int, kind: str, due: Iterable[Tuple[int, int]]) -> int:
+    """Create or move timers; due is (entity_id, due_tick) pairs. Returns the number scheduled."""
+    rows = [
+        {"gm_profile_id": gm_profile_id, "kind": kind, "entity_id": entity_id, "due_tick": due_tick}
+        for entity_id, due_tick in due
+    ]
+    if not rows:
+        return 0
+    insert_stmt = dialect_insert(SimulationTimer.__table__)
+    db.session.execute(
+        insert_stmt.on_conflict_do_update(
+            index_elements=["gm_profile_id", "kind", "entity_id"],
+            set_={"due_tick": insert_stmt.excluded.due_tick},
+        ),
+        rows,
+    )
+    return len(rows)
+
+
+def due_timers(gm_profile_id: int, kind: str, tick: int) -> List[int]:
+    """Entity ids whose timers of this kind are due at or before tick."""
+    return db.session.execute(
+        select(SimulationTimer.entity_id).where(
+            SimulationTimer.gm_profile_id == gm_profile_id,
+            SimulationTimer.due_tick <= tick,
+            SimulationTimer.kind == kind,
+        )
+    ).scalars().all()
+
+
+def cancel_timers(gm_profile_id: int, kind: str, entity_ids: Iterable[int]) -> None:
+    entity_ids = list(entity_ids)
+    if entity_ids:
+        db.session.execute(
+            delete(SimulationTimer).where(
+                SimulationTimer.gm_profile_id == gm_profile_id,
+                SimulationTimer.kind == kind,
+                SimulationTimer.entity_id.in_(entity_ids),
+            )
+        )
+
+
+def scheduled_entities(gm_profile_id: int, kind: str) -> Dict[int, int]:
+    """{entity_id: due_tick} for every timer of this kind (used when syncing timers with their entities)."""
+    return dict(db.session.execute(
+        select(SimulationTimer.entity_id, SimulationTimer.due_tick).where(
+            SimulationTimer.gm_profile_id == gm_profile_id,
+            SimulationTimer.kind == kind,
+        )
+    ).all())
@@ -0,0 +1,39 @@
+"""
+Small dialect helpers for set-based SQL that has to run on PostgreSQL (production) and SQLite (dev).
+"""
+from sqlalchemy import func
+
+from app.extensions import db
+
+
+def dialect_name() -> str:
+    return db.engine.dialect.name
+
+
+def dialect_insert(table):
+    """
+    INSERT construct for the active dialect, so callers can use on_conflict_do_update/nothing.
+    Only PostgreSQL and SQLite support ON CONFLICT here.
+    """
+    name = dialect_name()
+    if name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"Upsert is not supported on {name}")
+    return insert(table)
+
+
+def greatest(*args):
+    """Row-wise maximum (GREATEST on PostgreSQL, multi-argument max() on SQLite)."""
+    if dialect_name() == "sqlite":
+        return func.max(*args)
+    return func.greatest(*args)
+
+
+def least(*args):
+    """Row-wise minimum (LEAST on PostgreSQL, multi-argument min() on SQLite)."""
+    if dialect_name() == "sqlite":
+        return func.min(*args)
+    return func.least(*args)
@@ -0,0 +1,102 @@
+"""
+Request/tick latency benchmark for the logging pipeline.
+Runs against a throwaway SQLite database, so it never touches real data.
+Run from project root: python -m scripts.benchmark_logging [--requests 300] [--ticks 30]
+
+Reference figures (defaults, SQLite, 250 inventory rows; two runs each, mean per call), comparing the
+tree before the queue listener (e7e87b4) with the commit that added it (60400f9):
+
+                                  GET /gm/        run_tick
+    before, echo on (old default) 9.1-10.6 ms     105-114 ms
+    after,  echo on               6.8-9.3 ms      78-88 ms
+    before, echo off              5.0-5.7 ms      38-44 ms
+    after,  echo off (new default) 4.9-6.4 ms     46-63 ms
+
+Most of the default-config gain comes from making SQLALCHEMY_ECHO opt-in. The QueueHandler only pays off
+when log volume is high (statement echo or LOG_LEVEL=DEBUG); at INFO its cost is within run-to-run noise.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+# Add project root so app is importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _percentiles(samples_ms):
+    ordered = sorted(samples_ms)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return statistics.mean(ordered), statistics.median(ordered), p95
+
+
+def _report(label, samples_ms):
+    mean, p50, p95 = _percentiles(samples_ms)
+    print(f"{label:<28} n={len(samples_ms):<5} mean={mean:8.2f} ms  p50={p50:8.2f} ms  p95={p95:8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=300, help="GM dashboard requests to time")
+    parser.add_argument("--ticks", type=int, default=30, help="Simulation ticks to time")
+    args = parser.parse_args()
+
+    db_dir = tempfile.mkdtemp(prefix="shopgen-bench-")
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(db_dir, 'bench.db')}"
+
+    from app import app
+    from app.extensions import db
+    from app.models.users import User, GMProfile
+    from app.models.campaigns import Campaign
+    from app.scripts.seeder import seed_gm_data
+    from app.services.simulation import SimulationEngine
+
+    app.config["WTF_CSRF_ENABLED"] = False
+    with app.app_context():
+        db.create_all()
+        user = User(username="bench_gm", password="x", role="GM")
+        db.session.add(user)
+        db.session.commit()
+        gm_profile = GMProfile(user_id=user.id)
+        db.session.add(gm_profile)
+        db.session.commit()
+        campaign = Campaign(gm_profile_id=gm_profile.id, name="Benchmark")
+        db.session.add(campaign)
+        db.session.commit()
+        seed_gm_data(gm_profile.id, num_cities=5, num_shops_per_city=5, num_global_items=50, num_items_per_shop=10)
+        user_id, gm_profile_id, campaign_id = user.id, gm_profile.id, campaign.id
+
+        engine = SimulationEngine()
+        engine.set_speed(gm_profile_id, "pause")
+
+        tick_ms = []
+        for _ in range(args.ticks):
+            start = time.perf_counter()
+            engine.run_tick(gm_profile_id)
+            tick_ms.append((time.perf_counter() - start) * 1000)
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["_user_id"] = str(user_id)
+        sess["_fresh"] = True
+        sess["campaign_id"] = campaign_id
+
+    request_ms = []
+    for _ in range(args.requests):
+        start = time.perf_counter()
+        response = client.get("/gm/")
+        request_ms.append((time.perf_counter() - start) * 1000)
+        if response.status_code != 200:
+            print(f"Unexpected status {response.status_code} from /gm/")
+            break
+
+    print("\n=== Logging latency benchmark ===")
+    _report("GET /gm/ (paused)", request_ms)
+    _report("run_tick (250 rows)", tick_ms)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Shared fixtures: the Flask app on an in-memory SQLite database, with a fresh schema per test, and a
+small hand-built world (fixed names, stock and prices, so ids and results repeat between runs).
+"""
+import os
+import sys
+from types import SimpleNamespace
+
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+
+from app import app as flask_app  # noqa: E402
+from app.extensions import db  # noqa: E402
+from app.models.backend import City, Item, Shop, ShopInventory  # noqa: E402
+from app.models.users import GMProfile, User  # noqa: E402
+from app.services.economy.catalog import invalidate_item_catalog  # noqa: E402
+from app.services.economy.crafting import invalidate_crafting_plan  # noqa: E402
+from app.services.economy.event_effects import invalidate_compiled_events  # noqa: E402
+from app.services.economy.modifier_index import invalidate_modifier_index  # noqa: E402
+from app.services.economy.topology import invalidate_shop_topology  # noqa: E402
+from app.services.economy.trade_network import invalidate_trade_network  # noqa: E402
+
+CITIES = [("Ashford", "Town", 4000, "North"), ("Brightwater", "City", 20000, "South")]
+# name, type, indices of linked cities
+SHOPS = [("Ashford General", "General Store", [0]), ("Twin Forge", "Blacksmith", [0, 1]), ("Vials", "Potion Shop", [1])]
+# name, type, rarity, base price
+ITEMS = [
+    ("Rope", "Gear", "Common", 10),
+    ("Longsword", "Weapon", "Uncommon", 150),
+    ("Healing Draught", "Potion", "Rare", 400),
+    ("Dragon Scale", "Material", "Legendary", 5000),
+]
+# shop index, item index, stock
+INVENTORY = [(0, 0, 40), (0, 1, 3), (1, 1, 8), (1, 3, 1), (2, 2, 12), (2, 0, 90), (1, 2, 0)]
+
+
+def _clear_caches():
+    for invalidate in (
+        invalidate_item_catalog,
+        invalidate_crafting_plan,
+        invalidate_compiled_events,
+        invalidate_modifier_index,
+        invalidate_shop_topology,
+        invalidate_trade_network,
+    ):
+        invalidate()
+
+
+def _create_gm_profile(username="gm"):
+    user = User(username=username, password="x", role="GM")
+    db.session.add(user)
+    db.session.commit()
+    profile = GMProfile(user_id=user.id)
+    db.session.add(profile)
+    db.session.commit()
+    return profile
+
+
+def _build_world(gm_profile_id):
+    cities = [
+        City(name=name, size=size, population=population, region=region, gm_profile_id=gm_profile_id)
+        for name, size, population, region in CITIES
+    ]
+    shops = [
+        Shop(name=name, type=shop_type, gm_profile_id=gm_profile_id, cities=[cities[i] for i in linked])
+        for name, shop_type, linked in SHOPS
+    ]
+    items = [
+        Item(name=name, type=item_type, rarity=rarity, base_price=base_price, gm_profile_id=gm_profile_id)
+        for name, item_type, rarity, base_price in ITEMS
+    ]
+    inventory = [
+        ShopInventory(shop=shops[s], item=items[i], stock=stock, dynamic_price=items[i].base_price)
+        for s, i, stock in INVENTORY
+    ]
+    db.session.add_all(cities + shops + items + inventory)
+    db.session.commit()
+    return SimpleNamespace(
+        gm_profile_id=gm_profile_id,
+        city_ids=[c.city_id for c in cities],
+        shop_ids=[s.shop_id for s in shops],
+        item_ids=[i.item_id for i in items],
+        inventory_ids=[inv.inventory_id for inv in inventory],
+    )
+
+
+@pytest.fixture
+def app():
+    with flask_app.app_context():
+        _clear_caches()
+        db.create_all()
+        yield flask_app
+        db.session.remove()
+        db.drop_all()
+        _clear_caches()
+
+
+@pytest.fixture
+def gm_profile(app):
+    return _create_gm_profile()
+
+
+@pytest.fixture
+def world(gm_profile):
+    return _build_world(gm_profile.id)
+
+
+@pytest.fixture
+def make_world(app):
+    """Factory for comparing runs: each call starts over on an empty database, so ids repeat."""
+    def make():
+        db.session.remove()
+        db.drop_all()
+        _clear_caches()
+        db.create_all()
+        return _build_world(_create_gm_profile().id)
+    return make
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from app.extensions import db
+from app.models.backend import Item, Shop, ShopInventory
+from app.models.production import ResourceTransform
+from app.services.economy import WorldSnapshot
+from app.services.economy.crafting import CraftingPlan, TransformCycleError, apply_crafting, toposort_transforms
+
+
+def test_toposort_skips_only_the_cycle():
+    # 1 <-> 2 is a cycle fed by 0; 2 -> 3 -> 4 hangs off it; 5 -> 5 loops on itself
+    inputs = [1, 2, 0, 2, 3, 5]
+    outputs = [2, 1, 1, 3, 4, 5]
+    layers, cycle_items = toposort_transforms(inputs, outputs)
+
+    assert cycle_items == [1, 2, 5]
+    np.testing.assert_array_equal(layers, [-1, -1, 0, 0, 1, -1])
+
+
+def test_toposort_strict_reports_cycle_members_only():
+    with pytest.raises(TransformCycleError) as excinfo:
+        toposort_transforms([1, 2, 2], [2, 1, 3], strict=True)
+    assert excinfo.value.item_ids == [1, 2]
+
+
+def test_crafting_runs_transforms_downstream_of_a_cycle(gm_profile):
+    gm = gm_profile.id
+    ore, ingot, sword, plaque = items = [
+        Item(name=name, type="Material", rarity="Common", base_price=10, gm_profile_id=gm)
+        for name in ("Ore", "Ingot", "Sword", "Plaque")
+    ]
+    forge = Shop(name="Forge", type="Blacksmith", gm_profile_id=gm)
+    stock = {ore: 40, ingot: 40, sword: 0, plaque: 0}
+    db.session.add_all(items + [forge] + [
+        ShopInventory(shop=forge, item=item, stock=units, dynamic_price=10) for item, units in stock.items()
+    ])
+    db.session.flush()
+    transforms = [
+        ResourceTransform(input_item_id=a.item_id, output_item_id=b.item_id, conversion_rate=1.0,
+                          shop_type="Blacksmith", gm_profile_id=gm)
+        for a, b in ((ore, ingot), (ingot, ore), (ingot, sword), (sword, plaque))
+    ]
+    db.session.add_all(transforms)
+    db.session.commit()
+
+    plan = CraftingPlan.build(gm)
+    assert plan.cycle_items == sorted([ore.item_id, ingot.item_id])
+    assert plan.transform_id.tolist() == [transforms[2].transform_id, transforms[3].transform_id]
+    assert plan.layer.tolist() == [0, 1]
+
+    snapshot = WorldSnapshot.load(gm)
+    result = apply_crafting(snapshot, tick=1, rate=0.5, plan=plan)
+    db.session.commit()
+
+    after = {row.item_id: row.stock for row in ShopInventory.query.filter_by(shop_id=forge.shop_id)}
+    # Ore and ingot never convert into each other; ingot feeds swords, and swords made in layer 0
+    # feed plaques in layer 1 of the same tick
+    assert after == {ore.item_id: 40, ingot.item_id: 20, sword.item_id: 10, plaque.item_id: 10}
+    assert result["crafted"] == 30
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from app.services.downsample import lttb_indices, minmax_indices
+
+
+def _series(n=500):
+    x = np.arange(n, dtype=np.float64)
+    return x, np.sin(x / 17.0) * 10 + np.cos(x / 5.0)
+
+
+@pytest.mark.parametrize("n, threshold", [(0, 10), (1, 10), (10, 10), (10, 50)])
+def test_lttb_short_series_is_returned_unchanged(n, threshold):
+    x, y = _series(n)
+    np.testing.assert_array_equal(lttb_indices(x, y, threshold), np.arange(n))
+
+
+@pytest.mark.parametrize("threshold", [1, 2, 3, 17, 100, 499])
+def test_lttb_keeps_endpoints_and_returns_threshold_points(threshold):
+    x, y = _series()
+    keep = lttb_indices(x, y, threshold)
+
+    assert keep[0] == 0 and keep[-1] == len(x) - 1
+    assert len(keep) == max(threshold, 2)
+    assert np.all(np.diff(keep) > 0)
+
+
+def test_lttb_keeps_an_isolated_spike():
+    x = np.arange(200, dtype=np.float64)
+    y = np.zeros(200)
+    y[123] = 50.0
+    assert 123 in lttb_indices(x, y, 20)
+
+
+@pytest.mark.parametrize("buckets", [0, 5, 10])
+def test_minmax_short_series_is_returned_unchanged(buckets):
+    y = np.arange(10, dtype=np.float64)
+    np.testing.assert_array_equal(minmax_indices(y, buckets), np.arange(10))
+
+
+def test_minmax_keeps_each_buckets_extremes():
+    _, y = _series()
+    buckets = 25
+    keep = minmax_indices(y, buckets)
+
+    assert np.all(np.diff(keep) > 0)
+    assert len(keep) <= 2 * buckets
+    edges = np.linspace(0, len(y), buckets + 1).astype(np.int64)
+    for start, stop in zip(edges[:-1], edges[1:]):
+        kept = y[keep[(keep >= start) & (keep < stop)]]
+        assert kept.min() == y[start:stop].min()
+        assert kept.max() == y[start:stop].max()
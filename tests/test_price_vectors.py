@@ -0,0 +1,41 @@
+import numpy as np
+
+from app.extensions import db
+from app.services.price_vectors import decode_prices, encode_prices, get_item_series, record_price_vector
+
+
+def test_encode_scatters_samples_by_ordinal():
+    ordinals = {(1, 10): 0, (2, 20): 1, (3, 30): 2}
+    vector = encode_prices(ordinals, [(3, 30, 7.5), (1, 10, 10.25)])
+
+    assert vector.dtype == np.dtype("<f4")
+    np.testing.assert_array_equal(decode_prices(vector.tobytes()), [10.25, np.nan, 7.5])
+
+
+def test_item_series_reads_back_each_ticks_slot(gm_profile):
+    gm = gm_profile.id
+    record_price_vector(gm, 1, [(1, 10, 10.5), (2, 20, 3.25)])
+    # (3, 30) is first seen here, so it gets ordinal 2 and tick 1's vector is too short for it
+    record_price_vector(gm, 2, [(2, 20, 4.0), (3, 30, 7.0)])
+    record_price_vector(gm, 3, [(1, 10, 11.0)])
+    db.session.commit()
+
+    ticks, prices = get_item_series(gm, 1, 10)
+    np.testing.assert_array_equal(ticks, [1, 2, 3])
+    np.testing.assert_array_equal(prices, [10.5, np.nan, 11.0])
+
+    ticks, prices = get_item_series(gm, 3, 30)
+    np.testing.assert_array_equal(ticks, [2, 3])
+    np.testing.assert_array_equal(prices, [7.0, np.nan])
+
+    ticks, prices = get_item_series(gm, 2, 20, start_tick=2, end_tick=2)
+    np.testing.assert_array_equal(ticks, [2])
+    np.testing.assert_array_equal(prices, [4.0])
+
+
+def test_item_series_is_empty_for_unknown_items(gm_profile):
+    record_price_vector(gm_profile.id, 1, [(1, 10, 10.5)])
+    db.session.commit()
+
+    ticks, prices = get_item_series(gm_profile.id, 9, 99)
+    assert len(ticks) == 0 and len(prices) == 0
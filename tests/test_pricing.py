@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from app.config.simulation_config import SimulationConfig
+from app.extensions import db
+from app.models import DemandModifier
+from app.models.backend import ShopInventory
+from app.services.economy import WorldSnapshot, current_prices, get_modifier_index, get_trade_network
+from app.services.economy.catalog import PRICE_CEILING_MULTIPLIER, PRICE_FLOOR_MULTIPLIER
+from app.services.economy.incremental import incremental_price_snapshot
+from app.services.economy.pricing import price_kernel, price_snapshot
+from app.services.simulation import SimulationEngine
+
+# Uniform that gives a fluctuation of exactly 1.0 (FLUCTUATION_LOW 0.9 .. FLUCTUATION_HIGH 1.1)
+NEUTRAL = 0.5
+
+
+@pytest.mark.parametrize("rarity, stock, noise, expected", [
+    # (1 + 3 * 0.2 - max(0.1, 50 / 100 * 0.1)) * 1.0 = 1.5
+    (3, 50, NEUTRAL, 150.0),
+    # stock effect 200 / 100 * 0.1 = 0.2 -> 1.4
+    (3, 200, NEUTRAL, 140.0),
+    # fluctuation 0.9 -> round(1.5 * 0.9, 2) = 1.35
+    (3, 0, 0.0, 135.0),
+    # rarity 5: 1 + 1.0 - 0.1 = 1.9, fluctuation 1.1 -> 2.09
+    (5, 0, 1.0, 209.0),
+])
+def test_kernel_applies_demand_formula(rarity, stock, noise, expected):
+    assert price_kernel([100.0], [rarity], [stock], noise=[noise])[0] == expected
+
+
+def test_kernel_scales_by_demand_modifier():
+    prices = price_kernel([100.0, 100.0], [3, 3], [50, 50], demand_modifier=[1.2, -1.0], noise=[NEUTRAL, NEUTRAL])
+    # 1.5 * 1.2 = 1.8; a negative modifier total counts as 0 and hits the floor
+    np.testing.assert_array_equal(prices, [180.0, 100.0 * PRICE_FLOOR_MULTIPLIER])
+
+
+def test_kernel_clamps_to_floor_and_ceiling():
+    base = np.array([100.0, 100.0])
+    # Huge stock drives demand below zero; a large modifier pushes it past the ceiling
+    prices = price_kernel(base, [1, 5], [100000, 0], demand_modifier=[1.0, 10.0], noise=[NEUTRAL, NEUTRAL])
+    np.testing.assert_array_equal(prices, base * [PRICE_FLOOR_MULTIPLIER, PRICE_CEILING_MULTIPLIER])
+    assert PRICE_FLOOR_MULTIPLIER == 0.5 and PRICE_CEILING_MULTIPLIER == 5.0
+
+
+def test_full_incremental_pass_matches_price_snapshot(world):
+    db.session.add(DemandModifier(name="Festival", scope="global", effect_value=0.3, gm_profile_id=world.gm_profile_id))
+    db.session.commit()
+    snapshot = WorldSnapshot.load(world.gm_profile_id)
+    index = get_modifier_index(world.gm_profile_id)
+    kwargs = dict(trade_network=get_trade_network(world.gm_profile_id), diffusion_rate=0.2)
+
+    expected = price_snapshot(snapshot, index, 7, seed=11, **kwargs)
+    prices, dirty, anchors = incremental_price_snapshot(snapshot, index, 7, seed=11, full=True, **kwargs)
+
+    assert dirty.all()
+    assert len(anchors) == snapshot.size
+    np.testing.assert_array_equal(prices, expected)
+
+
+def _prices_after(make_world, config, ticks):
+    world = make_world()
+    engine = SimulationEngine(config)
+    for _ in range(ticks):
+        engine.run_tick(world.gm_profile_id)
+    stored = dict(db.session.query(ShopInventory.inventory_id, ShopInventory.priced_tick).all())
+    return current_prices(world.gm_profile_id, world.inventory_ids, config), stored
+
+
+def test_lazy_prices_match_an_eager_tick(make_world):
+    ticks = 12
+    eager, _ = _prices_after(make_world, SimulationConfig(lazy_pricing=False), ticks)
+    lazy, priced_ticks = _prices_after(make_world, SimulationConfig(lazy_pricing=True, lazy_compaction_interval=0), ticks)
+
+    # Some rows must actually have been left stale for the comparison to mean anything
+    assert min(priced_ticks.values()) < ticks
+    assert lazy == eager
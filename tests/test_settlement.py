@@ -0,0 +1,100 @@
+from datetime import datetime
+
+import pytest
+
+from app.extensions import db
+from app.models.economy import PlayerInvestment, ShopMaintenance
+from app.models.users import GMProfile, Player, User
+from app.services.economy.settlement import settle_accounts
+
+
+@pytest.fixture
+def player(world):
+    user = User(username="investor", password="x", role="Player")
+    db.session.add(user)
+    db.session.commit()
+    gm_user_id = db.session.get(GMProfile, world.gm_profile_id).user_id
+    player = Player(user_id_player=user.id, gm_profile_id=world.gm_profile_id, user_id_gm=gm_user_id, currency=5)
+    db.session.add(player)
+    db.session.commit()
+    return player
+
+
+def _invest(world, player, last_tick, stake=50.0):
+    # 80 x 1/64 = 1.25 currency per day, exact in binary floating point
+    investment = PlayerInvestment(
+        player_id=player.id,
+        shop_id=world.shop_ids[0],
+        amount_invested=80.0,
+        stake_percentage=stake,
+        income_yield=1 / 64,
+        gm_profile_id=world.gm_profile_id,
+        last_payout_tick=last_tick,
+    )
+    db.session.add(investment)
+    db.session.commit()
+    return investment
+
+
+def _settle(world, tick):
+    result = settle_accounts(world.gm_profile_id, tick, datetime.utcnow())
+    db.session.commit()
+    db.session.expire_all()
+    return result
+
+
+def test_missed_days_are_caught_up_and_fractions_carried(world, player):
+    investment = _invest(world, player, last_tick=10)
+
+    # Three missed days: 3.75 earned, 3 credited, 0.75 carried
+    result = _settle(world, 13)
+    assert result["credited"] == 3
+    assert player.currency == 8
+    assert investment.pending_income == pytest.approx(0.75)
+    assert investment.last_payout_tick == 13
+
+    # The carried fraction completes a whole unit on the next day
+    _settle(world, 14)
+    assert player.currency == 10
+    assert investment.pending_income == pytest.approx(0.0)
+    assert investment.last_payout_tick == 14
+
+
+def test_new_rows_start_accruing_at_the_current_tick(world, player):
+    investment = _invest(world, player, last_tick=None)
+
+    assert _settle(world, 30)["credited"] == 0
+    assert player.currency == 5
+    assert investment.last_payout_tick == 30
+
+
+def test_null_balance_counts_as_zero(world, player):
+    player.currency = None
+    db.session.commit()
+    _invest(world, player, last_tick=0)
+
+    _settle(world, 4)
+    assert player.currency == 5
+
+
+def test_unpaid_maintenance_is_carried_as_debt(world, player):
+    player.currency = 2
+    investment = _invest(world, player, last_tick=0)
+    upkeep = ShopMaintenance(shop_id=world.shop_ids[0], daily_cost=10.0, gm_profile_id=world.gm_profile_id, last_payment_tick=0)
+    db.session.add(upkeep)
+    db.session.commit()
+
+    # Four days: 5.0 income - 4 x 10 x 50% stake = -15; the balance of 2 covers part of it
+    _settle(world, 4)
+    assert player.currency == 0
+    assert investment.pending_income == pytest.approx(-13.0)
+    assert investment.last_payout_tick == 4
+    assert upkeep.last_payment_tick == 4
+
+    # Once upkeep stops, income repays the debt before anything is credited
+    upkeep.daily_cost = 0.0
+    db.session.commit()
+    _settle(world, 20)
+    assert player.currency == 7
+    assert investment.pending_income == pytest.approx(0.0)
+    assert upkeep.last_payment_tick == 20